@@ -0,0 +1,65 @@
+"""
+Compares range scans on the in-memory AVLTree with the same scans on a disk-backed BPlusTree,
+once with a cache big enough for the whole tree and once with a small one.
+
+Run from the repo root:
+    python -m benchmarks.bench_bplustree --size 200000 --queries 200 --cache 64
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from datastructures.avltree import AVLTree
+from datastructures.bplustree import BPlusTree
+
+
+def scan(tree, queries: list[tuple[float, float]]) -> tuple[float, int]:
+    start = time.perf_counter()
+    found = sum(sum(1 for _ in tree.irange(low, high)) for low, high in queries)
+    return time.perf_counter() - start, found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=200, help='range queries, each covering about 1%% of the keys')
+    parser.add_argument('--cache', type=int, default=64, help='nodes the small-cache tree keeps in memory')
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pairs = sorted(((rng.uniform(0, 1_000), f'S{index}') for index in range(args.size)), key=lambda pair: pair[0])
+    queries = [(low, low + 10) for low in (rng.uniform(0, 990) for _ in range(args.queries))]
+
+    avl = AVLTree.from_sorted(pairs)
+    avl_seconds, expected = scan(avl, queries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.bpt')
+        start = time.perf_counter()
+        with BPlusTree.from_sorted(path, pairs, cache_nodes=args.size):
+            pass
+        load_seconds = time.perf_counter() - start
+
+        with BPlusTree(path, cache_nodes=args.size) as warm:
+            scan(warm, queries)  # first pass reads every page it needs into the cache
+            warm_seconds, warm_found = scan(warm, queries)
+        with BPlusTree(path, cache_nodes=args.cache) as cold:
+            cold_seconds, cold_found = scan(cold, queries)
+            stats = cold.stats()
+
+    assert warm_found == cold_found == expected
+    print(f'{args.size:,} keys, {args.queries} range queries, {expected:,} entries found')
+    print(f'bulk load to disk        {load_seconds * 1e3:10.1f} ms  ({stats["pages"]:,} pages)')
+    print(f'AVLTree.irange           {avl_seconds * 1e3:10.1f} ms')
+    print(f'BPlusTree, warm cache    {warm_seconds * 1e3:10.1f} ms')
+    print(f'BPlusTree, {args.cache:>5} nodes   {cold_seconds * 1e3:10.1f} ms  '
+          f'({stats["hits"]:,} hits, {stats["misses"]:,} misses)')
+
+
+if __name__ == '__main__':
+    main()
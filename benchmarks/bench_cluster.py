@@ -0,0 +1,100 @@
+"""
+Measures query latency for ClusterStockPriceManager as worker processes are added, next to one
+in-process StockPriceManager.
+
+Every query over all symbols is scattered to the workers, which answer in parallel on their own
+cores. The coordinator then unpickles and merges their partial results, and that part doesn't shrink
+with more workers. Wide range scans, where the walk over the trees is most of the work, gain the most,
+as long as they ship back (symbol, price) rows; whole stocks carry their price history and shipping
+them costs far more than finding them. Narrow queries (top-k, percentile, single-symbol lookups) are
+dominated by the pipe round trips and get no faster, or a bit slower, with more workers. With fewer
+cpus than workers nothing runs in parallel and only the overhead shows.
+
+Run from the repo root:
+    python -m benchmarks.bench_cluster --stocks 400000 --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+from typing import Callable, Dict, List
+
+from stocks.cluster import ClusterStockPriceManager
+from stocks.stock import StockNode, StockPriceManager
+
+
+def make_stocks(count: int, seed: int) -> List[StockNode]:
+    rng = random.Random(seed)
+    stocks = []
+    for index in range(count):
+        low = round(rng.uniform(1, 1_000), 2)
+        stocks.append(StockNode(f'S{index}', f'Synthetic {index}', current_price=low * rng.uniform(1, 2), low_price=low))
+    return stocks
+
+
+def queries(manager: object, symbols: List[str], rng: random.Random) -> Dict[str, Callable[[], object]]:
+    def wide_range() -> object:
+        low = rng.uniform(1, 900)
+        return manager.range_query(low, low + 100)  # about a tenth of every stock
+
+    def wide_stocks() -> object:
+        low = rng.uniform(1, 900)
+        return manager.get_stocks_in_price_range(low, low + 100)  # the same, as whole stocks
+
+    def narrow_range() -> object:
+        low = rng.uniform(1, 999)
+        return manager.get_stocks_in_price_range(low, low + 1)
+
+    return {
+        'wide range': wide_range,
+        'wide stocks': wide_stocks,
+        'narrow range': narrow_range,
+        'top 100': lambda: manager.get_top_k(100, 'max_price'),
+        'percentile': lambda: manager.find_percentile(rng.uniform(0, 100)),
+        'lookup': lambda: manager.lookup_stock_price(rng.choice(symbols)),
+    }
+
+
+def time_queries(manager: object, symbols: List[str], repeats: int, seed: int) -> Dict[str, float]:
+    # average milliseconds per query, for each kind of query
+    timings = {}
+    for name, query in queries(manager, symbols, random.Random(seed)).items():
+        count = repeats // 20 if name.startswith('wide') else repeats
+        start = time.perf_counter()
+        for _ in range(count):
+            query()
+        timings[name] = (time.perf_counter() - start) / count * 1_000
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stocks', type=int, default=400_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeats', type=int, default=400, help='queries per kind, a twentieth of that for the wide ones')
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    stocks = make_stocks(args.stocks, args.seed)
+    symbols = [stock.stock_symbol for stock in stocks]
+    print(f'{args.stocks:,} stocks, {os.cpu_count()} cpus, milliseconds per query')
+
+    single = StockPriceManager()
+    single.add_stocks(stocks)
+    results = {'in-process': time_queries(single, symbols, args.repeats, args.seed)}
+    del single
+    for count in args.workers:
+        with ClusterStockPriceManager(count) as cluster:
+            cluster.add_stocks(stocks)
+            results[f'{count} workers'] = time_queries(cluster, symbols, args.repeats, args.seed)
+
+    kinds = list(next(iter(results.values())))
+    print(f'{"":>14}' + ''.join(f'{kind:>14}' for kind in kinds))
+    for label, timings in results.items():
+        print(f'{label:>14}' + ''.join(f'{timings[kind]:>14.3f}' for kind in kinds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compares the nightly risk loop (calculate_moving_average once per stock) with the columnar batch call.
+
+Run from the repo root (needs NumPy):
+    python -m benchmarks.bench_columnar --stocks 20000 --ticks 250
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from stocks.columnar import ColumnarHistory
+from stocks.stock import StockNode, StockPriceManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stocks', type=int, default=20_000)
+    parser.add_argument('--ticks', type=int, default=250, help='prices per stock')
+    parser.add_argument('--period', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    manager = StockPriceManager()
+    stocks = []
+    for index in range(args.stocks):
+        # distinct low prices, so calculate_moving_average finds each stock by its key
+        stock = StockNode(f'S{index}', f'Stock {index}', current_price=100.0, low_price=float(index))
+        for _ in range(args.ticks - 1):
+            stock.historical_prices.append(rng.uniform(50, 150))
+        stocks.append(stock)
+    manager.add_stocks(stocks)
+
+    start = time.perf_counter()
+    looped = [manager.calculate_moving_average(stock.low_price, args.period) for stock in stocks]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = ColumnarHistory.from_manager(manager)
+    pack_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    batched = store.latest_moving_average(args.period)
+    batch_seconds = time.perf_counter() - start
+
+    assert max(abs(a - b) for a, b in zip(looped, batched.tolist())) < 1e-6
+    print(f'{args.stocks:,} stocks x {args.ticks} prices, period {args.period}')
+    print(f'per-stock loop        {loop_seconds * 1e3:10.1f} ms')
+    print(f'pack into columns     {pack_seconds * 1e3:10.1f} ms')
+    print(f'one vectorized call   {batch_seconds * 1e3:10.1f} ms  ({loop_seconds / batch_seconds:.0f}x the loop)')
+
+
+if __name__ == '__main__':
+    main()
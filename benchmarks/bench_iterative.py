@@ -0,0 +1,75 @@
+"""
+Compares the iterative insert/search/delete engine in AVLTree with the original recursive helpers.
+
+Run from the repo root:
+    python -m benchmarks.bench_iterative --keys 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from datastructures.avltree import AVLTree
+
+
+def time_per_call(operation: Callable[[int], None], keys: List[int]) -> float:
+    """Runs the operation once per key and returns the average time per call in microseconds."""
+    start = time.perf_counter()
+    for key in keys:
+        operation(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run_recursive(keys: List[int], probes: List[int]) -> dict[str, float]:
+    tree: AVLTree = AVLTree()
+
+    def insert(key: int) -> None:
+        tree._root = tree.insert_helper(tree._root, key, key)
+
+    def search(key: int) -> None:
+        tree.search_helper(tree._root, key)
+
+    def delete(key: int) -> None:
+        tree._root = tree.delete_helper(tree._root, key)
+
+    return {
+        'insert': time_per_call(insert, keys),
+        'search': time_per_call(search, probes),
+        'delete': time_per_call(delete, probes),
+    }
+
+
+def run_iterative(keys: List[int], probes: List[int]) -> dict[str, float]:
+    tree: AVLTree = AVLTree()
+    return {
+        'insert': time_per_call(lambda key: tree.insert(key, key), keys),
+        'search': time_per_call(tree.search, probes),
+        'delete': time_per_call(tree.delete, probes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=1_000_000, help='number of keys to insert')
+    parser.add_argument('--probes', type=int, default=100_000, help='number of keys to search for and then delete')
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = rng.sample(range(args.keys * 10), args.keys)
+    probes = rng.sample(keys, min(args.probes, args.keys))
+
+    recursive = run_recursive(keys, probes)
+    iterative = run_iterative(keys, probes)
+
+    print(f'{args.keys:,} keys, {len(probes):,} probes (microseconds per call)')
+    print(f'{"operation":<10}{"recursive":>12}{"iterative":>12}{"speedup":>10}')
+    for operation in ('insert', 'search', 'delete'):
+        before, after = recursive[operation], iterative[operation]
+        print(f'{operation:<10}{before:>12.2f}{after:>12.2f}{before / after:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Measures insert throughput as feed handler threads are added, for one StockPriceManager behind a
+single lock and for ShardedStockPriceManager.
+
+On a regular CPython build the GIL runs one thread's Python code at a time, so the sharded manager
+mainly removes lock convoys: threads no longer queue up behind one global lock. On a free-threaded
+build (python3.13t and later) the shards also run in parallel.
+
+Run from the repo root:
+    python -m benchmarks.bench_sharded --ticks 200000 --threads 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from stocks.sharded import ShardedStockPriceManager
+from stocks.stock import StockPriceManager
+
+Tick = Tuple[str, float, float]
+
+
+class LockedManager:
+    """The baseline: the plain manager with one lock around every insert."""
+
+    def __init__(self) -> None:
+        self._manager = StockPriceManager()
+        self._lock = threading.Lock()
+
+    def insert(self, symbol: str, name: str, price: float, low_price: float) -> None:
+        with self._lock:
+            self._manager.insert(symbol, name, price, low_price)
+
+
+def run(make_manager: Callable[[], object], symbols: List[str], ticks: List[List[Tick]]) -> float:
+    manager = make_manager()
+    for low_price, symbol in enumerate(symbols):
+        manager.insert(symbol, symbol, 100.0, float(low_price))
+
+    def feed(batch: List[Tick]) -> None:
+        for symbol, price, low_price in batch:
+            manager.insert(symbol, symbol, price, low_price)
+
+    threads = [threading.Thread(target=feed, args=(batch,)) for batch in ticks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(len(batch) for batch in ticks) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type=int, default=200_000, help='total ticks, split evenly over the threads')
+    parser.add_argument('--symbols', type=int, default=2_000)
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    symbols = [f'S{index}' for index in range(args.symbols)]
+    all_ticks = []
+    for _ in range(args.ticks):
+        index = rng.randrange(args.symbols)  # each symbol keeps its own low price, so every tick updates a band
+        all_ticks.append((symbols[index], rng.uniform(50, 150), float(index)))
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'{args.ticks:,} ticks over {args.symbols:,} symbols, {args.shards} shards, GIL {"on" if gil else "off"}')
+    print(f'{"threads":>8}{"one lock":>14}{"sharded":>14}   (ticks/s)')
+    for count in args.threads:
+        ticks = [all_ticks[index::count] for index in range(count)]
+        locked = run(LockedManager, symbols, ticks)
+        sharded = run(lambda: ShardedStockPriceManager(args.shards), symbols, ticks)
+        print(f'{count:>8}{locked:>14,.0f}{sharded:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Times a cold start from CSV against a warm start from a snapshot for StockPriceManager.
+
+Run from the repo root:
+    python -m benchmarks.bench_snapshot --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from stocks.stock import StockPriceManager
+
+
+def write_csv(path: str, rows: int, rng: random.Random) -> None:
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Symbol', 'Name', 'LowPrice', 'HighPrice'])
+        for index in range(rows):
+            low = round(rng.uniform(1, 4000), 2)
+            writer.writerow([f'S{index % 5000}', f'Stock {index % 5000}', low, round(low + rng.uniform(0, 200), 2)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'prices.csv')
+        snapshot_path = os.path.join(directory, 'prices.snap')
+        write_csv(csv_path, args.rows, random.Random(args.seed))
+
+        start = time.perf_counter()
+        manager = StockPriceManager()
+        manager.load_from_csv(csv_path)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        manager.save(snapshot_path)
+        save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        StockPriceManager.load(snapshot_path)
+        warm = time.perf_counter() - start
+
+        print(f'{args.rows:,} rows, snapshot {os.path.getsize(snapshot_path) / 2 ** 20:.1f} MiB')
+        print(f'cold start from CSV   {cold:8.2f} s')
+        print(f'save snapshot         {save:8.2f} s')
+        print(f'warm start            {warm:8.2f} s  ({cold / warm:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
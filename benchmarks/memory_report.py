@@ -0,0 +1,82 @@
+"""
+Reports how many bytes each key costs in the different tree layouts.
+
+Compares the original node layout (one __dict__ per node), the current AVLTree with __slots__
+nodes, and ArenaAVLTree with and without typed float keys. Keys are distinct floats and every
+value is the same object, so the numbers are the cost of the tree structure itself.
+
+Run from the repo root:
+    python -m benchmarks.memory_report --keys 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Any, Callable, List
+
+from datastructures.arenaavltree import ArenaAVLTree
+from datastructures.avltree import AVLTree
+
+
+class DictAVLNode:
+    """The node layout AVLTree used before __slots__, kept here only as the baseline."""
+
+    def __init__(self, key: Any, value: Any) -> None:
+        self._key = key
+        self._value = value
+        self._left = None
+        self._right = None
+        self._height = 1
+        self._size = 1
+
+
+class DictNodeAVLTree(AVLTree):
+    _node_type = DictAVLNode
+
+
+def bytes_per_key(build: Callable[[List[float]], Any], keys: List[float]) -> float:
+    """Builds a tree from the keys and returns the traced memory it holds on to, divided by the key count."""
+    gc.collect()
+    tracemalloc.start()
+    tree = build(keys)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return used / len(keys)
+
+
+def insert_all(tree: Any, keys: List[float]) -> Any:
+    for key in keys:
+        tree.insert(key, None)
+    return tree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # the keys are made before tracing starts, so their float objects aren't counted for any layout
+    keys = [rng.uniform(1, 5000) for _ in range(args.keys)]
+
+    variants = {
+        'AVLTree, __dict__ nodes (before)': lambda ks: insert_all(DictNodeAVLTree(), ks),
+        'AVLTree, __slots__ nodes': lambda ks: insert_all(AVLTree(), ks),
+        'ArenaAVLTree, list keys': lambda ks: insert_all(ArenaAVLTree(), ks),
+        "ArenaAVLTree, array('d') keys": lambda ks: insert_all(ArenaAVLTree(key_typecode='d'), ks),
+    }
+
+    print(f'{args.keys:,} keys')
+    baseline = None
+    for name, build in variants.items():
+        per_key = bytes_per_key(build, keys)
+        baseline = baseline or per_key
+        print(f'{name:<34}{per_key:>10.1f} bytes/key{per_key / baseline:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""
+Timing suite for AVLTree and StockPriceManager with a JSON report that can be diffed against a baseline.
+
+Every case runs at each size, 10^3 to 10^6 keys by default, on data from benchmarks.synthetic:
+    avltree.insert      inserting every key one at a time into an empty tree
+    avltree.search      looking up keys that are in the tree
+    avltree.delete      deleting keys that are in the tree
+    avltree.inorder     a full traversal, one case for each order (inorder, preorder, postorder, bforder)
+    avltree.range       irange scans that each cover about 1% of the keys
+    manager.ingest      StockPriceManager.add_stocks of every row in one batch
+    manager.ticks       StockPriceManager.insert of price updates to existing bands
+    manager.queries     a mix of range, max-in-range, top-k, percentile and symbol lookups
+
+The unit is microseconds per operation, so results stay comparable across sizes. Each case keeps the
+best of its repeats, because noise on a busy machine only ever makes a run slower. Sizes above 10^4
+are timed once so the full suite finishes in a few minutes. Timings from different machines or
+Python builds aren't comparable, so keep the baseline next to the machine that checks against it.
+
+Compare against a baseline, failing (exit status 1) if any case got more than 10% slower:
+    python -m benchmarks.suite --output report.json --baseline benchmarks/baseline.json
+
+Refresh the baseline after an intended change, on the same machine the baseline came from:
+    python -m benchmarks.suite --output benchmarks/baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from benchmarks.synthetic import generate_stocks
+from datastructures.avltree import AVLTree
+from stocks.stock import StockPriceManager
+
+REPORT_VERSION = 1
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_THRESHOLD = 0.10
+PROBES = 10_000  # searches, deletes, ticks and queries per case, fewer if the size is smaller
+RANGE_QUERIES = 200
+MIN_SAMPLE = 0.2  # seconds
+
+# a case sets up its data outside the timing and returns the timed part, plus how many operations it does.
+# A case whose timed part uses its data up (deleting every probe, say) returns a setup as well, which makes
+# fresh data untimed before every call and hands it to the timed part
+Case = Callable[[int, int], Tuple]
+
+
+def _keys(size: int, seed: int) -> List[float]:
+    rng = random.Random(seed)
+    return [rng.uniform(0, size) for _ in range(size)]
+
+
+def _tree(keys: List[float]) -> AVLTree:
+    return AVLTree.from_iterable((key, key) for key in keys)
+
+
+def avltree_insert(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+    keys = _keys(size, seed)
+
+    def run() -> None:
+        tree: AVLTree = AVLTree()
+        for key in keys:
+            tree.insert(key, key)
+    return run, size
+
+
+def avltree_search(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+    keys = _keys(size, seed)
+    tree = _tree(keys)
+    probes = random.Random(seed + 1).sample(keys, min(size, PROBES))
+
+    def run() -> None:
+        for key in probes:
+            tree.search(key)
+    return run, len(probes)
+
+
+def avltree_delete(size: int, seed: int) -> Tuple[Callable[[AVLTree], Any], int, Callable[[], AVLTree]]:
+    keys = _keys(size, seed)
+    pairs = sorted((key, key) for key in keys)
+    probes = random.Random(seed + 1).sample(keys, min(size, PROBES))
+
+    def setup() -> AVLTree:
+        return AVLTree.from_sorted(pairs)  # O(n), so it stays out of the timing or it swamps the O(log n) deletes
+
+    def run(tree: AVLTree) -> None:
+        for key in probes:
+            tree.delete(key)
+    return run, len(probes), setup
+
+
+def avltree_traversal(order: str) -> Case:
+    def case(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+        tree = _tree(_keys(size, seed))
+        walk = getattr(tree, f'iter_{order}')
+
+        def run() -> None:
+            for _ in walk():
+                pass
+        return run, size
+    return case
+
+
+def avltree_range(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+    tree = _tree(_keys(size, seed))
+    rng = random.Random(seed + 1)
+    width = size / 100
+    starts = [rng.uniform(0, size - width) for _ in range(RANGE_QUERIES)]
+
+    def run() -> None:
+        for start in starts:
+            for _ in tree.irange(start, start + width):
+                pass
+    return run, len(starts)
+
+
+def manager_ingest(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+    stocks = generate_stocks(size, seed)
+
+    def run() -> None:
+        StockPriceManager().add_stocks(stocks)
+    return run, size
+
+
+def manager_ticks(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+    stocks = generate_stocks(size, seed)
+    manager = StockPriceManager()
+    manager.add_stocks(stocks)
+    rng = random.Random(seed + 1)
+    ticks = [(stock.stock_symbol, stock.stock_name, round(stock.current_price * rng.uniform(0.95, 1.05), 2), stock.low_price)
+             for stock in rng.sample(stocks, min(size, PROBES))]
+
+    def run() -> None:
+        insert = manager.insert
+        for tick in ticks:
+            insert(*tick)
+    return run, len(ticks)
+
+
+def manager_queries(size: int, seed: int) -> Tuple[Callable[[], Any], int]:
+    stocks = generate_stocks(size, seed)
+    manager = StockPriceManager()
+    manager.add_stocks(stocks)
+    rng = random.Random(seed + 1)
+    symbols = sorted({stock.stock_symbol for stock in stocks})
+    queries: List[Callable[[], Any]] = []
+    for _ in range(min(size, PROBES) // 5):
+        low = rng.uniform(50, 300)
+        queries.append(lambda low=low: manager.range_query(low, low + 0.25))
+        queries.append(lambda low=low: manager.max_in_range(low, low + 25))
+        queries.append(lambda: manager.get_top_k(10, 'max_price'))
+        queries.append(lambda percentile=rng.uniform(0, 100): manager.find_percentile(percentile))
+        queries.append(lambda symbol=rng.choice(symbols): manager.lookup_stock_bands(symbol))
+
+    def run() -> None:
+        for query in queries:
+            query()
+    return run, len(queries)
+
+
+CASES: Dict[str, Case] = {
+    'avltree.insert': avltree_insert,
+    'avltree.search': avltree_search,
+    'avltree.delete': avltree_delete,
+    'avltree.inorder': avltree_traversal('inorder'),
+    'avltree.preorder': avltree_traversal('preorder'),
+    'avltree.postorder': avltree_traversal('postorder'),
+    'avltree.bforder': avltree_traversal('bforder'),
+    'avltree.range': avltree_range,
+    'manager.ingest': manager_ingest,
+    'manager.ticks': manager_ticks,
+    'manager.queries': manager_queries,
+}
+
+
+def time_case(case: Case, size: int, seed: int, repeats: int) -> Dict[str, float]:
+    """Times one case at one size and returns its report entry.
+
+    A warm-up call decides how many calls go into each timed sample, so a sample lasts at least
+    MIN_SAMPLE seconds. Shorter samples are mostly timer and scheduler noise. A case with a setup
+    has each call timed on its own, after its setup.
+    """
+    run, operations, *setup = case(size, seed)
+
+    def sample(calls: int) -> float:
+        if not setup:
+            start = time.perf_counter()
+            for _ in range(calls):
+                run()
+            return time.perf_counter() - start
+        elapsed = 0.0
+        for _ in range(calls):
+            data = setup[0]()
+            start = time.perf_counter()
+            run(data)
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    calls = max(1, math.ceil(MIN_SAMPLE / max(sample(1), 1e-9)))
+    best = float('inf')
+    for _ in range(repeats):
+        best = min(best, sample(calls) / calls)
+    return {'size': size, 'operations': operations, 'seconds': best, 'us_per_op': best / operations * 1e6}
+
+
+def run_suite(sizes: List[int], seed: int = 351, repeats: int = 3, only: Optional[List[str]] = None,
+              progress: Callable[[str], None] = lambda line: None) -> Dict[str, Any]:
+    """Runs the cases whose names start with one of only (every case if None) and returns the report, with
+    results keyed by '<case>/<size>'. Sizes above 10^4 are timed once whatever repeats says.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for name, case in CASES.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        for size in sizes:
+            entry = time_case(case, size, seed, repeats if size <= 10_000 else 1)
+            results[f'{name}/{size}'] = entry
+            progress(f'{name}/{size}: {entry["us_per_op"]:.3f} us/op')
+    return {
+        'version': REPORT_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'machine': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'seed': seed,
+        'results': results,
+    }
+
+
+class Comparison(NamedTuple):
+    name: str
+    baseline: float  # microseconds per operation
+    current: float
+
+    @property
+    def change(self) -> float:
+        """How much slower (positive) or faster (negative) the current run is, as a fraction of the baseline."""
+        return self.current / self.baseline - 1 if self.baseline else 0.0
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> Tuple[List[Comparison], List[str], List[str]]:
+    """Lines up two reports case by case. Gives back the cases in both, then the names only the baseline
+    has, then the names only the current report has.
+
+    Raises ValueError if either report has another version than this code writes.
+    """
+    for report in (baseline, current):
+        if report.get('version') != REPORT_VERSION:
+            raise ValueError(f"Report version {report.get('version')} can't be compared, expected {REPORT_VERSION}.")
+    old, new = baseline['results'], current['results']
+    shared = [Comparison(name, old[name]['us_per_op'], new[name]['us_per_op']) for name in new if name in old]
+    return shared, [name for name in old if name not in new], [name for name in new if name not in old]
+
+
+def regressions(comparisons: List[Comparison], threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """The cases that got slower by more than threshold (0.10 is 10%)."""
+    return [comparison for comparison in comparisons if comparison.change > threshold]
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> bool:
+    """Prints the diff of two reports and returns True if nothing regressed."""
+    comparisons, dropped, added = compare_reports(baseline, current)
+    if baseline.get('machine') != current.get('machine'):
+        print('warning: the baseline was recorded on another machine or Python, expect noise')
+    slower = {comparison.name for comparison in regressions(comparisons, threshold)}
+    print(f'{"case":<28}{"baseline":>12}{"current":>12}{"change":>10}   (us/op)')
+    for comparison in comparisons:
+        flag = '  REGRESSION' if comparison.name in slower else ''
+        print(f'{comparison.name:<28}{comparison.baseline:>12.3f}{comparison.current:>12.3f}{comparison.change:>+10.1%}{flag}')
+    for name in dropped:
+        print(f'{name:<28} only in the baseline')
+    for name in added:
+        print(f'{name:<28} not in the baseline')
+    print(f'{len(slower)} of {len(comparisons)} cases more than {threshold:.0%} slower than the baseline')
+    return not slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--only', nargs='+', help='case name prefixes to run, for example avltree or manager.ticks')
+    parser.add_argument('--repeats', type=int, default=3, help='times each case runs at sizes up to 10^4, best one counts')
+    parser.add_argument('--seed', type=int, default=351)
+    parser.add_argument('--output', help='where to write the JSON report')
+    parser.add_argument('--baseline', help='a stored report to compare this run against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.seed, args.repeats, args.only, progress=print)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if not print_comparison(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
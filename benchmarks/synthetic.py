@@ -0,0 +1,78 @@
+"""
+Synthetic stock price rows shaped like stocks/sample_stock_prices.csv.
+
+The sample has 200 rows over 20 symbols, about ten price bands per symbol. Low prices run from 50 to
+300, and each band's high is 10 or more above its low and at most three times it. The generator keeps
+that shape at any size. The symbol universe grows with the row count (one symbol per ten rows), and
+the first 20 symbols are the sample's own. Prices have two decimals so that large files don't pile
+every row onto a few hundred distinct keys.
+
+Run from the repo root to write a file:
+    python -m benchmarks.synthetic prices.csv --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import random
+from typing import Iterator, List, Tuple
+
+from stocks.stock import StockNode
+
+Row = Tuple[str, str, float, float]
+
+SAMPLE_SYMBOLS = [
+    ('GOOGL', 'Alphabet Inc.'), ('UBER', 'Uber Technologies'), ('ORCL', 'Oracle Corp.'),
+    ('NVDA', 'NVIDIA Corp.'), ('NFLX', 'Netflix Inc.'), ('BABA', 'Alibaba Group'),
+    ('DIS', 'Walt Disney Co.'), ('AMZN', 'Amazon.com Inc.'), ('INTC', 'Intel Corp.'),
+    ('MSFT', 'Microsoft Corp.'), ('SPOT', 'Spotify Technology'), ('IBM', 'International Business Machines'),
+    ('AAPL', 'Apple Inc.'), ('CSCO', 'Cisco Systems'), ('SNAP', 'Snap Inc.'), ('META', 'Meta Platforms'),
+    ('CRM', 'Salesforce Inc.'), ('TSLA', 'Tesla Inc.'), ('ADBE', 'Adobe Inc.'), ('PINS', 'Pinterest Inc.'),
+]
+ROWS_PER_SYMBOL = 10
+MIN_LOW, MAX_LOW = 50.0, 300.0
+MIN_SPREAD, MAX_RATIO = 10.0, 3.0
+
+
+def symbol_universe(rows: int) -> List[Tuple[str, str]]:
+    """The sample's symbols, plus made up ones (SYN20, SYN21, ...) until there's one per ROWS_PER_SYMBOL rows."""
+    count = max(len(SAMPLE_SYMBOLS), rows // ROWS_PER_SYMBOL)
+    extra = [(f'SYN{index}', f'Synthetic {index}') for index in range(len(SAMPLE_SYMBOLS), count)]
+    return SAMPLE_SYMBOLS[:count] + extra
+
+
+def generate_rows(rows: int, seed: int = 351) -> Iterator[Row]:
+    """Yields (symbol, name, low price, high price) rows."""
+    rng = random.Random(seed)
+    symbols = symbol_universe(rows)
+    for _ in range(rows):
+        symbol, name = rng.choice(symbols)
+        low = round(rng.uniform(MIN_LOW, MAX_LOW), 2)
+        high = round(rng.uniform(low + MIN_SPREAD, max(low + MIN_SPREAD, low * MAX_RATIO)), 2)
+        yield symbol, name, low, high
+
+
+def generate_stocks(rows: int, seed: int = 351) -> List[StockNode]:
+    """The same rows as StockNodes, the way load_from_csv builds them (the high price is the current price)."""
+    return [StockNode(symbol, name, current_price=high, low_price=low) for symbol, name, low, high in generate_rows(rows, seed)]
+
+
+def write_csv(path: str, rows: int, seed: int = 351) -> None:
+    """Writes rows to path with the sample file's header."""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['StockSymbol', 'StockName', 'LowPrice', 'HighPrice'])
+        writer.writerows(generate_rows(rows, seed))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=351)
+    args = parser.parse_args()
+    write_csv(args.path, args.rows, args.seed)
+
+
+if __name__ == '__main__':
+    main()
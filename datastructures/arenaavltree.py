@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from operator import itemgetter
+from typing import Any, Callable, Deque, Generic, Iterator, List, MutableSequence, Optional, Sequence, Tuple
+
+from datastructures.iavltree import IAVLTree, K, V
+
+# index used for "no child", the same job None does for AVLNode
+NIL = -1
+
+
+class ArenaAVLTree(IAVLTree[K, V], Generic[K, V]):
+    """ An AVL tree that keeps its nodes in parallel columns instead of one Python object per node.
+
+    Node i is made of keys[i], values[i], left[i], right[i], height[i] and size[i]. The child links,
+    heights and subtree counts live in typed arrays, so a node costs a few machine words instead of a
+    whole object. Passing key_typecode (for example 'd' for float prices) stores the keys in a typed
+    array too. Deleted slots go on a free list, threaded through the left column, and are reused by
+    later inserts.
+
+    The balancing is the same as AVLTree: iterative descent with a path stack and a retrace back up.
+    """
+
+    def __init__(self, starting_sequence: Optional[Sequence[Tuple[K, V]]] = None,
+                 key_typecode: Optional[str] = None) -> None:
+        """Creates an empty tree, or bulk loads starting_sequence (in any order). With key_typecode, numeric
+        keys are stored compactly in an array of that typecode.
+        """
+        self._keys: MutableSequence[Any] = array(key_typecode) if key_typecode else []
+        self._values: List[Optional[V]] = []
+        self._left = array('i')
+        self._right = array('i')
+        self._height = array('b')  # AVL heights stay tiny, a signed byte covers trees far bigger than memory
+        self._size = array('i')
+        self._root = NIL
+        self._free = NIL  # first free slot, each free slot's left column holds the next one
+
+        if starting_sequence:
+            ordered = sorted(starting_sequence, key=itemgetter(0))
+            self._root = self._build(ordered, 0, len(ordered))
+
+    def _build(self, pairs: Sequence[Tuple[K, V]], low: int, high: int) -> int:
+        # same midpoint build as AVLTree._build
+        if low >= high:
+            return NIL
+        middle = (low + high) // 2
+        slot = self._alloc(*pairs[middle])
+        self._left[slot] = self._build(pairs, low, middle)
+        self._right[slot] = self._build(pairs, middle + 1, high)
+        self._update(slot)
+        return slot
+
+    def _alloc(self, key: K, value: V) -> int:
+        # reuses a freed slot when there is one, otherwise grows every column by one
+        if self._free != NIL:
+            slot = self._free
+            self._free = self._left[slot]
+            self._keys[slot] = key
+            self._values[slot] = value
+            self._left[slot] = NIL
+            self._right[slot] = NIL
+            self._height[slot] = 1
+            self._size[slot] = 1
+            return slot
+
+        self._keys.append(key)
+        self._values.append(value)
+        self._left.append(NIL)
+        self._right.append(NIL)
+        self._height.append(1)
+        self._size.append(1)
+        return len(self._values) - 1
+
+    def _release(self, slot: int) -> None:
+        # drops the references held by the slot and pushes it on the free list
+        self._values[slot] = None
+        if isinstance(self._keys, list):
+            self._keys[slot] = None
+        self._left[slot] = self._free
+        self._free = slot
+
+    def _node_height(self, slot: int) -> int:
+        return self._height[slot] if slot != NIL else 0
+
+    def _node_size(self, slot: int) -> int:
+        return self._size[slot] if slot != NIL else 0
+
+    def _update(self, slot: int) -> None:
+        left, right = self._left[slot], self._right[slot]
+        self._height[slot] = 1 + max(self._node_height(left), self._node_height(right))
+        self._size[slot] = 1 + self._node_size(left) + self._node_size(right)
+
+    def _balance_factor(self, slot: int) -> int:
+        return self._node_height(self._left[slot]) - self._node_height(self._right[slot])
+
+    def rotate_right(self, slot: int) -> int:
+        new_root = self._left[slot]
+        self._left[slot] = self._right[new_root]
+        self._right[new_root] = slot
+        self._update(slot)
+        self._update(new_root)
+        return new_root
+
+    def rotate_left(self, slot: int) -> int:
+        new_root = self._right[slot]
+        self._right[slot] = self._left[new_root]
+        self._left[new_root] = slot
+        self._update(slot)
+        self._update(new_root)
+        return new_root
+
+    def _rebalance(self, slot: int) -> int:
+        self._update(slot)
+        balance = self._balance_factor(slot)
+        if balance > 1:
+            if self._balance_factor(self._left[slot]) < 0:  # LR
+                self._left[slot] = self.rotate_left(self._left[slot])
+            return self.rotate_right(slot)
+        if balance < -1:
+            if self._balance_factor(self._right[slot]) > 0:  # RL
+                self._right[slot] = self.rotate_right(self._right[slot])
+            return self.rotate_left(slot)
+        return slot
+
+    def _replace_child(self, parent: int, old_child: int, new_child: int) -> None:
+        if parent == NIL:
+            self._root = new_child
+        elif self._left[parent] == old_child:
+            self._left[parent] = new_child
+        else:
+            self._right[parent] = new_child
+
+    def _retrace(self, path: List[int]) -> None:
+        # same early stop as AVLTree._retrace, once a subtree keeps its height only counts change above it
+        settled = False
+        for index in range(len(path) - 1, -1, -1):
+            slot = path[index]
+            if settled:
+                self._update(slot)
+                continue
+            old_height = self._height[slot]
+            new_subtree = self._rebalance(slot)
+            if new_subtree != slot:
+                self._replace_child(path[index - 1] if index else NIL, slot, new_subtree)
+            settled = self._height[new_subtree] == old_height
+
+    def insert(self, key: K, value: V) -> None:
+        """Inserts a key-value pair, equal keys go to the right like in AVLTree."""
+        new_slot = self._alloc(key, value)
+        if self._root == NIL:
+            self._root = new_slot
+            return
+
+        keys, left, right = self._keys, self._left, self._right
+        path: List[int] = []
+        slot = self._root
+        while slot != NIL:
+            path.append(slot)
+            slot = left[slot] if key < keys[slot] else right[slot]
+
+        parent = path[-1]
+        if key < keys[parent]:
+            left[parent] = new_slot
+        else:
+            right[parent] = new_slot
+        self._retrace(path)
+
+    def search(self, key: K) -> Optional[V]:
+        """Searches for a key and returns its value, or None if the key is not present."""
+        slot = self._find(key)
+        return self._values[slot] if slot != NIL else None
+
+    def _find(self, key: K) -> int:
+        keys, left, right = self._keys, self._left, self._right
+        slot = self._root
+        while slot != NIL:
+            if key < keys[slot]:
+                slot = left[slot]
+            elif keys[slot] < key:
+                slot = right[slot]
+            else:
+                return slot
+        return NIL
+
+    def delete(self, key: K) -> None:
+        """Deletes a key and its value, freeing its slot for reuse.
+
+        Raises KeyError if the key is not present in the tree.
+        """
+        keys, left, right = self._keys, self._left, self._right
+        path: List[int] = []
+        slot = self._root
+        while slot != NIL:
+            path.append(slot)
+            if key < keys[slot]:
+                slot = left[slot]
+            elif keys[slot] < key:
+                slot = right[slot]
+            else:
+                break
+        if slot == NIL:
+            raise KeyError(f"Key {key} not found in the tree.")
+
+        index = len(path) - 1
+        if left[slot] == NIL or right[slot] == NIL:
+            path.pop()
+            self._replace_child(path[-1] if path else NIL, slot, left[slot] if left[slot] != NIL else right[slot])
+        else:
+            # the in-order successor takes the deleted slot's place in the tree
+            successor = right[slot]
+            path.append(successor)
+            while left[successor] != NIL:
+                successor = left[successor]
+                path.append(successor)
+            path.pop()
+            self._replace_child(path[-1], successor, right[successor])
+            left[successor] = left[slot]
+            right[successor] = right[slot]
+            self._height[successor] = self._height[slot]
+            self._replace_child(path[index - 1] if index else NIL, slot, successor)
+            path[index] = successor
+
+        self._release(slot)
+        self._retrace(path)
+
+    def _iter_slots(self, reverse: bool = False) -> Iterator[int]:
+        near, far = (self._right, self._left) if reverse else (self._left, self._right)
+        stack: List[int] = []
+        slot = self._root
+        while stack or slot != NIL:
+            if slot != NIL:
+                stack.append(slot)
+                slot = near[slot]
+            else:
+                slot = stack.pop()
+                yield slot
+                slot = far[slot]
+
+    def iter_inorder(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        """Lazily yields (key, value) pairs in sorted order, or descending when reverse is True."""
+        for slot in self._iter_slots(reverse):
+            yield self._keys[slot], self._values[slot]
+
+    def iter_items(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        """Same as iter_inorder, named like dict.items()."""
+        return self.iter_inorder(reverse)
+
+    def iter_preorder(self) -> Iterator[Tuple[K, V]]:
+        """Lazily yields (key, value) pairs in pre-order."""
+        stack = [self._root] if self._root != NIL else []
+        while stack:
+            slot = stack.pop()
+            yield self._keys[slot], self._values[slot]
+            if self._right[slot] != NIL:
+                stack.append(self._right[slot])
+            if self._left[slot] != NIL:
+                stack.append(self._left[slot])
+
+    def iter_postorder(self) -> Iterator[Tuple[K, V]]:
+        """Lazily yields (key, value) pairs in post-order."""
+        stack: List[int] = []
+        last = NIL
+        slot = self._root
+        while stack or slot != NIL:
+            if slot != NIL:
+                stack.append(slot)
+                slot = self._left[slot]
+                continue
+            top = stack[-1]
+            if self._right[top] != NIL and self._right[top] != last:
+                slot = self._right[top]
+            else:
+                stack.pop()
+                yield self._keys[top], self._values[top]
+                last = top
+
+    def iter_bforder(self) -> Iterator[Tuple[K, V]]:
+        """Lazily yields (key, value) pairs in breadth-first order."""
+        queue: Deque[int] = deque([self._root] if self._root != NIL else [])
+        while queue:
+            slot = queue.popleft()
+            yield self._keys[slot], self._values[slot]
+            if self._left[slot] != NIL:
+                queue.append(self._left[slot])
+            if self._right[slot] != NIL:
+                queue.append(self._right[slot])
+
+    def _collect(self, pairs: Iterator[Tuple[K, V]], visit: Optional[Callable[[V], None]]) -> List[K]:
+        keys: List[K] = []
+        for key, value in pairs:
+            if visit is not None:
+                visit(value)
+            keys.append(key)
+        return keys
+
+    def inorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_inorder(), visit)
+
+    def preorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_preorder(), visit)
+
+    def postorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_postorder(), visit)
+
+    def bforder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_bforder(), visit)
+
+    def size(self) -> int:
+        return self._node_size(self._root)
+
+    def __iter__(self) -> Iterator[K]:
+        for slot in self._iter_slots():
+            yield self._keys[slot]
+
+    def __len__(self) -> int:
+        return self.size()
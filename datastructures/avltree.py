@@ -2,15 +2,25 @@
 # this is a thiing that allows the code to be compatible between versions
 from __future__ import annotations
 # I HAVE NO IDEA WHAT THIS IS FOR, was here when i did my most recent pull
-from typing import Callable, Generic, List, Optional, Sequence, Tuple
+from typing import Callable, Deque, Generic, Iterable, Iterator, List, Optional, Sequence, Tuple
+from collections import deque
+import copy
+import math
+from itertools import islice
+from operator import attrgetter, itemgetter
+import heapq
 # This pulls from the other file called iavltree
 from datastructures.iavltree import IAVLTree, K, V
+from datastructures.metrics import TREE_METHODS, TreeMetrics, instrument_tree, uninstrument
+from datastructures.snapshot import open_snapshot, pack_keys, paused_gc, pack_values, unpack_keys, unpack_values, write_snapshot
 #----------------------------------------------------------------------------------------------------------
 """ 
 This is the actual AVLNode class, where a node is a like a spot on the tree. This class takes in a key and value pair.
 """
 # creating a class for our AVL nodes, which take a generic (aka not specific) key and value pairs.
 class AVLNode(Generic[K, V]):
+    # slots instead of a per-node __dict__, each node is one of millions so this saves a lot of memory
+    __slots__ = ('_key', '_value', '_left', '_right', '_height', '_size')
 
     def __init__(self, key: K, value: V, left: Optional[AVLNode] = None, right: Optional[AVLNode] = None):
 
@@ -19,6 +29,7 @@ class AVLNode(Generic[K, V]):
         self._left = left  # Initializing the left child
         self._right = right  # Initializing the right child
         self._height = 1  # Setting the initial height of the node
+        self._size = 1  # number of nodes in the subtree rooted here (this node counts as 1)
 #-------------------------------------------------------------------------------------------------------------------
     @property
     def key(self) -> K:  # Defining a getter for the key
@@ -41,20 +52,335 @@ class AVLNode(Generic[K, V]):
         return str(self)
 #-----------------------------------------------------------------------------------------------------------------------
 class AVLTree(IAVLTree[K, V], Generic[K, V]):
+    # the class used for new nodes, subclasses that need extra data on their nodes swap this out
+    _node_type = AVLNode
+    # the tag save() writes into a snapshot, so load() won't read a file some other tree type wrote
+    _snapshot_kind = b'AVLT'
+    # None until enable_metrics is called, the plain methods never look at it so metrics cost nothing while off
+    _metrics: Optional[TreeMetrics] = None
 
     def __init__(self, starting_sequence: Optional[Sequence[Tuple]] = None):
 
         # LC: just added type hint Optional
-        self._root: Optional[AVLNode] = None  # initalizes the root
-        self._size = 0  # initalizes the size
+        self._root: Optional[AVLNode] = None  # initalizes the root, the tree size lives on the root's _size
 
-        if starting_sequence:  # if starting pair(?) is provided put those in
-            for key, value in starting_sequence:
-                self.insert(key, value)
+        if starting_sequence:  # if starting pairs are provided, sort them once and build the tree in one go
+            self._root = self._build(sorted(starting_sequence, key=itemgetter(0)), 0, len(starting_sequence))
 #-----------------------------------------------------------------------------------------------------------------------
-# How we insert key value pairs into the tree, is really just a pretty name while the helper function does all of the work
+    # builds a tree straight from (key, value) pairs that are already sorted by key, in O(n) with no rotations
+    @classmethod
+    def from_sorted(cls, pairs: Iterable[Tuple[K, V]]) -> AVLTree[K, V]:
+        pairs = list(pairs)
+        tree = cls()
+        tree._check_sorted(pairs)
+        tree._root = tree._build(pairs, 0, len(pairs))
+        return tree
+#-----------------------------------------------------------------------------------------------------------------------
+    # one pass to make sure the caller really gave us sorted keys
+    def _check_sorted(self, pairs: Sequence[Tuple]) -> None:
+        for index in range(1, len(pairs)):
+            if pairs[index][0] < pairs[index - 1][0]:
+                raise ValueError(f"Keys are not sorted at position {index}: {pairs[index - 1][0]} then {pairs[index][0]}.")
+#-----------------------------------------------------------------------------------------------------------------------
+    # same as from_sorted but for pairs in any order, sorts once (O(n log n)) and then bulk builds
+    @classmethod
+    def from_iterable(cls, pairs: Iterable[Tuple[K, V]]) -> AVLTree[K, V]:
+        tree = cls()
+        ordered = sorted(pairs, key=itemgetter(0))  # sorted is stable so equal keys keep their order
+        tree._root = tree._build(ordered, 0, len(ordered))
+        return tree
+#-----------------------------------------------------------------------------------------------------------------------
+    # makes the middle pair of pairs[low:high] the root and builds both halves under it the same way, so every
+    # node's two sides differ in size by at most one and the tree is balanced without any rotations
+    def _build(self, pairs: Sequence[Tuple[K, V]], low: int, high: int) -> Optional[AVLNode]:
+        if low >= high:  # nothing left in this slice
+            return None
+        middle = (low + high) // 2
+        key, value = pairs[middle]
+        node = self._node_type(key, value)
+        node._left = self._build(pairs, low, middle)
+        node._right = self._build(pairs, middle + 1, high)
+        self._update(node)
+        return node
+#-----------------------------------------------------------------------------------------------------------------------
+    # merges a batch of (key, value) pairs, already sorted by key, into the tree. See _merge_nodes for how
+    def merge(self, pairs: Iterable[Tuple[K, V]]) -> None:
+        pairs = list(pairs)
+        self._check_sorted(pairs)
+        self._merge_nodes([self._node_type(key, value) for key, value in pairs])
+#-----------------------------------------------------------------------------------------------------------------------
+    # a batch that's small next to the tree goes in one insert at a time, O(m log n). A middling one is linked into
+    # a tree of its own and unioned in, O(m log(n/m + 1)). One at least a quarter of the tree's size gets merged
+    # with the existing nodes in a single sorted pass and everything is relinked into a balanced tree, O(n + m),
+    # which has the smaller constant once m is close to n. The old nodes are reused, and on equal keys they stay
+    # in front of the new ones just like insert does
+    def _merge_nodes(self, new_nodes: List[AVLNode]) -> None:
+        size = self.size()
+        if len(new_nodes) * max(size, 1).bit_length() < size:
+            for node in new_nodes:
+                self._insert_node(node)
+            return
+        if 4 * len(new_nodes) < size:
+            self._root = self._union(self._root, self._link(new_nodes, 0, len(new_nodes)), copy_other=False)
+            return
+
+        merged = list(heapq.merge(list(self._iter_nodes()), new_nodes, key=attrgetter('_key')))
+        self._root = self._link(merged, 0, len(merged))
+#-----------------------------------------------------------------------------------------------------------------------
+    # like _build, but hooks up nodes that already exist instead of making new ones
+    def _link(self, nodes: Sequence[AVLNode], low: int, high: int) -> Optional[AVLNode]:
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        node = nodes[middle]
+        node._left = self._link(nodes, low, middle)
+        node._right = self._link(nodes, middle + 1, high)
+        self._update(node)
+        return node
+#-----------------------------------------------------------------------------------------------------------------------
+    # the join-based bulk operations. Everything below is built on _join, which hangs two trees off a middle node
+    # in O(|height difference|), and _split, which cuts a tree in two around a key in O(log n). union, intersection
+    # and difference then cost O(m log(n/m + 1)) for trees of sizes m <= n, which is O(m) when the sizes are close
+    # and O(log n) when one side is tiny, instead of one O(log n) insert or delete per key
+#-----------------------------------------------------------------------------------------------------------------------
+    # splits the tree into two new trees of the same type, the keys smaller than key and the keys from key up.
+    # The nodes are moved over, not copied, so this tree ends up empty
+    def split(self, key: K) -> Tuple[AVLTree[K, V], AVLTree[K, V]]:
+        less, greater = self._split(self._root, key)
+        self._root = None
+        return self._with_root(less), self._with_root(greater)
+#-----------------------------------------------------------------------------------------------------------------------
+    # the opposite of split, makes one tree out of left, the pair and right. Every key in left has to be <= key
+    # and every key in right >= key. Both trees' nodes are moved into the new one, so they end up empty
+    @classmethod
+    def join(cls, left: AVLTree[K, V], key: K, value: V, right: AVLTree[K, V]) -> AVLTree[K, V]:
+        left._check_in_place()
+        right._check_in_place()
+        if left._root is not None and key < left.top_k(1)[0][0]:
+            raise ValueError(f"Every key in the left tree has to be <= {key}.")
+        if right._root is not None and right.bottom_k(1)[0][0] < key:
+            raise ValueError(f"Every key in the right tree has to be >= {key}.")
+        tree = cls()
+        tree._root = tree._join(left._root, tree._node_type(key, value), right._root)
+        left._root = right._root = None
+        return tree
+#-----------------------------------------------------------------------------------------------------------------------
+    # adds every entry of other to this tree. other is left alone, its nodes are copied as they're needed.
+    # Keys in both trees end up in both versions, with this tree's entries first like insert does
+    def union(self, other: AVLTree[K, V]) -> None:
+        self._root = self._union(self._root, self._other_root(other), copy_other=other is not self)
+#-----------------------------------------------------------------------------------------------------------------------
+    # keeps only the entries whose key is also somewhere in other (this tree's values, every one of them if the key
+    # is here more than once). other is only read
+    def intersection(self, other: AVLTree[K, V]) -> None:
+        self._root = self._intersection(self._root, self._other_root(other))
+#-----------------------------------------------------------------------------------------------------------------------
+    # drops every entry whose key is somewhere in other. other is only read
+    def difference(self, other: AVLTree[K, V]) -> None:
+        self._root = self._difference(self._root, self._other_root(other))
+#-----------------------------------------------------------------------------------------------------------------------
+    # inserts a batch of (key, value) pairs in any order: one sort, an O(m) build, then a union.
+    # Equal keys end up after the ones already in the tree and in batch order among themselves, same as inserting one by one
+    def insert_many(self, pairs: Iterable[Tuple[K, V]]) -> None:
+        nodes = [self._node_type(key, value) for key, value in sorted(pairs, key=itemgetter(0))]
+        self._root = self._union(self._root, self._link(nodes, 0, len(nodes)), copy_other=False)
+#-----------------------------------------------------------------------------------------------------------------------
+    # removes every entry whose key is in keys (all of them if a key is in the tree more than once) and gives back
+    # how many went. Keys that aren't in the tree are skipped, unlike delete which raises
+    def delete_many(self, keys: Iterable[K]) -> int:
+        size = self.size()
+        doomed = AVLTree.from_sorted((key, None) for key in sorted(keys))  # plain nodes, only their keys are read
+        self._root = self._difference(self._root, doomed._root)
+        return size - self.size()
+#-----------------------------------------------------------------------------------------------------------------------
+    # called on a tree before an operation takes its nodes away or rewires them. Every AVLTree can be changed in place,
+    # PersistentAVLTree raises TypeError here so the check happens before anything has moved
+    def _check_in_place(self) -> None:
+        pass
+#-----------------------------------------------------------------------------------------------------------------------
+    # a new, empty tree of the same type wrapped around a root
+    def _with_root(self, root: Optional[AVLNode]) -> AVLTree[K, V]:
+        tree = type(self)()
+        tree._root = root
+        return tree
+#-----------------------------------------------------------------------------------------------------------------------
+    # the root of other to read from. A tree combined with itself would be rewired while it's still being read, so it
+    # gets a copy of itself instead
+    def _other_root(self, other: AVLTree[K, V]) -> Optional[AVLNode]:
+        return self._copy_subtree(other._root) if other is self else other._root
+#-----------------------------------------------------------------------------------------------------------------------
+    # a node for node copy of a subtree. Heights, counts and any extra data subclasses keep on their nodes come along
+    def _copy_subtree(self, node: Optional[AVLNode]) -> Optional[AVLNode]:
+        if node is None:
+            return None
+        clone = copy.copy(node)
+        clone._left = self._copy_subtree(node._left)
+        clone._right = self._copy_subtree(node._right)
+        return clone
+#-----------------------------------------------------------------------------------------------------------------------
+    # hangs left and right off node. If one side is more than one level taller, walk down its inner spine to a
+    # subtree about as tall as the other side, join there, and rebalance on the way back up. O(height difference)
+    def _join(self, left: Optional[AVLNode], node: AVLNode, right: Optional[AVLNode]) -> AVLNode:
+        left_height, right_height = self._node_height(left), self._node_height(right)
+        if left_height > right_height + 1:
+            left._right = self._join(left._right, node, right)
+            return self._rebalance(left)
+        if right_height > left_height + 1:
+            right._left = self._join(left, node, right._left)
+            return self._rebalance(right)
+        node._left, node._right = left, right
+        self._update(node)
+        return node
+#-----------------------------------------------------------------------------------------------------------------------
+    # join without a middle node, the smallest node on the right is taken out and used as one
+    def _join2(self, left: Optional[AVLNode], right: Optional[AVLNode]) -> Optional[AVLNode]:
+        if left is None:
+            return right
+        if right is None:
+            return left
+        right, smallest = self._pop_min(right)
+        return self._join(left, smallest, right)
+#-----------------------------------------------------------------------------------------------------------------------
+    # unhooks the smallest node of a subtree, giving back the rebalanced rest and the node
+    def _pop_min(self, node: AVLNode) -> Tuple[Optional[AVLNode], AVLNode]:
+        if node._left is None:
+            return node._right, node
+        node._left, smallest = self._pop_min(node._left)
+        return self._rebalance(node), smallest
+#-----------------------------------------------------------------------------------------------------------------------
+    # cuts a subtree into the keys below key and the keys from key up (with ties_left, the keys up to and including
+    # key and the keys above it). Each level joins what it keeps onto the part that came back from below, and
+    # those joins add up to O(log n) in total
+    def _split(self, node: Optional[AVLNode], key: K, ties_left: bool = False) -> Tuple[Optional[AVLNode], Optional[AVLNode]]:
+        if node is None:
+            return None, None
+        left, right = node._left, node._right
+        if key < node._key or (not ties_left and not node._key < key):  # node and its right side go right
+            less, greater = self._split(left, key, ties_left)
+            return less, self._join(greater, node, right)
+        less, greater = self._split(right, key, ties_left)
+        return self._join(left, node, less), greater
+#-----------------------------------------------------------------------------------------------------------------------
+    # like _split, but the nodes with exactly this key are taken out into equal (in order) instead of going to a side
+    def _split_out(self, node: Optional[AVLNode], key: K, equal: List[AVLNode]) -> Tuple[Optional[AVLNode], Optional[AVLNode]]:
+        if node is None:
+            return None, None
+        left, right = node._left, node._right
+        if key < node._key:
+            less, greater = self._split_out(left, key, equal)
+            return less, self._join(greater, node, right)
+        if node._key < key:
+            less, greater = self._split_out(right, key, equal)
+            return self._join(left, node, less), greater
+        less, _ = self._split_out(left, key, equal)  # equal keys can sit on both sides, left of it is all <= key
+        equal.append(node)
+        _, greater = self._split_out(right, key, equal)
+        return less, greater
+#-----------------------------------------------------------------------------------------------------------------------
+    # splits our side around the other side's root, recurses on both halves and joins them back with that root
+    # (copied when it belongs to another tree). Ties go left so our entries stay in front of the other's
+    def _union(self, node: Optional[AVLNode], other: Optional[AVLNode], copy_other: bool) -> Optional[AVLNode]:
+        if other is None:
+            return node
+        if node is None:
+            return self._copy_subtree(other) if copy_other else other
+        other_left, other_right = other._left, other._right
+        less, greater = self._split(node, other._key, ties_left=True)
+        left = self._union(less, other_left, copy_other)
+        right = self._union(greater, other_right, copy_other)
+        return self._join(left, copy.copy(other) if copy_other else other, right)
+#-----------------------------------------------------------------------------------------------------------------------
+    def _intersection(self, node: Optional[AVLNode], other: Optional[AVLNode]) -> Optional[AVLNode]:
+        if node is None or other is None:
+            return None
+        equal: List[AVLNode] = []
+        less, greater = self._split_out(node, other._key, equal)
+        left = self._intersection(less, other._left)
+        right = self._intersection(greater, other._right)
+        if equal:  # the key is in both trees, so all of our entries for it stay
+            left = self._join2(left, self._link(equal, 0, len(equal)))
+        return self._join2(left, right)
+#-----------------------------------------------------------------------------------------------------------------------
+    def _difference(self, node: Optional[AVLNode], other: Optional[AVLNode]) -> Optional[AVLNode]:
+        if node is None or other is None:
+            return node
+        less, greater = self._split_out(node, other._key, [])  # the entries with the other root's key are dropped
+        return self._join2(self._difference(less, other._left), self._difference(greater, other._right))
+#-----------------------------------------------------------------------------------------------------------------------
+    # writes the keys and values in sorted order to a binary snapshot (see datastructures/snapshot.py for the layout)
+    def save(self, path: str) -> None:
+        write_snapshot(path, self._snapshot_kind, self._snapshot_sections())
+#-----------------------------------------------------------------------------------------------------------------------
+    # reads a snapshot back. The nodes come out already sorted, so they're linked into a balanced tree in O(n)
+    # with no comparisons or rotations at all
+    @classmethod
+    def load(cls, path: str) -> AVLTree[K, V]:
+        tree = cls()
+        with paused_gc(), open_snapshot(path, cls._snapshot_kind) as sections:
+            nodes = tree._nodes_from_snapshot(sections)
+            tree._root = tree._link(nodes, 0, len(nodes))
+        return tree
+#-----------------------------------------------------------------------------------------------------------------------
+    # the sections save() writes, subclasses with more data on their nodes add to these
+    def _snapshot_sections(self) -> List[bytes]:
+        nodes = list(self._iter_nodes())
+        return [pack_keys([node._key for node in nodes]), pack_values([node._value for node in nodes])]
+#-----------------------------------------------------------------------------------------------------------------------
+    def _nodes_from_snapshot(self, sections: List[memoryview]) -> List[AVLNode]:
+        keys, values = unpack_keys(sections[0]), unpack_values(sections[1])
+        return [self._node_type(key, value) for key, value in zip(keys, values)]
+#-----------------------------------------------------------------------------------------------------------------------
+# How we insert key value pairs into the tree. This walks down with a loop instead of recursing and keeps the
+# nodes it passed in a list (the path), then goes back up that list to fix heights and balance
     def insert(self, key: K, value: V) -> None:
-        self._root = self.insert_helper(self._root, key, value)
+        self._insert_node(self._node_type(key, value))
+#-----------------------------------------------------------------------------------------------------------------------
+    # hangs an already made node off the bottom of the tree, then retraces the path back to the root
+    def _insert_node(self, new_node: AVLNode) -> None:
+        if self._root is None:  # empty tree, the new node is the whole tree
+            self._root = new_node
+            return
+
+        path: List[AVLNode] = []
+        node: Optional[AVLNode] = self._root
+        key = new_node._key
+        while node is not None:  # same rule as insert_helper, smaller goes left and everything else goes right
+            path.append(node)
+            node = node._left if key < node._key else node._right
+
+        parent = path[-1]
+        if key < parent._key:
+            parent._left = new_node
+        else:
+            parent._right = new_node
+
+        self._retrace(path)
+#-----------------------------------------------------------------------------------------------------------------------
+    # walks a root-to-node path from the bottom back up, rebalancing each node and hooking whatever subtree
+    # came back onto its parent. Once a subtree ends up the same height it was before, nothing above it can
+    # be out of balance anymore, so the rest of the way up only the counts need refreshing
+    def _retrace(self, path: List[AVLNode]) -> None:
+        settled = False
+        for index in range(len(path) - 1, -1, -1):
+            node = path[index]
+            if settled:
+                self._update(node)
+                continue
+
+            old_height = node._height
+            new_subtree = self._rebalance(node)
+            if new_subtree is not node:  # a rotation happened, the parent has to point at the new subtree root
+                self._replace_child(path[index - 1] if index else None, node, new_subtree)
+            settled = new_subtree._height == old_height
+#-----------------------------------------------------------------------------------------------------------------------
+    # swaps old_child for new_child under parent, a parent of None means old_child was the root
+    def _replace_child(self, parent: Optional[AVLNode], old_child: AVLNode, new_child: Optional[AVLNode]) -> None:
+        if parent is None:
+            self._root = new_child
+        elif parent._left is old_child:
+            parent._left = new_child
+        else:
+            parent._right = new_child
 #-----------------------------------------------------------------------------------------------------------------------
     # LC: Added two helper functions to make getting the node height and balance
     # factors less verbose when you need them in the insert code.
@@ -62,6 +388,16 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
     def _node_height(self, node: Optional[AVLNode]) -> int:
         return node._height if node else 0
 
+#-----------------------------------------------------------------------------------------------------------------------
+    # subtree count of a node, 0 for an empty spot, same idea as _node_height
+    def _node_size(self, node: Optional[AVLNode]) -> int:
+        return node._size if node else 0
+#-----------------------------------------------------------------------------------------------------------------------
+    # recomputes the height and subtree count of a node from its children, every place that changes
+    # a node's children has to call this so that size(), rank() and select() stay correct
+    def _update(self, node: AVLNode) -> None:
+        node._height = 1 + max(self._node_height(node._left), self._node_height(node._right))
+        node._size = 1 + self._node_size(node._left) + self._node_size(node._right)
 #-----------------------------------------------------------------------------------------------------------------------
     def _balance_factor(self, node: AVLNode) -> int:
         return self._node_height(node._left) - self._node_height(node._right) if node else 0
@@ -70,7 +406,7 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
 
         if node is None:  # if the current node is empty, make one!
 
-            return AVLNode(key, value)
+            return self._node_type(key, value)
 
         elif key < node.key:  # if a node exists, and the key is less than the current node's key, THEN insert into the left subtree
 
@@ -80,70 +416,29 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
             node._right = self.insert_helper(node._right, key, value)
 
 
-        # LC: Changing to use the _node_height() function
-        max_height = max(self._node_height(node._left),
-                         self._node_height(node._right))
-
-        node._height = 1 + max_height
-
-        # I'm hoping that this is balancing the tree
-
-        # left heavy case?
-
-        # if the left node exists, if it doesn't return 0, but if it does, get the height and then subtract the height of the right side (if it exists), and if that is greater than 1, its unbalanced to the left
-    # -------------------------------------------------------------------------------
-        # LL Problem
-
-        # if (node._left._height if node._left else 0) - (node._right._height if node._right else 0) > 1:
-        # LC: Rewriting the LL case to use the balance_factor() function
-        if self._balance_factor(node) > 1 and node._left and self._balance_factor(node._left) >= 0:
-            return self.rotate_right(node)
-
-            # left_child = node._left  # assign left_child to be the left,node
-            # right_child = node._right  # assign the right child ot be the right.nod
-
-            # # if the left.node exists, get the height of the tree to the left of the child and subtract thhe height of the tree to the right of the left child, and if that is greaters than or equal to 0, then we need to flip
-            # if (left_child._left._height if node._left else 0) - (left_child._right._height if node._right else 0) >= 0:
-            #     return self.rotate_right(node)  # we do a rotate right
-    # -------------------------------------------------------------------------------
-        # RR case
-
-        # LC: Rewriting the RR case to use the balance_factor() function
-        if self._balance_factor(node) < -1 and node._right and self._balance_factor(node._right) <= 0:
-            return self.rotate_left(node)
-
-        # if (node._left._height if node._left else 0) - (node._right._height if node._right else 0) < -1:
-
-        #     # we assign the left child to be the things to left of our given node
-        #     left_child = node._left
-
-        #     # we assign the right child to be the thing to the right of our given node
-        #     right_child = node._right
-
-        #     # if there is something to the left of the main node, look to the right child and get the height of the tree to the left, and then do that same thing to the right side, and subtract the values, and if that value is less than or equal to 0
-
-        #     if (right_child._left._height if node._left else 0) - (right_child._right._height if node._right else 0) <= 0:
-
-        #         return self.rotate_left(node)  # rotate left
-    # -------------------------------------------------------------------------------
-        # LR Case
-        # LC: Rewriting the LR case to use the balance_factor() function
-        if self._balance_factor(node) > 1 and node._left and self._balance_factor(node._left) < 0:
-            node._left = self.rotate_left(node._left)
+        # updates the height and subtree count and fixes the balance on the way back up
+        return self._rebalance(node)
+#-----------------------------------------------------------------------------------------------------------------------
+    # updates a node and then does whichever of the four rotations it needs (if any), giving back the root
+    # of the subtree afterwards. insert_helper, delete_helper and the path retrace all share this
+    def _rebalance(self, node: AVLNode) -> AVLNode:
+        self._update(node)
+        balance = self._balance_factor(node)
+
+        if balance > 1:  # left heavy
+            # LR case, the left child leans right so straighten it out first
+            if node._left and self._balance_factor(node._left) < 0:
+                node._left = self.rotate_left(node._left)
+            # LL case (or the second half of LR)
             return self.rotate_right(node)
 
-        # RL case
-        # LC: Rewriting the RL case to use the balance_factor function()
-        if self._balance_factor(node) < -1 and node._right and self._balance_factor(node._right) > 0:
-            node._right = self.rotate_right(node._right)
+        if balance < -1:  # right heavy
+            # RL case, the right child leans left so straighten it out first
+            if node._right and self._balance_factor(node._right) > 0:
+                node._right = self.rotate_right(node._right)
+            # RR case (or the second half of RL)
             return self.rotate_left(node)
 
-            # if the value is not less than or equal to zero, rotate right
-            # if (node._left._height if node._left else 0) - (node._right._height if node._right else 0) > 0:
-            #     node.__right = self.rotate_right(right_child)
-
-            #     return self.rotate_left(node)
-
         # LC: no rotations needed
         return node
 #-----------------------------------------------------------------------------------------------------------------------
@@ -165,19 +460,9 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
         # and now the thing we called our subtree (aka the node ot the right of our left child) and that is now becoming the thing to the left of our given node
         node._left = right_subtree
 
-        node._height = 1 + max(  # this gets the height relative to the given node by looking to the left and right, getting their heights and then picking the max
-
-            # LC: changed to use _node_height() function
-            self._node_height(node._left),
-            self._node_height(node._right)
-        )
-
-        new_root._height = 1 + max(  # this is finding the height of the left side, children and all by getting the heights if the left and right children and then getting the one thats the tallest
-
-            # LC: changed to use _node_height() function
-            self._node_height(new_root._left),
-            self._node_height(new_root._right)
-        )
+        # the old root is now a child so it gets updated first, then the new root on top of it (heights and counts)
+        self._update(node)
+        self._update(new_root)
 
         return new_root
 #-----------------------------------------------------------------------------------------------------------------------
@@ -195,17 +480,23 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
         new_root._left = node
         node._right = new_left_subtree
 
-        # LC: changed to use _node_height_function.
-        node._height = 1 + max(self._node_height(node._left), self._node_height(node._right))
-
-        # LC: changed to use _node_height_function.
-        new_root._height = 1 + max(self._node_height(new_root._left), self._node_height(new_root._right))
+        # same order as rotate_right, child first then the new root
+        self._update(node)
+        self._update(new_root)
 
         return new_root
 #-----------------------------------------------------------------------------------------------------------------------
-# a fuction that sits pretty until it gets called
+# a fuction that sits pretty until it gets called, walks down with a loop so there's no recursion per level
     def search(self, key: K) -> V | None:
-        return self.search_helper(self._root, key)
+        node = self._root
+        while node is not None:
+            if key < node._key:
+                node = node._left
+            elif node._key < key:
+                node = node._right
+            else:  # neither smaller nor bigger, found it
+                return node._value
+        return None
 #-----------------------------------------------------------------------------------------------------------------------
 # a helper function that does all of the actual work
     def search_helper(self, node: Optional[AVLNode], key: K) -> Optional[V]:
@@ -222,17 +513,103 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
         elif key < node._key:
 
             # call the function again, to check and see if the node we landed on is the one associated with the key,
-            self.search_helper(node._left, key)
+            return self.search_helper(node._left, key)
 
         else:  # if the node isn't what we are looking for, and isn't less than the node, than it must be larger, so we look to the right and call the search function again to see if the node we landed on is the one we are looking for
 
-            self.search_helper(node._right, key)
+            return self.search_helper(node._right, key)
 #-----------------------------------------------------------------------------------------------------------------------
-# pretty helper function that calls the helper
+# deleting also walks down with a loop and remembers the path, then _delete_at does the unhooking
 
     def delete(self, key: K) -> None:
+        path: List[AVLNode] = []
+        node = self._root
+        while node is not None:
+            path.append(node)
+            if key < node._key:
+                node = node._left
+            elif node._key < key:
+                node = node._right
+            else:
+                break
+
+        if node is None:  # fell off the bottom, so the key was never there
+            raise KeyError(f"Key {key} not found in the tree.")
+
+        self._delete_at(path)
+#-----------------------------------------------------------------------------------------------------------------------
+    # like delete, but when several entries share the key it removes the one holding this value (the same
+    # object, or failing that an equal one). Raises KeyError if there's no such entry
+    def remove(self, key: K, value: V) -> None:
+        path = self._find_path(key, lambda node: node._value is value) or self._find_path(key, lambda node: node._value == value)
+        if path is None:
+            raise KeyError(f"Key {key} with value {value!r} not found in the tree.")
+        self._delete_at(path)
+#-----------------------------------------------------------------------------------------------------------------------
+    # finds the root-to-node path of a node with this key that match() says yes to, or None if there isn't one.
+    # Equal keys can end up on either side of each other after rotations, so once the keys tie this has to
+    # look down both sides instead of just one
+    def _find_path(self, key: K, match: Callable[[AVLNode], bool]) -> Optional[List[AVLNode]]:
+        path: List[AVLNode] = []
+        node = self._root
+        while node is not None:  # the normal walk down until we reach the first node with an equal key
+            path.append(node)
+            if key < node._key:
+                node = node._left
+            elif node._key < key:
+                node = node._right
+            else:
+                break
+        if node is None:
+            return None
+
+        pending = [path]  # each entry is a full path so the winner can be handed straight to _delete_at
+        while pending:
+            path = pending.pop()
+            node = path[-1]
+            if key < node._key:
+                children = (node._left,)
+            elif node._key < key:
+                children = (node._right,)
+            else:
+                if match(node):
+                    return path
+                children = (node._left, node._right)
+            for child in children:
+                if child is not None:
+                    pending.append(path + [child])
+        return None
+#-----------------------------------------------------------------------------------------------------------------------
+    # removes the last node on a root-to-node path. A node with two children is replaced by its in-order
+    # successor (the node itself moves, not just its key and value) so that any extra data on the node goes with it
+    def _delete_at(self, path: List[AVLNode]) -> None:
+        node = path[-1]
+        index = len(path) - 1
+
+        if node._left is None or node._right is None:  # zero or one child, the child (or None) takes its spot
+            path.pop()
+            self._replace_child(path[-1] if path else None, node, node._left if node._left else node._right)
+        else:
+            # find the minimum successor, remembering the way down so it gets rebalanced too
+            successor = node._right
+            path.append(successor)
+            while successor._left is not None:
+                successor = successor._left
+                path.append(successor)
+            path.pop()
+
+            # the successor has no left child, so its right child takes its old spot
+            self._replace_child(path[-1], successor, successor._right)
+
+            # and then the successor takes the deleted node's spot
+            successor._left = node._left
+            successor._right = node._right
+            successor._height = node._height  # keeps the old height so the retrace can tell when it's settled
+            self._replace_child(path[index - 1] if index else None, node, successor)
+            path[index] = successor
+
+        self._retrace(path)
 
-        self.root = self.delete_helper(self.root, key)
 # thea single helper function that works to two jobs, loves its kids and never stops!
 
 #-----------------------------------------------------------------------------------------------------------------------
@@ -263,41 +640,12 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
                 node._key = successor.key  # replacing the the node key with the key of the sucessor
                 
                 # replacing the node value with the value of the sucessor
-                node._value = successor.value
+                node._value = successor._value
                 node._right = self.delete_helper(
                     node._right, successor._key)  # delete the sucessor
 
-        # update the height of our tree
-
-        node.height = 1 + max(node._left._height if node._left else 0,
-                          node._right._height if node._right else 0) - 1
-
-        # check the tree to see if its unbalanced
-
-        # checking to see if its balanced, and if the heights are greater than one
-        if (node._left._height if node._left else 0) - (node._right._height if node._right else 0) > 1:
-            left_child = node._left  # then label the children
-            right_child = node._right
-
-            # and if the height of the left child is greater than the rights, then we need to rotate
-            if (left_child._left._height if left_child._left else 0) - (left_child._right._height if left_child._right else 0) >= 0:
-                return self.rotate_right(node)
-            else:  # if the right child is taller than the left, rotate
-                node._left = self.rotate_left(left_child)
-                return self.rotate_right(node)
-
-        elif (node._left._height if node._left else 0) - (node._right._height if node._right else 0) < -1:
-            left_child = node._left
-            right_child = node._right
-
-            # if the tree is unbalanced the other way, correct it!
-            if (right_child._left._height if right_child._left else 0) - (right_child._right._height if right_child._right else 0) <= 0:
-                return self.rotate_left(node)
-            else:
-                node._right = self.rotate_right(right_child)
-                return self.rotate_left(node)
-
-        return node
+        # update the height and subtree count of our tree and check to see if its unbalanced
+        return self._rebalance(node)
 
      # this SHOULD (emphasis on should) find the smallest key in the tree
 #-----------------------------------------------------------------------------------------------------------------------
@@ -307,101 +655,222 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
             node = node._left  # assign this leftmost node to the given node
         return node
 
-     # this is AN attempt at traversing an AVL tree in order
+     # the list traversals below are all built on the lazy iterators further down, so they never recurse
 #-----------------------------------------------------------------------------------------------------------------------
+    # in-order gives the keys sorted, calling visit on each value along the way if one is given
     def inorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
-        keys = []  # this collects the keys for later reference
-        self.inorder_helper(self._root, keys)
-        return keys
-
-     # the helper that does all the work, kind of
-#-----------------------------------------------------------------------------------------------------------------------
-    def inorder_helper(self, node: Optional[AVLNode], keys: List[K]) -> None:
-        if node is None:  # base case, nothing exists
-            return None
-
-        # visit the left tree and put stuff there
-        self.inorder_helper(node._left, keys)
-
-        keys.append(node._key)  # go back to the given node
-
-        # go down the right side and put nodes there
-        self.inorder_helper(node._right, keys)
+        return self._collect(self.iter_inorder(), visit)
 #-----------------------------------------------------------------------------------------------------------------------
 # trying to preorder stuff like its limited edition
 
     def preorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
-        keys = []  # collecting keys
-        self.preorder_helper(self._root, keys)
-        return keys
-
-     # the helper that does all the work
-#-----------------------------------------------------------------------------------------------------------------------
-    def preorder_helper(self, node: Optional[AVLNode], keys: List[K]) -> None:
-        if node is None:  # base case is that nothing is anywhere ever
-            return None
-
-        keys.append(node._key)  # go to the given node
-
-        self.preorder_helper(node._left, keys)  # go down the left tree
-        self.preorder_helper(node._right, keys)  # go down the right tree
+        return self._collect(self.iter_preorder(), visit)
 #-----------------------------------------------------------------------------------------------------------------------
 # post order stuff
 
     def postorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
-        keys = []  # KEYS ARE MINE
-        self.postorder_helper(self._root, keys)
-        return keys
-#-----------------------------------------------------------------------------------------------------------------------
-# the post order helper
-
-    def postorder_helper(self, node: Optional[AVLNode], keys: List[K]) -> None:
-        if node is None:  # your classic base case
-            return None
-
-        # we literally just go the opposite way of the pre-order
-        self.postorder_helper(node._left, keys)
-        self.postorder_helper(node._right, keys)
-
-        keys.append(node._key)
+        return self._collect(self.iter_postorder(), visit)
 #-----------------------------------------------------------------------------------------------------------------------
 # Breadth-first attempt
 
     def bforder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
-        keys = []  # a list for keys
-        queue = []  # a queue
-        self.bforder_helper(queue, self._root, keys)
+        return self._collect(self.iter_bforder(), visit)
+#-----------------------------------------------------------------------------------------------------------------------
+    # turns a stream of (key, value) pairs into the list of keys, calling visit on every value
+    def _collect(self, pairs: Iterator[Tuple[K, V]], visit: Optional[Callable[[V], None]]) -> List[K]:
+        keys: List[K] = []
+        for key, value in pairs:
+            if visit is not None:
+                visit(value)
+            keys.append(key)
         return keys
 #-----------------------------------------------------------------------------------------------------------------------
-# the helper helper helper helper , help helper and help aren't words anymore
-
-    def bforder_helper(self, queue:  List[Optional[AVLNode]], node: Optional[AVLNode], keys: List[K]) -> None:
-        if node is not None:  # if the node exists, append it to the list
-            queue.append(node)
-        
-        while queue:  # while the list is a thing, run
-            current = queue[0]  # take the first node
-            keys.append(current._key)  # visit the current node
-            queue = queue[1:]  # Remove the first node from the list
-            
-            if current._left is not None:  # put the left child, if it exists, into the list
+    # yields the nodes in sorted order (or backwards when reverse is True). The stack only ever holds one
+    # root-to-leaf path, so it stays O(log n) no matter how big the tree is
+    def _iter_nodes(self, reverse: bool = False) -> Iterator[AVLNode]:
+        stack: List[AVLNode] = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:  # keep going down the near side, remembering the way back
+                stack.append(node)
+                node = node._right if reverse else node._left
+            else:  # nothing left on the near side, so this one is next, then do its far side
+                node = stack.pop()
+                yield node
+                node = node._left if reverse else node._right
+#-----------------------------------------------------------------------------------------------------------------------
+    # lazy in-order traversal, yields (key, value) pairs in sorted order without building a list
+    def iter_inorder(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        for node in self._iter_nodes(reverse):
+            yield node._key, node._value
+#-----------------------------------------------------------------------------------------------------------------------
+    # same as iter_inorder, named like dict.items() for code that just wants every pair in key order
+    def iter_items(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        return self.iter_inorder(reverse)
+#-----------------------------------------------------------------------------------------------------------------------
+    # lazy pre-order, a node comes out before either of its subtrees
+    def iter_preorder(self) -> Iterator[Tuple[K, V]]:
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node._key, node._value
+            if node._right is not None:  # right goes on first so the left comes off the stack first
+                stack.append(node._right)
+            if node._left is not None:
+                stack.append(node._left)
+#-----------------------------------------------------------------------------------------------------------------------
+    # lazy post-order, a node comes out after both of its subtrees. last remembers the node we just finished
+    # so we can tell if we're coming back up from the right side or still need to go down it
+    def iter_postorder(self) -> Iterator[Tuple[K, V]]:
+        stack: List[AVLNode] = []
+        last: Optional[AVLNode] = None
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+                continue
+            top = stack[-1]
+            if top._right is not None and top._right is not last:  # the right side hasn't been done yet
+                node = top._right
+            else:
+                stack.pop()
+                yield top._key, top._value
+                last = top
+#-----------------------------------------------------------------------------------------------------------------------
+    # lazy breadth-first (level order), a deque makes taking from the front O(1) instead of copying the list
+    def iter_bforder(self) -> Iterator[Tuple[K, V]]:
+        queue: Deque[AVLNode] = deque([self._root] if self._root is not None else [])
+        while queue:
+            current = queue.popleft()
+            yield current._key, current._value
+            if current._left is not None:  # put the left child, if it exists, into the queue
                 queue.append(current._left)
-            if current._right is not None:  # put the right child, if it exists, into the list
+            if current._right is not None:  # put the right child, if it exists, into the queue
                 queue.append(current._right)
+#-----------------------------------------------------------------------------------------------------------------------
+    # yields the (key, value) pairs with lo <= key <= hi in sorted order (or backwards with reverse=True).
+    # inclusive says whether each end counts, and None for either end means there's no bound on that side.
+    # It only goes down to the first key in range and stops at the first key past the end, so it costs
+    # O(log n + k) for k results instead of looking at every node
+    def irange(self, lo: Optional[K] = None, hi: Optional[K] = None, inclusive: Tuple[bool, bool] = (True, True),
+               reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        for node in self._irange_nodes(lo, hi, inclusive, reverse):
+            yield node._key, node._value
+#-----------------------------------------------------------------------------------------------------------------------
+    # does the work for irange but gives back the nodes themselves so other methods can reuse it
+    def _irange_nodes(self, lo: Optional[K], hi: Optional[K], inclusive: Tuple[bool, bool] = (True, True),
+                      reverse: bool = False) -> Iterator[AVLNode]:
+        lo_inclusive, hi_inclusive = inclusive
+
+        def above_lo(key: K) -> bool:  # is the key on the right side of the lower bound
+            if lo is None:
+                return True
+            return not key < lo if lo_inclusive else lo < key
+
+        def below_hi(key: K) -> bool:  # is the key on the right side of the upper bound
+            if hi is None:
+                return True
+            return not hi < key if hi_inclusive else key < hi
+
+        # the bound we start from and the bound that tells us to stop depend on the direction
+        starts_in, stops_in = (below_hi, above_lo) if reverse else (above_lo, below_hi)
+
+        # go down to the first key in range, keeping the nodes we'll still need to come back to on the stack
+        stack: List[AVLNode] = []
+        node = self._root
+        while node is not None:
+            if starts_in(node._key):
+                stack.append(node)
+                node = node._right if reverse else node._left
+            else:  # this node and its near side are all out of range
+                node = node._left if reverse else node._right
+
+        # then it's a normal in-order walk that quits as soon as it passes the other end
+        while stack:
+            node = stack.pop()
+            if not stops_in(node._key):
+                return
+            yield node
+            node = node._left if reverse else node._right
+            while node is not None:
+                stack.append(node)
+                node = node._right if reverse else node._left
+#-----------------------------------------------------------------------------------------------------------------------
+    # the k largest (key, value) pairs, biggest first. The reverse walk stops after k items, so it's O(log n + k)
+    def top_k(self, k: int) -> List[Tuple[K, V]]:
+        return list(islice(self.iter_inorder(reverse=True), max(k, 0)))
+#-----------------------------------------------------------------------------------------------------------------------
+    # the k smallest (key, value) pairs, smallest first
+    def bottom_k(self, k: int) -> List[Tuple[K, V]]:
+        return list(islice(self.iter_inorder(), max(k, 0)))
+#-----------------------------------------------------------------------------------------------------------------------
+    # lets you write "for key in tree" and len(tree) like with a dict
+    def __iter__(self) -> Iterator[K]:
+        for node in self._iter_nodes():
+            yield node._key
+#-----------------------------------------------------------------------------------------------------------------------
+    def __reversed__(self) -> Iterator[K]:
+        for node in self._iter_nodes(reverse=True):
+            yield node._key
+#-----------------------------------------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self.size()
 
-     # should return the size of the tree
+     # should return the size of the tree, the root keeps the count of the whole tree so this is O(1)
 #-----------------------------------------------------------------------------------------------------------------------
     def size(self) -> int:
-        return self.size_helper(self.root)
-
-     # helper function for size of tree
+        return self._node_size(self._root)
 #-----------------------------------------------------------------------------------------------------------------------
-    def size_helper(self, node: Optional[AVLNode]) -> int:
-        if node is None:  # if nothing exists, return 0
-            return 0
-
-        # Count current node and children
-        return 1 + self.size_helper(node._left) + self.size_helper(node._right)
+    # rank is how many keys in the tree are strictly smaller than the given key (the key doesn't have to be in the tree),
+    # or smaller or equal when inclusive is True
+    def rank(self, key: K, inclusive: bool = False) -> int:
+        smaller = 0
+        node = self._root
+        while node is not None:
+            if node._key < key or (inclusive and not key < node._key):  # this node and everything on its left count, go right
+                smaller += self._node_size(node._left) + 1
+                node = node._right
+            else:  # the key is to the left
+                node = node._left
+        return smaller
+#-----------------------------------------------------------------------------------------------------------------------
+    # select is the opposite of rank, it gives back the (key, value) pair at a 0-based position of the sorted order
+    def select(self, index: int) -> Tuple[K, V]:
+        if index < 0 or index >= self.size():
+            raise IndexError(f"Index {index} out of range for a tree of size {self.size()}.")
+        node = self._root
+        while node is not None:
+            left_size = self._node_size(node._left)
+            if index < left_size:  # it's somewhere on the left
+                node = node._left
+            elif index > left_size:  # skip the left side and this node and keep looking on the right
+                index -= left_size + 1
+                node = node._right
+            else:  # exactly left_size nodes come before this one, so this is it
+                return node._key, node._value
+        raise IndexError(f"Index {index} out of range.")  # only reachable if the counts are broken
+#-----------------------------------------------------------------------------------------------------------------------
+    # quantile takes a fraction between 0 and 1 (0.5 is the median) and gives back the (key, value) at that spot,
+    # using the nearest rank (index ceil(p * n) - 1, so 0.5 of 4 keys is the 2nd) and 1.0 is the largest key,
+    # returns None on an empty tree
+    def quantile(self, p: float) -> Optional[Tuple[K, V]]:
+        if not 0 <= p <= 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {p}.")
+        if self._root is None:
+            return None
+        return self.select(max(0, math.ceil(p * self.size()) - 1))
+#-----------------------------------------------------------------------------------------------------------------------
+    # starts counting comparisons, rotations and nodes visited per query on this tree (see datastructures/metrics.py).
+    # Passing in a TreeMetrics keeps adding to it, otherwise a fresh one is made. Gives back the metrics
+    def enable_metrics(self, metrics: Optional[TreeMetrics] = None) -> TreeMetrics:
+        self._metrics = instrument_tree(self, metrics if metrics is not None else TreeMetrics())
+        return self._metrics
+#-----------------------------------------------------------------------------------------------------------------------
+    # back to the plain, uncounted methods
+    def disable_metrics(self) -> None:
+        uninstrument(self, TREE_METHODS)
+        self._metrics = None
 
     # LC: added to help with debugging
 #-----------------------------------------------------------------------------------------------------------------------
@@ -422,5 +891,6 @@ class AVLTree(IAVLTree[K, V], Generic[K, V]):
                         'In-order: ', 'Pre-order: ', 'Post-order: ']
         traversals = [self.bforder(), self.inorder(),
                       self.preorder(), self.postorder()]
-        return f'{"\n".join([f'{desc} {"".join(str(trav))}' for desc, trav in zip(descriptions, traversals)])}\n\n{str(self)}'
+        lines = [f'{desc} {"".join(str(trav))}' for desc, trav in zip(descriptions, traversals)]
+        return '\n'.join(lines) + f'\n\n{str(self)}'
         
\ No newline at end of file
@@ -0,0 +1,662 @@
+"""
+A disk-backed B+ tree for ordered data that doesn't fit in memory as Python objects.
+
+Every entry lives in a leaf, and the leaves are linked both ways, so range scans and traversals go
+from leaf to leaf without climbing back up the tree. Internal nodes hold separator keys, the page
+numbers of their children and how many entries are under each child, which keeps rank and select
+O(log n) like the counted AVL trees.
+
+The file is a run of fixed-size pages, mapped with mmap. Layout, little endian:
+    page 0     header: magic b'BPT+', uint16 version, uint32 page size, then uint64 root page,
+               entry count, page count and first free page
+    page 1..   a page header (uint8 kind, uint32 bytes used, uint64 next page) and then data
+
+A node is pickled into its page and continues in overflow pages, chained through the next field,
+when it doesn't fit (a leaf of stocks with long price histories, say). Freed pages are chained the
+same way into a free list and reused before the file grows.
+
+Decoded nodes are kept in an LRU cache of cache_nodes entries. A change stays in the cache until the
+node is evicted or flush() is called, so a node that changes many times in a row is pickled and
+written once. Memory use is bounded by the cache size, not by the number of entries.
+
+Deletes drop leaves that become empty (and internal nodes left without children) but don't merge
+half full ones, the same trade most database B+ trees make. Keys and values are pickled, so what a
+search gives back can be a copy: to change a stored value write it again with replace(), instead of
+changing the object a search returned.
+"""
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import pickle
+import struct
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from datastructures.iavltree import IAVLTree, K, V
+
+MAGIC = b'BPT+'
+FORMAT_VERSION = 1
+DEFAULT_PAGE_SIZE = 4096
+DEFAULT_LEAF_SIZE = 64  # entries in a leaf before it splits
+DEFAULT_FANOUT = 64  # children of an internal node before it splits
+DEFAULT_CACHE_NODES = 1024
+MIN_CACHE_NODES = 16  # an insert or delete holds a root-to-leaf path plus a few neighbours at once
+NO_PAGE = 0  # page 0 is the header, so no node ever lives there
+
+_HEADER = struct.Struct('<4sHIQQQQ')
+_PAGE = struct.Struct('<BIQ')
+_LEAF, _INTERNAL, _OVERFLOW, _FREE = 1, 2, 3, 4
+
+
+class _Leaf:
+    __slots__ = ('keys', 'values', 'prev', 'next')
+
+    def __init__(self, keys: List[Any], values: List[Any], prev: int = NO_PAGE, next: int = NO_PAGE) -> None:
+        self.keys = keys
+        self.values = values
+        self.prev = prev
+        self.next = next
+
+
+class _Internal:
+    # keys[i] separates children[i] and children[i + 1]: everything under children[i] is <= keys[i] and
+    # everything under children[i + 1] is >= it. counts[i] is how many entries are under children[i]
+    __slots__ = ('keys', 'children', 'counts')
+
+    def __init__(self, keys: List[Any], children: List[int], counts: List[int]) -> None:
+        self.keys = keys
+        self.children = children
+        self.counts = counts
+
+
+_Node = Union[_Leaf, _Internal]
+# the internal nodes on the way down to a leaf, with the child index taken at each
+_Path = List[Tuple[int, _Internal, int]]
+
+
+class BPlusTree(IAVLTree[K, V], Generic[K, V]):
+    """ An ordered map with duplicate keys, kept in a page file instead of in memory.
+
+    It answers the same questions as AVLTree (search, delete, remove, irange, top_k, rank, select,
+    quantile and the traversals) with the same rule for equal keys: a new entry goes after the ones
+    already there. Close the tree, or use it in a with block, to make sure everything is on disk.
+    """
+
+    def __init__(self, path: str, page_size: Optional[int] = None, leaf_size: int = DEFAULT_LEAF_SIZE,
+                 fanout: int = DEFAULT_FANOUT, cache_nodes: int = DEFAULT_CACHE_NODES) -> None:
+        """Opens the tree stored at path, or makes an empty one there if the file doesn't exist yet.
+
+        page_size only applies to a new file, an existing one keeps its own. leaf_size and fanout are the
+        entries a leaf and the children an internal node hold before splitting, and cache_nodes is how many
+        decoded nodes the LRU cache keeps.
+        Raises ValueError if the options are out of range, or the file isn't a B+ tree file this code can read.
+        """
+        if leaf_size < 2 or fanout < 3:
+            raise ValueError(f"Need a leaf size of at least 2 and a fanout of at least 3, got {leaf_size} and {fanout}.")
+        if cache_nodes < MIN_CACHE_NODES:
+            raise ValueError(f"The cache has to hold at least {MIN_CACHE_NODES} nodes, got {cache_nodes}.")
+        self._leaf_size = leaf_size
+        self._fanout = fanout
+        self._cache_nodes = cache_nodes
+        self._cache: OrderedDict[int, _Node] = OrderedDict()
+        self._dirty: Set[int] = set()
+        self._hits = self._misses = self._writes = 0
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            header = self._file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                self._file.close()
+                raise ValueError(f"{path} is too short to be a B+ tree file.")
+            magic, version, self._page_size, self._root, self._count, self._page_count, self._free = _HEADER.unpack(header)
+            problem = None
+            if magic != MAGIC:
+                problem = f"{path} is not a B+ tree file."
+            elif version != FORMAT_VERSION:
+                problem = f"{path} is format version {version}, this code reads version {FORMAT_VERSION}."
+            elif page_size not in (None, self._page_size):
+                problem = f"{path} has {self._page_size} byte pages, not {page_size}."
+            if problem:
+                self._file.close()
+                raise ValueError(problem)
+        else:
+            self._page_size = DEFAULT_PAGE_SIZE if page_size is None else page_size
+            if self._page_size < 4 * _HEADER.size:
+                self._file.close()
+                raise ValueError(f"Pages have to be at least {4 * _HEADER.size} bytes, got {self._page_size}.")
+            self._root, self._count, self._page_count, self._free = NO_PAGE, 0, 1, NO_PAGE
+            self._file.truncate(16 * self._page_size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        if not exists:
+            self._write_header()
+
+    @classmethod
+    def from_sorted(cls, path: str, pairs: Iterable[Tuple[K, V]], **options: Any) -> BPlusTree[K, V]:
+        """Makes a tree at path from (key, value) pairs sorted by key, filling the leaves in one pass.
+
+        Raises ValueError if the keys aren't sorted or the file already holds entries.
+        """
+        tree = cls(path, **options)
+        if tree._count:
+            tree.close()
+            raise ValueError(f"{path} already holds {tree._count} entries.")
+        try:
+            tree.merge(pairs)
+        except ValueError:
+            tree.close()
+            raise
+        return tree
+
+
+    def _write_header(self) -> None:
+        _HEADER.pack_into(self._map, 0, MAGIC, FORMAT_VERSION, self._page_size, self._root, self._count,
+                          self._page_count, self._free)
+
+    def _allocate(self) -> int:
+        # a page off the free list, or a new one at the end of the file, which doubles when it runs out
+        if self._free != NO_PAGE:
+            page = self._free
+            _, _, self._free = _PAGE.unpack_from(self._map, page * self._page_size)
+        else:
+            page = self._page_count
+            self._page_count += 1
+            if self._page_count * self._page_size > len(self._map):
+                self._map.resize(2 * len(self._map))
+        _PAGE.pack_into(self._map, page * self._page_size, _FREE, 0, NO_PAGE)
+        return page
+
+    def _release(self, page: int) -> None:
+        # puts a page and the rest of its overflow chain on the free list
+        while page != NO_PAGE:
+            offset = page * self._page_size
+            _, _, following = _PAGE.unpack_from(self._map, offset)
+            _PAGE.pack_into(self._map, offset, _FREE, 0, self._free)
+            self._free = page
+            page = following
+
+    def _read(self, page: int) -> _Node:
+        kind: Optional[int] = None
+        chunks: List[bytes] = []
+        while page != NO_PAGE:
+            offset = page * self._page_size
+            page_kind, used, page = _PAGE.unpack_from(self._map, offset)
+            kind = page_kind if kind is None else kind
+            chunks.append(self._map[offset + _PAGE.size:offset + _PAGE.size + used])
+        fields = pickle.loads(b''.join(chunks))
+        return _Leaf(*fields) if kind == _LEAF else _Internal(*fields)
+
+    def _write(self, page: int, node: _Node) -> None:
+        # pickles the node over its page and overflow chain, growing or shrinking the chain to fit
+        if isinstance(node, _Leaf):
+            kind, fields = _LEAF, (node.keys, node.values, node.prev, node.next)
+        else:
+            kind, fields = _INTERNAL, (node.keys, node.children, node.counts)
+        data = pickle.dumps(fields, pickle.HIGHEST_PROTOCOL)
+        room = self._page_size - _PAGE.size
+        pieces = [data[start:start + room] for start in range(0, len(data), room)]
+
+        chain = [page]
+        _, _, following = _PAGE.unpack_from(self._map, page * self._page_size)
+        while following != NO_PAGE and len(chain) < len(pieces):
+            chain.append(following)
+            _, _, following = _PAGE.unpack_from(self._map, following * self._page_size)
+        if len(chain) == len(pieces):
+            self._release(following)  # whatever is left of the old chain
+        while len(chain) < len(pieces):
+            chain.append(self._allocate())
+
+        for index, piece in enumerate(pieces):
+            offset = chain[index] * self._page_size
+            following = chain[index + 1] if index + 1 < len(chain) else NO_PAGE
+            _PAGE.pack_into(self._map, offset, kind if index == 0 else _OVERFLOW, len(piece), following)
+            self._map[offset + _PAGE.size:offset + _PAGE.size + len(piece)] = piece
+        self._writes += 1
+
+
+    def _node(self, page: int) -> _Node:
+        node = self._cache.get(page)
+        if node is not None:
+            self._hits += 1
+            self._cache.move_to_end(page)
+            return node
+        self._misses += 1
+        node = self._cache[page] = self._read(page)
+        self._evict()
+        return node
+
+    def _changed(self, page: int, node: _Node) -> None:
+        # marks a node for writing. It goes back in the cache too, in case it was evicted while it was being changed
+        self._cache[page] = node
+        self._cache.move_to_end(page)
+        self._dirty.add(page)
+        self._evict()
+
+    def _new_node(self, node: _Node) -> int:
+        page = self._allocate()
+        self._changed(page, node)
+        return page
+
+    def _free_node(self, page: int) -> None:
+        self._cache.pop(page, None)
+        self._dirty.discard(page)
+        self._release(page)
+
+    def _evict(self) -> None:
+        while len(self._cache) > self._cache_nodes:
+            page, node = self._cache.popitem(last=False)
+            if page in self._dirty:
+                self._dirty.discard(page)
+                self._write(page, node)
+
+    def flush(self) -> None:
+        """Writes every changed node and the header, and asks the OS to write the mapped pages out."""
+        for page in sorted(self._dirty):
+            self._write(page, self._cache[page])
+        self._dirty.clear()
+        self._write_header()
+        self._map.flush()
+
+    def close(self) -> None:
+        """Flushes and closes the file. Closing twice is fine."""
+        if self._map.closed:
+            return
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> BPlusTree[K, V]:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Cache hits and misses, node writes, and the file's size in pages, since the tree was opened."""
+        return {'hits': self._hits, 'misses': self._misses, 'writes': self._writes, 'cached': len(self._cache),
+                'pages': self._page_count}
+
+
+    def _descend(self, key: K, right: bool) -> Tuple[_Path, int, _Leaf]:
+        # the path down to the leaf where key belongs: where the first equal key can be, or with right=True
+        # the leaf a new entry goes into, after every equal key
+        find = bisect_right if right else bisect_left
+        path: _Path = []
+        page = self._root
+        node = self._node(page)
+        while isinstance(node, _Internal):
+            index = find(node.keys, key)
+            path.append((page, node, index))
+            page = node.children[index]
+            node = self._node(page)
+        return path, page, node
+
+    def _edge(self, last: bool) -> _Leaf:
+        # the first (or last) leaf, straight down one side
+        node = self._node(self._root)
+        while isinstance(node, _Internal):
+            node = self._node(node.children[-1 if last else 0])
+        return node
+
+    def _next_leaf(self, path: _Path) -> Tuple[_Path, int, _Leaf]:
+        # the path to the leaf after the one path leads to: up to the first ancestor with a child further right,
+        # then down that child's left side
+        path = list(path)
+        while path:
+            page, node, index = path.pop()
+            if index + 1 < len(node.children):
+                path.append((page, node, index + 1))
+                child_page = node.children[index + 1]
+                child = self._node(child_page)
+                while isinstance(child, _Internal):
+                    path.append((child_page, child, 0))
+                    child_page = child.children[0]
+                    child = self._node(child_page)
+                return path, child_page, child
+        raise LookupError("There is no leaf after the last one.")
+
+    def _entries(self, key: K) -> Iterator[Tuple[_Path, int, _Leaf, int]]:
+        # the position of every entry with this key, in order, each with the path _delete_at needs
+        if self._root == NO_PAGE:
+            return
+        path, page, leaf = self._descend(key, right=False)
+        index = bisect_left(leaf.keys, key)
+        while True:
+            while index < len(leaf.keys):
+                if key < leaf.keys[index]:
+                    return
+                yield path, page, leaf, index
+                index += 1
+            if leaf.next == NO_PAGE:
+                return
+            path, page, leaf = self._next_leaf(path)
+            index = 0
+
+    def _same(self, stored: V, value: V) -> bool:
+        # which stored entry remove and replace mean. Values read back from the file are copies, so equality
+        # has to do when identity doesn't; subclasses with better ways to tell values apart override this
+        return stored is value or stored == value
+
+    def search(self, key: K) -> Optional[V]:
+        """The value of the first entry with this key, or None if the key isn't in the tree."""
+        for _, _, leaf, index in self._entries(key):
+            return leaf.values[index]
+        return None
+
+    def search_all(self, key: K) -> List[V]:
+        """Every value stored under key, in the order they were added."""
+        return [leaf.values[index] for _, _, leaf, index in self._entries(key)]
+
+    def __contains__(self, key: K) -> bool:
+        return any(True for _ in self._entries(key))
+
+
+    def insert(self, key: K, value: V) -> None:
+        """Adds an entry, after any entries already there with an equal key."""
+        if self._root == NO_PAGE:
+            self._root = self._new_node(_Leaf([key], [value]))
+            self._count = 1
+            return
+        path, page, leaf = self._descend(key, right=True)
+        index = bisect_right(leaf.keys, key)
+        leaf.keys.insert(index, key)
+        leaf.values.insert(index, value)
+        self._count += 1
+        for parent_page, parent, child in path:
+            parent.counts[child] += 1
+            self._changed(parent_page, parent)
+        self._changed(page, leaf)
+        if len(leaf.keys) > self._leaf_size:
+            self._split(path, page, leaf)
+
+    def _split(self, path: _Path, page: int, node: _Node) -> None:
+        # splits an overfull node in two and adds the right half to the parent, which can overflow in turn
+        while True:
+            if isinstance(node, _Leaf):
+                half = len(node.keys) // 2
+                right: _Node = _Leaf(node.keys[half:], node.values[half:], page, node.next)
+                del node.keys[half:], node.values[half:]
+                right_page = self._new_node(right)
+                if right.next != NO_PAGE:
+                    after = self._node(right.next)
+                    after.prev = right_page
+                    self._changed(right.next, after)
+                node.next = right_page
+                separator, left_count, right_count = right.keys[0], len(node.keys), len(right.keys)
+            else:
+                half = len(node.children) // 2
+                right = _Internal(node.keys[half:], node.children[half:], node.counts[half:])
+                separator = node.keys[half - 1]
+                del node.keys[half - 1:], node.children[half:], node.counts[half:]
+                right_page = self._new_node(right)
+                left_count, right_count = sum(node.counts), sum(right.counts)
+            self._changed(page, node)
+
+            if not path:  # the root split, so the tree grows a level
+                self._root = self._new_node(_Internal([separator], [page, right_page], [left_count, right_count]))
+                return
+            parent_page, parent, index = path.pop()
+            parent.keys.insert(index, separator)
+            parent.children.insert(index + 1, right_page)
+            parent.counts[index:index + 1] = [left_count, right_count]
+            self._changed(parent_page, parent)
+            if len(parent.children) <= self._fanout:
+                return
+            page, node = parent_page, parent
+
+    def merge(self, pairs: Iterable[Tuple[K, V]]) -> None:
+        """Adds (key, value) pairs sorted by key. An empty tree is filled leaf by leaf without a single split,
+        otherwise the pairs are inserted one at a time.
+
+        Raises ValueError if the keys aren't sorted.
+        """
+        pairs = list(pairs)
+        for index in range(1, len(pairs)):
+            if pairs[index][0] < pairs[index - 1][0]:
+                raise ValueError(f"Keys are not sorted at position {index}: {pairs[index - 1][0]} then {pairs[index][0]}.")
+        if self._root != NO_PAGE:
+            for key, value in pairs:
+                self.insert(key, value)
+            return
+        if not pairs:
+            return
+
+        level: List[Tuple[int, Any, int]] = []  # (page, smallest key, entries) of every node on the level being built
+        previous: Optional[_Leaf] = None
+        for start in range(0, len(pairs), self._leaf_size):
+            chunk = pairs[start:start + self._leaf_size]
+            leaf = _Leaf([key for key, _ in chunk], [value for _, value in chunk], level[-1][0] if level else NO_PAGE)
+            page = self._new_node(leaf)
+            if previous is not None:
+                previous.next = page
+                self._changed(level[-1][0], previous)
+            level.append((page, leaf.keys[0], len(chunk)))
+            previous = leaf
+        while len(level) > 1:
+            parents = []
+            for start in range(0, len(level), self._fanout):
+                group = level[start:start + self._fanout]
+                node = _Internal([key for _, key, _ in group[1:]], [page for page, _, _ in group], [count for _, _, count in group])
+                parents.append((self._new_node(node), group[0][1], sum(node.counts)))
+            level = parents
+        self._root = level[0][0]
+        self._count = len(pairs)
+
+    def delete(self, key: K) -> None:
+        """Removes the first entry with this key. Raises KeyError if the key isn't in the tree."""
+        for path, page, leaf, index in self._entries(key):
+            self._delete_at(path, page, leaf, index)
+            return
+        raise KeyError(f"Key {key} not found in the tree.")
+
+    def remove(self, key: K, value: V) -> None:
+        """Removes the first entry with this key whose value _same says is value.
+
+        Raises KeyError if there's no such entry.
+        """
+        for path, page, leaf, index in self._entries(key):
+            if self._same(leaf.values[index], value):
+                self._delete_at(path, page, leaf, index)
+                return
+        raise KeyError(f"Key {key} with value {value!r} not found in the tree.")
+
+    def replace(self, key: K, value: V) -> None:
+        """Writes value over the first entry with this key whose value _same says is value.
+
+        Raises KeyError if there's no such entry.
+        """
+        for _, page, leaf, index in self._entries(key):
+            if self._same(leaf.values[index], value):
+                leaf.values[index] = value
+                self._changed(page, leaf)
+                return
+        raise KeyError(f"Key {key} with value {value!r} not found in the tree.")
+
+    def _delete_at(self, path: _Path, page: int, leaf: _Leaf, index: int) -> None:
+        # takes one entry out of a leaf. A leaf left empty is unlinked from its neighbours and its parent,
+        # and so on up for parents left without children. A root with one child then hands over to that child
+        del leaf.keys[index], leaf.values[index]
+        self._count -= 1
+        for parent_page, parent, child in path:
+            parent.counts[child] -= 1
+            self._changed(parent_page, parent)
+        if leaf.keys:
+            self._changed(page, leaf)
+            return
+
+        if leaf.prev != NO_PAGE:
+            before = self._node(leaf.prev)
+            before.next = leaf.next
+            self._changed(leaf.prev, before)
+        if leaf.next != NO_PAGE:
+            after = self._node(leaf.next)
+            after.prev = leaf.prev
+            self._changed(leaf.next, after)
+        self._free_node(page)
+        while path:
+            parent_page, parent, child = path.pop()
+            del parent.children[child], parent.counts[child]
+            if parent.keys:
+                del parent.keys[child - 1 if child else 0]
+            if parent.children:
+                break
+            self._free_node(parent_page)
+        else:  # that was the last entry
+            self._root = NO_PAGE
+            return
+
+        root = self._node(self._root)
+        while isinstance(root, _Internal) and len(root.children) == 1:
+            self._free_node(self._root)
+            self._root = root.children[0]
+            root = self._node(self._root)
+
+
+    def size(self) -> int:
+        return self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def rank(self, key: K, inclusive: bool = False) -> int:
+        """How many entries have a key smaller than key (or smaller or equal, when inclusive is True)."""
+        if self._root == NO_PAGE:
+            return 0
+        find = bisect_right if inclusive else bisect_left
+        smaller = 0
+        node = self._node(self._root)
+        while isinstance(node, _Internal):
+            index = find(node.keys, key)
+            smaller += sum(node.counts[:index])
+            node = self._node(node.children[index])
+        return smaller + find(node.keys, key)
+
+    def select(self, index: int) -> Tuple[K, V]:
+        """The (key, value) pair at a 0-based position of the sorted order.
+
+        Raises IndexError if the index is out of range.
+        """
+        if index < 0 or index >= self._count:
+            raise IndexError(f"Index {index} out of range for a tree of size {self._count}.")
+        node = self._node(self._root)
+        while isinstance(node, _Internal):
+            child = 0
+            while index >= node.counts[child]:
+                index -= node.counts[child]
+                child += 1
+            node = self._node(node.children[child])
+        return node.keys[index], node.values[index]
+
+    def quantile(self, p: float) -> Optional[Tuple[K, V]]:
+        """The (key, value) pair at fraction p (0 to 1) of the sorted order by nearest rank, None if empty."""
+        if not 0 <= p <= 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {p}.")
+        if not self._count:
+            return None
+        return self.select(max(0, math.ceil(p * self._count) - 1))
+
+
+    def _scan(self, leaf: _Leaf, index: int, reverse: bool) -> Iterator[Tuple[K, V]]:
+        # pairs from position index of leaf onwards (or backwards), following the leaf links
+        while True:
+            if reverse:
+                yield from zip(leaf.keys[index::-1], leaf.values[index::-1]) if index >= 0 else ()
+                if leaf.prev == NO_PAGE:
+                    return
+                leaf = self._node(leaf.prev)
+                index = len(leaf.keys) - 1
+            else:
+                yield from zip(leaf.keys[index:], leaf.values[index:])
+                if leaf.next == NO_PAGE:
+                    return
+                leaf = self._node(leaf.next)
+                index = 0
+
+    def iter_items(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        """Every (key, value) pair in key order (or backwards), one leaf after another."""
+        if self._root == NO_PAGE:
+            return iter(())
+        leaf = self._edge(last=reverse)
+        return self._scan(leaf, len(leaf.keys) - 1 if reverse else 0, reverse)
+
+    def iter_inorder(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        return self.iter_items(reverse)
+
+    # every entry sits in a leaf and every leaf is at the same depth, so pre-order, post-order and
+    # breadth-first all reach the leaves from left to right and give the entries in key order
+    def iter_preorder(self) -> Iterator[Tuple[K, V]]:
+        return self.iter_items()
+
+    def iter_postorder(self) -> Iterator[Tuple[K, V]]:
+        return self.iter_items()
+
+    def iter_bforder(self) -> Iterator[Tuple[K, V]]:
+        return self.iter_items()
+
+    def irange(self, lo: Optional[K] = None, hi: Optional[K] = None, inclusive: Tuple[bool, bool] = (True, True),
+               reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        """The (key, value) pairs with lo <= key <= hi, like AVLTree.irange. One walk down to the first leaf in
+        range and then a leaf at a time, O(log n + k) for k results.
+        """
+        if self._root == NO_PAGE:
+            return
+        lo_inclusive, hi_inclusive = inclusive
+        if not reverse:
+            if lo is None:
+                leaf, index = self._edge(last=False), 0
+            else:
+                _, _, leaf = self._descend(lo, right=not lo_inclusive)
+                index = (bisect_left if lo_inclusive else bisect_right)(leaf.keys, lo)
+            for key, value in self._scan(leaf, index, False):
+                if hi is not None and (hi < key if hi_inclusive else not key < hi):
+                    return
+                yield key, value
+        else:
+            if hi is None:
+                leaf = self._edge(last=True)
+                index = len(leaf.keys) - 1
+            else:
+                _, _, leaf = self._descend(hi, right=hi_inclusive)
+                index = (bisect_right if hi_inclusive else bisect_left)(leaf.keys, hi) - 1
+            for key, value in self._scan(leaf, index, True):
+                if lo is not None and (key < lo if lo_inclusive else not lo < key):
+                    return
+                yield key, value
+
+    def top_k(self, k: int) -> List[Tuple[K, V]]:
+        return list(islice(self.iter_items(reverse=True), max(k, 0)))
+
+    def bottom_k(self, k: int) -> List[Tuple[K, V]]:
+        return list(islice(self.iter_items(), max(k, 0)))
+
+    def __iter__(self) -> Iterator[K]:
+        for key, _ in self.iter_items():
+            yield key
+
+    def __reversed__(self) -> Iterator[K]:
+        for key, _ in self.iter_items(reverse=True):
+            yield key
+
+    def inorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_inorder(), visit)
+
+    def preorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_preorder(), visit)
+
+    def postorder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_postorder(), visit)
+
+    def bforder(self, visit: Optional[Callable[[V], None]] = None) -> List[K]:
+        return self._collect(self.iter_bforder(), visit)
+
+    def _collect(self, pairs: Iterator[Tuple[K, V]], visit: Optional[Callable[[V], None]]) -> List[K]:
+        keys: List[K] = []
+        for key, value in pairs:
+            if visit is not None:
+                visit(value)
+            keys.append(key)
+        return keys
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from operator import itemgetter
+from typing import Generic, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from datastructures.avltree import AVLNode, AVLTree
+from datastructures.iavltree import K, V
+from datastructures.snapshot import pack_keys, unpack_keys
+
+
+class IntervalNode(AVLNode[K, V]):
+    """ An AVL node for the closed interval [key, high]. max_high is the largest high anywhere in the
+    subtree rooted at this node, which is what lets queries skip whole subtrees.
+    """
+    __slots__ = ('_high', '_max_high')
+
+    def __init__(self, key: K, value: V, high: Optional[K] = None) -> None:
+        super().__init__(key, value)
+        self._high = key if high is None else high
+        self._max_high = self._high
+
+    @property
+    def high(self) -> K:
+        return self._high
+
+
+class IntervalTree(AVLTree[K, V], Generic[K, V]):
+    """ An interval tree built on the AVL balancing code. Intervals are closed, keyed on their low end,
+    and every node keeps the max high end of its subtree up to date through rotations and retraces.
+
+    Stabbing (at) and overlap queries only go into subtrees whose max high can still reach the query
+    and stop at the first low end past it. Each of the k results can cost a walk of O(log n) through
+    subtrees that are then pruned, so a query is O(min(n, k log n)).
+
+    Everything that adds entries takes (low, high, value) triples instead of (key, value) pairs.
+    Operations that would make nodes from pairs or move a key without its high end (remove, the
+    recursive helpers, join or union with a tree of another type) are overridden or raise TypeError.
+    """
+    _node_type = IntervalNode
+    _snapshot_kind = b'IVLT'
+
+    def __init__(self, intervals: Optional[Sequence[Tuple[K, K, V]]] = None) -> None:
+        """Creates an empty tree, or bulk loads (low, high, value) triples in any order."""
+        super().__init__()
+        if intervals:
+            self._check_intervals(intervals)
+            self._root = self._build(sorted(intervals, key=lambda interval: interval[0]), 0, len(intervals))
+
+    @classmethod
+    def from_sorted(cls, intervals: Iterable[Tuple[K, K, V]]) -> IntervalTree[K, V]:  # type: ignore[override]
+        """Bulk loads (low, high, value) triples already sorted by low, in O(n)."""
+        intervals = list(intervals)
+        tree = cls()
+        tree._check_sorted(intervals)
+        tree._check_intervals(intervals)
+        tree._root = tree._build(intervals, 0, len(intervals))
+        return tree
+
+    @classmethod
+    def from_iterable(cls, intervals: Iterable[Tuple[K, K, V]]) -> IntervalTree[K, V]:  # type: ignore[override]
+        """Bulk loads (low, high, value) triples in any order."""
+        return cls.from_sorted(sorted(intervals, key=itemgetter(0)))
+
+    @staticmethod
+    def _check_intervals(intervals: Iterable[Tuple[K, K, V]]) -> None:
+        for low, high, _ in intervals:
+            if high < low:
+                raise ValueError(f"Interval [{low}, {high}] has its high end below its low end.")
+
+    def _build(self, intervals: Sequence[Tuple[K, K, V]], low: int, high: int) -> Optional[IntervalNode]:
+        # same midpoint build as AVLTree._build, but from (low, high, value) triples
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        start, end, value = intervals[middle]
+        node = IntervalNode(start, value, end)
+        node._left = self._build(intervals, low, middle)
+        node._right = self._build(intervals, middle + 1, high)
+        self._update(node)
+        return node
+
+    def _update(self, node: IntervalNode) -> None:
+        super()._update(node)
+        max_high = node._high
+        if node._left is not None and max_high < node._left._max_high:
+            max_high = node._left._max_high
+        if node._right is not None and max_high < node._right._max_high:
+            max_high = node._right._max_high
+        node._max_high = max_high
+
+    def _snapshot_sections(self) -> List[bytes]:
+        # the high ends go in a third column next to the low ends and values
+        return super()._snapshot_sections() + [pack_keys([node._high for node in self._iter_nodes()])]
+
+    def _nodes_from_snapshot(self, sections: List[memoryview]) -> List[IntervalNode]:
+        nodes = super()._nodes_from_snapshot(sections)
+        for node, high in zip(nodes, unpack_keys(sections[2])):
+            node._high = node._max_high = high
+        return nodes
+
+    def insert(self, low: K, high: K, value: V) -> None:  # type: ignore[override]
+        """Inserts the closed interval [low, high] with its value. Raises ValueError if high is less than low."""
+        self._check_intervals(((low, high, value),))
+        self._insert_node(IntervalNode(low, value, high))
+
+    def merge(self, intervals: Iterable[Tuple[K, K, V]]) -> None:  # type: ignore[override]
+        """Merges a batch of (low, high, value) triples, already sorted by low, into the tree.
+
+        Raises ValueError if the batch isn't sorted by low, or an interval's high is below its low.
+        """
+        intervals = list(intervals)
+        self._check_sorted(intervals)
+        self._check_intervals(intervals)
+        self._merge_nodes([IntervalNode(low, value, high) for low, high, value in intervals])
+
+    def delete(self, low: K, high: K, value: Optional[V] = None) -> None:  # type: ignore[override]
+        """Deletes one interval that is exactly [low, high]. With a value, only an interval holding it (or failing
+        that an equal one) goes. Raises KeyError if no matching interval is in the tree.
+        """
+        def same_high(node: IntervalNode) -> bool:
+            return not (node._high < high or high < node._high)
+
+        if value is None:
+            path = self._find_path(low, same_high)
+        else:  # the same object first, an equal one only if it isn't there
+            path = (self._find_path(low, lambda node: same_high(node) and node._value is value)
+                    or self._find_path(low, lambda node: same_high(node) and node._value == value))
+        if path is None:
+            raise KeyError(f"Interval [{low}, {high}] not found in the tree.")
+        self._delete_at(path)
+
+    def insert_many(self, intervals: Iterable[Tuple[K, K, V]]) -> None:  # type: ignore[override]
+        """Inserts (low, high, value) triples in any order: one sort, an O(m) build, then a union."""
+        intervals = sorted(intervals, key=itemgetter(0))
+        self._check_intervals(intervals)
+        nodes = [IntervalNode(low, value, high) for low, high, value in intervals]
+        self._root = self._union(self._root, self._link(nodes, 0, len(nodes)), copy_other=False)
+
+    @classmethod
+    def join(cls, left: IntervalTree[K, V], low: K, high: K, value: V,  # type: ignore[override]
+             right: IntervalTree[K, V]) -> IntervalTree[K, V]:
+        """Same as AVLTree.join, with the interval [low, high] in the middle."""
+        for tree in (left, right):
+            if not isinstance(tree, IntervalTree):
+                raise TypeError(f"Only IntervalTrees can be joined into an IntervalTree, got {type(tree).__name__}.")
+        cls._check_intervals(((low, high, value),))
+        left._check_in_place()
+        right._check_in_place()
+        if left._root is not None and low < left.top_k(1)[0][0]:
+            raise ValueError(f"Every low end in the left tree has to be <= {low}.")
+        if right._root is not None and right.bottom_k(1)[0][0] < low:
+            raise ValueError(f"Every low end in the right tree has to be >= {low}.")
+        tree = cls()
+        tree._root = tree._join(left._root, IntervalNode(low, value, high), right._root)
+        left._root = right._root = None
+        return tree
+
+    def union(self, other: AVLTree[K, V]) -> None:
+        """Adds every interval of another IntervalTree, which is left alone."""
+        if not isinstance(other, IntervalTree):  # its nodes have no high end to copy
+            raise TypeError(f"Only another IntervalTree can be unioned into an IntervalTree, got {type(other).__name__}.")
+        super().union(other)
+
+    def remove(self, key: K, value: V) -> None:
+        raise TypeError("An interval is removed by both its ends, use delete(low, high, value).")
+
+    def insert_helper(self, node: Optional[AVLNode], key: K, value: V) -> AVLNode:
+        raise TypeError("IntervalTree nodes need a high end, use insert(low, high, value).")
+
+    def delete_helper(self, node: Optional[AVLNode], key: K) -> Optional[AVLNode]:
+        raise TypeError("An interval is deleted by both its ends, use delete(low, high, value).")
+
+    def at(self, point: K) -> List[Tuple[K, K, V]]:
+        """Stabbing query, finds every interval that contains the point."""
+        return self.overlap(point, point)
+
+    def overlap(self, lo: K, hi: K) -> List[Tuple[K, K, V]]:
+        """Finds every interval that shares at least one point with [lo, hi]."""
+        results: List[Tuple[K, K, V]] = []
+        stack: List[IntervalNode] = []
+        node: Optional[IntervalNode] = self._root
+        while stack or node is not None:
+            if node is not None:
+                if node._max_high < lo:  # nothing in this subtree reaches up to lo
+                    node = None
+                    continue
+                stack.append(node)
+                node = node._left
+                continue
+
+            node = stack.pop()
+            if hi < node._key:  # this interval and everything after it in order starts past hi
+                break
+            if not node._high < lo:
+                results.append((node._key, node._high, node._value))
+            node = node._right
+        return results
+
+    def iter_intervals(self) -> Iterator[Tuple[K, K, V]]:
+        """Lazily yields every (low, high, value) in order of the low end."""
+        for node in self._iter_nodes():
+            yield node._key, node._high, node._value
@@ -0,0 +1,273 @@
+"""
+Opt-in instrumentation for AVLTree and StockPriceManager.
+
+Metrics are off by default and cost nothing while they are off: no counter, flag check or wrapper
+is left in the hot paths. Turning them on for a tree or a manager shadows a handful of methods on
+that one instance with wrappers that count, or time, and then call the class's own method.
+Turning them off deletes the wrappers again. Other instances never see any of this.
+
+What gets recorded:
+    comparisons        key comparisons on the way down for inserts, deletes and lookups (one per node passed)
+    rotations          rebalances by case: LL, RR, LR and RL
+    visits             nodes visited per query, a histogram per kind of query
+    height             the tree height when the snapshot is taken
+    latencies          nanoseconds per call, a histogram per manager operation
+
+Counting works by walking the same path again next to the real operation, so an instrumented tree is
+a little slower than the plain one, and the plain one is exactly as fast as before.
+"""
+from __future__ import annotations
+
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+ROTATIONS = ('LL', 'RR', 'LR', 'RL')
+# AVLTree methods instrument_tree shadows, for uninstrument to remove again
+TREE_METHODS = ('_insert_node', 'delete', '_find_path', '_rebalance', 'search', 'rank', 'select',
+                'irange', 'top_k', 'bottom_k')
+
+
+class Histogram:
+    """Counts of non-negative integers in power of two buckets: 0, 1, 2-3, 4-7, 8-15 and so on.
+
+    Recording is O(1) and the memory is fixed no matter how many values come in. Percentiles are read
+    off the buckets, so they are upper bounds at most twice the true value.
+    """
+    __slots__ = ('count', 'total', 'minimum', 'maximum', '_buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.minimum: Optional[int] = None
+        self.maximum: Optional[int] = None
+        self._buckets: List[int] = [0] * 65
+
+    def record(self, value: int) -> None:
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        self._buckets[min(value.bit_length(), 64)] += 1
+
+    def percentile(self, percentile: float) -> Optional[int]:
+        """The upper end of the bucket holding the given percentile (0 to 100), None if nothing was recorded."""
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * percentile // 100))  # nearest rank, rounded up
+        seen = 0
+        for bucket, count in enumerate(self._buckets):
+            seen += count
+            if seen >= target:
+                return min((1 << bucket) - 1, self.maximum)
+        return self.maximum
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The summary as plain numbers, with the non-empty buckets keyed by their upper end."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.minimum,
+            'max': self.maximum,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {(1 << bucket) - 1: count for bucket, count in enumerate(self._buckets) if count},
+        }
+
+
+class TreeMetrics:
+    """Counters for one tree. Filled in by the wrappers instrument_tree installs."""
+
+    def __init__(self) -> None:
+        self.tree: Any = None  # the tree these belong to, for the height and size in the snapshot
+        self.comparisons = 0
+        self.rotations: Dict[str, int] = dict.fromkeys(ROTATIONS, 0)
+        self.visits: Dict[str, Histogram] = {}
+
+    def record_visits(self, query: str, visited: int) -> None:
+        histogram = self.visits.get(query)
+        if histogram is None:
+            histogram = self.visits[query] = Histogram()
+        histogram.record(visited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        root = self.tree._root if self.tree is not None else None
+        return {
+            'height': root._height if root is not None else 0,
+            'size': root._size if root is not None else 0,
+            'comparisons': self.comparisons,
+            'rotations': dict(self.rotations),
+            'visits': {query: histogram.snapshot() for query, histogram in self.visits.items()},
+        }
+
+
+class Metrics:
+    """Everything a StockPriceManager records: latencies per operation plus the metrics of its trees."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, Histogram] = {}
+        self.trees: Dict[str, TreeMetrics] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """A dictionary of plain numbers, ready for json.dumps. Latencies are in nanoseconds."""
+        return {
+            'latencies_ns': {name: histogram.snapshot() for name, histogram in self.latencies.items() if histogram.count},
+            'trees': {name: metrics.snapshot() for name, metrics in self.trees.items()},
+        }
+
+
+def descent_length(node: Any, key: Any, ties: str = 'stop') -> int:
+    """How many nodes a walk down from node towards key passes.
+
+    ties says what the walk does on an equal key: 'stop' there like search, go 'left' like rank, or
+    go 'right' like insert.
+    """
+    visited = 0
+    while node is not None:
+        visited += 1
+        if key < node._key:
+            node = node._left
+        elif node._key < key:
+            node = node._right
+        elif ties == 'stop':
+            break
+        else:
+            node = node._left if ties == 'left' else node._right
+    return visited
+
+
+def select_length(node: Any, index: int) -> int:
+    """How many nodes select(index) passes on its way down."""
+    visited = 0
+    while node is not None:
+        visited += 1
+        left_size = node._left._size if node._left is not None else 0
+        own = node._size - left_size - (node._right._size if node._right is not None else 0)  # 1, or a bucket's count
+        if index < left_size:
+            node = node._left
+        elif index >= left_size + own:
+            index -= left_size + own
+            node = node._right
+        else:
+            break
+    return visited
+
+
+def spine_length(node: Any, right: bool) -> int:
+    """How many nodes lie on the leftmost (or rightmost) path, where an in-order walk starts."""
+    visited = 0
+    while node is not None:
+        visited += 1
+        node = node._right if right else node._left
+    return visited
+
+
+def instrument_tree(tree: Any, metrics: TreeMetrics) -> TreeMetrics:
+    """Shadows the tree's TREE_METHODS with counting wrappers on this one instance."""
+    uninstrument(tree, TREE_METHODS)
+    metrics.tree = tree
+    klass = type(tree)
+
+    def original(name: str) -> Callable[..., Any]:
+        return getattr(klass, name).__get__(tree, klass)
+
+    insert_node, delete, find_path, rebalance = (original(name) for name in ('_insert_node', 'delete', '_find_path', '_rebalance'))
+    search, rank, select, irange = (original(name) for name in ('search', 'rank', 'select', 'irange'))
+    top_k, bottom_k = original('top_k'), original('bottom_k')
+
+    def _insert_node(new_node: Any) -> None:
+        metrics.comparisons += descent_length(tree._root, new_node._key, 'right')
+        insert_node(new_node)
+
+    def _delete(key: Any) -> None:
+        metrics.comparisons += descent_length(tree._root, key)
+        delete(key)
+
+    def _find_path(key: Any, match: Callable[[Any], bool]) -> Optional[List[Any]]:
+        path = find_path(key, match)
+        metrics.comparisons += len(path) if path is not None else descent_length(tree._root, key)
+        return path
+
+    def _rebalance(node: Any) -> Any:
+        # the balance factor only reads the children's heights, so the wrapped _rebalance does the node's update
+        balance = tree._balance_factor(node)
+        if balance > 1:
+            metrics.rotations['LR' if node._left is not None and tree._balance_factor(node._left) < 0 else 'LL'] += 1
+        elif balance < -1:
+            metrics.rotations['RL' if node._right is not None and tree._balance_factor(node._right) > 0 else 'RR'] += 1
+        return rebalance(node)
+
+    def _search(key: Any) -> Any:
+        visited = descent_length(tree._root, key)
+        metrics.comparisons += visited
+        metrics.record_visits('search', visited)
+        return search(key)
+
+    def _rank(key: Any, inclusive: bool = False) -> int:
+        metrics.record_visits('rank', descent_length(tree._root, key, 'right' if inclusive else 'left'))
+        return rank(key, inclusive)
+
+    def _select(index: int) -> Any:
+        metrics.record_visits('select', select_length(tree._root, index))
+        return select(index)
+
+    def _irange(lo: Any = None, hi: Any = None, inclusive: Any = (True, True), reverse: bool = False) -> Iterator[Any]:
+        # the walk down to the first key in range, then one node per key yielded. Recorded once the
+        # caller stops reading, since a range is consumed lazily
+        start = hi if reverse else lo
+        if start is None:
+            visited = spine_length(tree._root, reverse)
+        else:
+            visited = descent_length(tree._root, start, 'right' if reverse else 'left')
+        try:
+            for pair in irange(lo, hi, inclusive, reverse):
+                visited += 1
+                yield pair
+        finally:
+            metrics.record_visits('irange', visited)
+
+    def _top_k(k: int) -> List[Any]:
+        found = top_k(k)
+        metrics.record_visits('top_k', spine_length(tree._root, True) + len(found))
+        return found
+
+    def _bottom_k(k: int) -> List[Any]:
+        found = bottom_k(k)
+        metrics.record_visits('bottom_k', spine_length(tree._root, False) + len(found))
+        return found
+
+    wrappers = (_insert_node, _delete, _find_path, _rebalance, _search, _rank, _select, _irange, _top_k, _bottom_k)
+    for name, wrapper in zip(TREE_METHODS, wrappers):
+        setattr(tree, name, wraps(getattr(klass, name))(wrapper))
+    return metrics
+
+
+def timed(function: Callable[..., Any], histogram: Histogram) -> Callable[..., Any]:
+    """Wraps function so every call's wall-clock time, in nanoseconds, goes into histogram."""
+    clock = time.perf_counter_ns
+
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.record(clock() - start)
+    return wrapper
+
+
+def instrument_methods(target: Any, names: Iterable[str], latencies: Dict[str, Histogram]) -> None:
+    """Shadows each named method of target with a timed wrapper, with a histogram per name in latencies."""
+    for name in names:
+        histogram = latencies.setdefault(name, Histogram())
+        setattr(target, name, timed(getattr(type(target), name).__get__(target, type(target)), histogram))
+
+
+def uninstrument(target: Any, names: Iterable[str]) -> None:
+    """Removes the wrappers from target, so its class's own methods are used again."""
+    for name in names:
+        target.__dict__.pop(name, None)
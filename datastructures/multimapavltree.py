@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import copy
+import heapq
+from operator import attrgetter, itemgetter
+from typing import Callable, Generic, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from datastructures.avltree import AVLNode, AVLTree
+from datastructures.iavltree import K, V
+from datastructures.snapshot import pack_keys, pack_values, unpack_keys, unpack_values
+
+
+class BucketNode(AVLNode[K, List[V]]):
+    """ An AVL node that holds every value stored under its key. _value is the bucket, a list of the
+    values in the order they were added, and _size counts values rather than nodes, so rank and select
+    keep working in entries.
+    """
+    __slots__ = ()
+
+    def __init__(self, key: K, value: V) -> None:
+        super().__init__(key, [value])
+
+
+class MultiMapAVLTree(AVLTree[K, V], Generic[K, V]):
+    """ An AVL tree with one node per distinct key. Adding a key that is already there appends the value
+    to that node's bucket instead of hanging a new node off the tree, so a heavily repeated key costs one
+    node and no extra height, and every value under a key is found with a single walk down.
+
+    From the outside it behaves like an AVLTree that allows duplicate keys: size, rank, select and every
+    traversal count and yield one (key, value) pair per value, values under the same key in the order
+    they were added. search gives back the first of them, search_all and count the whole bucket.
+    """
+    _node_type = BucketNode
+    _snapshot_kind = b'MMAP'
+
+    def _build(self, pairs: Sequence[Tuple[K, V]], low: int, high: int) -> Optional[BucketNode]:
+        # the sorted pairs are grouped into one node per key first, then linked like AVLTree._build does
+        nodes = self._nodes_from_pairs(pairs[low:high])
+        return self._link(nodes, 0, len(nodes))
+
+    def _nodes_from_pairs(self, pairs: Iterable[Tuple[K, V]]) -> List[BucketNode]:
+        # one node per run of equal keys in pairs, which are sorted by key
+        nodes: List[BucketNode] = []
+        for key, value in pairs:
+            if nodes and not nodes[-1]._key < key:
+                nodes[-1]._value.append(value)
+            else:
+                nodes.append(self._node_type(key, value))
+        for node in nodes:
+            if len(node._value) > 1:
+                self._bucket_changed(node)
+        return nodes
+
+    def _coalesce(self, nodes: Iterable[BucketNode]) -> List[BucketNode]:
+        # same as _nodes_from_pairs for nodes that already exist, each run of equal keys is folded into its first node
+        merged: List[BucketNode] = []
+        grown: List[BucketNode] = []
+        for node in nodes:
+            if merged and not merged[-1]._key < node._key:
+                merged[-1]._value.extend(node._value)
+                if not grown or grown[-1] is not merged[-1]:
+                    grown.append(merged[-1])
+            else:
+                merged.append(node)
+        for node in grown:
+            self._bucket_changed(node)
+        return merged
+
+    def _bucket_changed(self, node: BucketNode) -> None:
+        # called whenever a bucket gains or loses values, before the node is updated. Subclasses that keep
+        # data about the values in a bucket (like a max over them) recompute it here
+        pass
+
+    def _update(self, node: BucketNode) -> None:
+        node._height = 1 + max(self._node_height(node._left), self._node_height(node._right))
+        node._size = len(node._value) + self._node_size(node._left) + self._node_size(node._right)
+
+    def _refresh_path(self, path: List[BucketNode]) -> None:
+        # a bucket changed size without changing the shape of the tree, so only the counts above it need redoing
+        for node in reversed(path):
+            self._update(node)
+
+    def merge(self, pairs: Iterable[Tuple[K, V]]) -> None:
+        # the batch is grouped straight from the pairs, so a repeated key doesn't make a node only to be folded away
+        pairs = list(pairs)
+        self._check_sorted(pairs)
+        self._merge_nodes(self._nodes_from_pairs(pairs))
+
+    def _merge_nodes(self, new_nodes: List[BucketNode]) -> None:
+        # AVLTree's strategies, with equal keys folded together. Inserts and the union already put a key that is in
+        # the tree into its bucket, the sorted relink pass needs the old and new node for a key coalesced
+        new_nodes = self._coalesce(new_nodes)
+        if 4 * len(new_nodes) < self.size():
+            super()._merge_nodes(new_nodes)
+            return
+        merged = self._coalesce(heapq.merge(list(self._iter_nodes()), new_nodes, key=attrgetter('_key')))
+        self._root = self._link(merged, 0, len(merged))
+
+    @classmethod
+    def join(cls, left: MultiMapAVLTree[K, V], key: K, value: V, right: MultiMapAVLTree[K, V]) -> MultiMapAVLTree[K, V]:
+        """Same as AVLTree.join. A key equal to the largest key of left or the smallest of right doesn't get a
+        node of its own but goes into that bucket, which costs a union instead of a single join.
+        """
+        left._check_in_place()
+        right._check_in_place()
+        left_max = left.top_k(1)[0][0] if left._root is not None else None
+        right_min = right.bottom_k(1)[0][0] if right._root is not None else None
+        if (left_max is None or left_max < key) and (right_min is None or key < right_min):
+            return super().join(left, key, value, right)
+        if left_max is not None and key < left_max:
+            raise ValueError(f"Every key in the left tree has to be <= {key}.")
+        if right_min is not None and right_min < key:
+            raise ValueError(f"Every key in the right tree has to be >= {key}.")
+        tree = cls()
+        tree._root = left._root
+        tree.insert(key, value)  # after left's values for the key, and right's go after it
+        tree._root = tree._union(tree._root, right._root, copy_other=False)
+        left._root = right._root = None
+        return tree
+
+    def insert_many(self, pairs: Iterable[Tuple[K, V]]) -> None:
+        nodes = self._nodes_from_pairs(sorted(pairs, key=itemgetter(0)))
+        self._root = self._union(self._root, self._link(nodes, 0, len(nodes)), copy_other=False)
+
+    def _copy_subtree(self, node: Optional[BucketNode]) -> Optional[BucketNode]:
+        # the buckets are copied too, so the copy and the original can take values independently
+        if node is None:
+            return None
+        clone = copy.copy(node)
+        clone._value = list(node._value)
+        clone._left = self._copy_subtree(node._left)
+        clone._right = self._copy_subtree(node._right)
+        return clone
+
+    def _union(self, node: Optional[BucketNode], other: Optional[BucketNode], copy_other: bool) -> Optional[BucketNode]:
+        # like AVLTree._union, except that a key in both trees keeps our node and gets the other's values added to its bucket
+        if other is None:
+            return node
+        if node is None:
+            return self._copy_subtree(other) if copy_other else other
+        equal: List[BucketNode] = []
+        less, greater = self._split_out(node, other._key, equal)
+        left = self._union(less, other._left, copy_other)
+        right = self._union(greater, other._right, copy_other)
+        if equal:
+            pivot = equal[0]
+            pivot._value.extend(other._value)
+            self._bucket_changed(pivot)
+        elif copy_other:
+            pivot = copy.copy(other)
+            pivot._value = list(other._value)
+        else:
+            pivot = other
+        return self._join(left, pivot, right)
+
+    def _snapshot_sections(self) -> List[bytes]:
+        # one key per value, so the file reads back the same way as one written by AVLTree
+        pairs = list(self.iter_inorder())
+        return [pack_keys([key for key, _ in pairs]), pack_values([value for _, value in pairs])]
+
+    def _nodes_from_snapshot(self, sections: List[memoryview]) -> List[BucketNode]:
+        return self._nodes_from_pairs(zip(unpack_keys(sections[0]), unpack_values(sections[1])))
+
+    def _insert_node(self, new_node: BucketNode) -> None:
+        # a key that's already in the tree takes the new node's values into its bucket, otherwise the node is
+        # hung off the bottom and the path retraced like AVLTree does
+        self._update(new_node)  # a batch may have folded several values into it since it was made
+        if self._root is None:
+            self._root = new_node
+            return
+
+        path: List[BucketNode] = []
+        node: Optional[BucketNode] = self._root
+        key = new_node._key
+        while node is not None:
+            path.append(node)
+            if key < node._key:
+                node = node._left
+            elif node._key < key:
+                node = node._right
+            else:
+                node._value.extend(new_node._value)
+                self._bucket_changed(node)
+                self._refresh_path(path)
+                return
+
+        parent = path[-1]
+        if key < parent._key:
+            parent._left = new_node
+        else:
+            parent._right = new_node
+        self._retrace(path)
+
+    def insert_helper(self, node: Optional[BucketNode], key: K, value: V) -> BucketNode:
+        # the recursive insert kept from AVLTree, with a key that's already there going into its bucket
+        if node is None:
+            return self._node_type(key, value)
+        if key < node._key:
+            node._left = self.insert_helper(node._left, key, value)
+        elif node._key < key:
+            node._right = self.insert_helper(node._right, key, value)
+        else:
+            node._value.append(value)
+            self._bucket_changed(node)
+        return self._rebalance(node)
+
+    def delete_helper(self, node: Optional[BucketNode], key: K) -> Optional[BucketNode]:
+        # the recursive delete kept from AVLTree, which takes out the key's whole bucket. A node with two
+        # children takes over its successor's bucket, so whatever a subclass keeps about the bucket is redone
+        if node is None:
+            raise KeyError(f"Key {key} not found in the tree.")
+        if key < node._key:
+            node._left = self.delete_helper(node._left, key)
+        elif node._key < key:
+            node._right = self.delete_helper(node._right, key)
+        elif node._left is None or node._right is None:
+            child = node._left if node._left is not None else node._right
+            return self._rebalance(child) if child is not None else None
+        else:
+            successor = self.find_min(node._right)
+            node._key, node._value = successor._key, successor._value
+            self._bucket_changed(node)
+            node._right = self.delete_helper(node._right, successor._key)
+        return self._rebalance(node)
+
+    def _find_path(self, key: K, match: Callable[[BucketNode], bool]) -> Optional[List[BucketNode]]:
+        # every value under a key is in one node, so this is a plain walk down with no ties to look past
+        path: List[BucketNode] = []
+        node = self._root
+        while node is not None:
+            path.append(node)
+            if key < node._key:
+                node = node._left
+            elif node._key < key:
+                node = node._right
+            else:
+                return path if match(node) else None
+        return None
+
+    def _find_node(self, key: K) -> Optional[BucketNode]:
+        node = self._root
+        while node is not None:
+            if key < node._key:
+                node = node._left
+            elif node._key < key:
+                node = node._right
+            else:
+                return node
+        return None
+
+    def search(self, key: K) -> Optional[V]:
+        """The first value added under key that is still there, None if the key isn't in the tree."""
+        node = self._find_node(key)
+        return node._value[0] if node is not None else None
+
+    def search_all(self, key: K) -> List[V]:
+        """Every value under key in the order they were added, an empty list if the key isn't in the tree."""
+        node = self._find_node(key)
+        return list(node._value) if node is not None else []
+
+    def count(self, key: K) -> int:
+        """How many values are stored under key, O(log n)."""
+        node = self._find_node(key)
+        return len(node._value) if node is not None else 0
+
+    def delete(self, key: K) -> None:
+        """Removes the first value under key, and the key's node once its bucket is empty.
+
+        Raises KeyError if the key isn't in the tree.
+        """
+        path = self._find_path(key, lambda node: True)
+        if path is None:
+            raise KeyError(f"Key {key} not found in the tree.")
+        self._take(path, 0)
+
+    def remove(self, key: K, value: V) -> None:
+        """Removes one value from under key: the same object if it's there, otherwise the first equal one.
+
+        Raises KeyError if there's no such value under the key.
+        """
+        path = self._find_path(key, lambda node: True)
+        bucket = path[-1]._value if path is not None else []
+        index = next((index for index, stored in enumerate(bucket) if stored is value), None)
+        if index is None and value in bucket:
+            index = bucket.index(value)
+        if index is None:
+            raise KeyError(f"Key {key} with value {value!r} not found in the tree.")
+        self._take(path, index)
+
+    def _take(self, path: List[BucketNode], index: int) -> None:
+        # takes one value out of the bucket at the end of path, unhooking the node when it was the last one
+        node = path[-1]
+        if len(node._value) == 1:
+            self._delete_at(path)
+            return
+        del node._value[index]
+        self._bucket_changed(node)
+        self._refresh_path(path)
+
+    def rank(self, key: K, inclusive: bool = False) -> int:
+        smaller = 0
+        node = self._root
+        while node is not None:
+            if node._key < key or (inclusive and not key < node._key):  # this node's whole bucket and its left side count
+                smaller += self._node_size(node._left) + len(node._value)
+                node = node._right
+            else:
+                node = node._left
+        return smaller
+
+    def select(self, index: int) -> Tuple[K, V]:
+        if index < 0 or index >= self.size():
+            raise IndexError(f"Index {index} out of range for a tree of size {self.size()}.")
+        node = self._root
+        while node is not None:
+            left_size = self._node_size(node._left)
+            if index < left_size:
+                node = node._left
+            elif index >= left_size + len(node._value):  # past this node's bucket too
+                index -= left_size + len(node._value)
+                node = node._right
+            else:  # somewhere inside this bucket
+                return node._key, node._value[index - left_size]
+        raise IndexError(f"Index {index} out of range.")  # only reachable if the counts are broken
+
+    @staticmethod
+    def _flatten(pairs: Iterator[Tuple[K, List[V]]], reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        # (key, bucket) pairs out of AVLTree's walks, turned into one (key, value) pair per value
+        for key, bucket in pairs:
+            for value in (reversed(bucket) if reverse else bucket):
+                yield key, value
+
+    def iter_inorder(self, reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        return self._flatten(super().iter_inorder(reverse), reverse)
+
+    def iter_preorder(self) -> Iterator[Tuple[K, V]]:
+        return self._flatten(super().iter_preorder())
+
+    def iter_postorder(self) -> Iterator[Tuple[K, V]]:
+        return self._flatten(super().iter_postorder())
+
+    def iter_bforder(self) -> Iterator[Tuple[K, V]]:
+        return self._flatten(super().iter_bforder())
+
+    def irange(self, lo: Optional[K] = None, hi: Optional[K] = None, inclusive: Tuple[bool, bool] = (True, True),
+               reverse: bool = False) -> Iterator[Tuple[K, V]]:
+        return self._flatten(super().irange(lo, hi, inclusive, reverse), reverse)
+
+    def __iter__(self) -> Iterator[K]:
+        for key, _ in self.iter_inorder():
+            yield key
+
+    def __reversed__(self) -> Iterator[K]:
+        for key, _ in self.iter_inorder(reverse=True):
+            yield key
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import copy
+import heapq
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Generic, Iterable, List, Optional, Tuple
+
+from datastructures.avltree import AVLNode, AVLTree
+from datastructures.iavltree import K, V
+
+_JOIN_REFUSED = "PersistentAVLTree can't be changed in place, the join-based bulk operations rewire shared nodes."
+
+
+@lru_cache(maxsize=None)
+def _slot_names(node_type: type) -> Tuple[str, ...]:
+    # every slot declared anywhere in the node class's hierarchy, so subclasses like IntervalNode copy fully
+    names: List[str] = []
+    for klass in reversed(node_type.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return tuple(names)
+
+
+class PersistentAVLTree(AVLTree[K, V], Generic[K, V]):
+    """ An immutable AVL tree where every update gives back a new version and leaves the old one alone.
+
+    insert, delete, remove, merge and insert_many copy only the nodes on the way down to the change (plus the few
+    that a rotation moves) and share every other subtree with the version they started from. An update
+    costs O(log n) time and new nodes, and keeping a version around as a snapshot costs nothing: a
+    report can read one version while ingestion keeps making newer ones.
+
+    Reads work exactly like AVLTree. Any node reachable from a published version must never be changed
+    in place, so code that pokes at nodes directly (like PriceTree.refresh) doesn't belong on this tree,
+    and split, join, union, intersection, difference and delete_many raise TypeError.
+    """
+
+    def _clone(self, node: AVLNode) -> AVLNode:
+        # a shallow copy of one node, the copy gets changed and the original stays in the older versions
+        if hasattr(node, '__dict__'):
+            return copy.copy(node)
+        node_type = type(node)
+        clone = node_type.__new__(node_type)
+        for name in _slot_names(node_type):
+            setattr(clone, name, getattr(node, name))
+        return clone
+
+    def _version(self, root: Optional[AVLNode]) -> PersistentAVLTree[K, V]:
+        # a new tree object for a new root, same class and settings as this one
+        version = copy.copy(self)
+        version._root = root
+        if version._metrics is not None:  # the copied wrappers still count against this version, point them at the new one
+            version.enable_metrics(version._metrics)
+        return version
+
+    def _copy_path(self, path: List[AVLNode]) -> List[AVLNode]:
+        # clones every node on a root-to-node path and links the clones to each other, giving back the new path.
+        # Called on a fresh version, whose root becomes the cloned root
+        cloned: List[AVLNode] = []
+        for node in path:
+            clone = self._clone(node)
+            if cloned:
+                parent = cloned[-1]
+                if parent._left is node:
+                    parent._left = clone
+                else:
+                    parent._right = clone
+            cloned.append(clone)
+        self._root = cloned[0] if cloned else None
+        return cloned
+
+    def _rebalance(self, node: AVLNode) -> AVLNode:
+        # rotations rewire the heavy child (and the grandchild for LR and RL). On a delete those hang off the
+        # sibling side and are still shared with older versions, so they are copied before anything moves
+        self._update(node)
+        balance = self._balance_factor(node)
+        if balance > 1:
+            node._left = self._clone(node._left)
+            if self._balance_factor(node._left) < 0:
+                node._left._right = self._clone(node._left._right)
+        elif balance < -1:
+            node._right = self._clone(node._right)
+            if self._balance_factor(node._right) > 0:
+                node._right._left = self._clone(node._right._left)
+        return super()._rebalance(node)
+
+    def insert(self, key: K, value: V) -> PersistentAVLTree[K, V]:  # type: ignore[override]
+        """Returns a new version with the pair added. Equal keys go to the right like in AVLTree."""
+        new_node = self._node_type(key, value)
+        version = self._version(self._root)
+        if self._root is None:
+            version._root = new_node
+            return version
+
+        path: List[AVLNode] = []
+        node: Optional[AVLNode] = self._root
+        while node is not None:
+            path.append(node)
+            node = node._left if key < node._key else node._right
+
+        path = version._copy_path(path)
+        parent = path[-1]
+        if key < parent._key:
+            parent._left = new_node
+        else:
+            parent._right = new_node
+        version._retrace(path)
+        return version
+
+    def delete(self, key: K) -> PersistentAVLTree[K, V]:  # type: ignore[override]
+        """Returns a new version without one entry for the key.
+
+        Raises KeyError if the key is not present in the tree.
+        """
+        path = self._find_path(key, lambda node: True)
+        if path is None:
+            raise KeyError(f"Key {key} not found in the tree.")
+        return self._delete_version(path)
+
+    def remove(self, key: K, value: V) -> PersistentAVLTree[K, V]:  # type: ignore[override]
+        """Returns a new version without the entry for key that holds value (the same object, or an equal one).
+
+        Raises KeyError if there's no such entry.
+        """
+        path = self._find_path(key, lambda node: node._value is value) or self._find_path(key, lambda node: node._value == value)
+        if path is None:
+            raise KeyError(f"Key {key} with value {value!r} not found in the tree.")
+        return self._delete_version(path)
+
+    def _delete_version(self, path: List[AVLNode]) -> PersistentAVLTree[K, V]:
+        # _delete_at moves the in-order successor up into the deleted node's place, so the way down to the
+        # successor gets copied along with the path, then the usual unhook and retrace run on the copies
+        index = len(path) - 1
+        node = path[-1]
+        if node._left is not None and node._right is not None:
+            successor = node._right
+            path.append(successor)
+            while successor._left is not None:
+                successor = successor._left
+                path.append(successor)
+
+        version = self._version(self._root)
+        cloned = version._copy_path(path)
+        version._delete_at(cloned[:index + 1])
+        return version
+
+    def merge(self, pairs: Iterable[Tuple[K, V]]) -> PersistentAVLTree[K, V]:  # type: ignore[override]
+        """Returns a new version with a batch of (key, value) pairs, already sorted by key, added.
+
+        A small batch is inserted one pair at a time and shares most of the tree. A large one is merged
+        with the existing pairs and built into a fresh balanced tree in O(n + m).
+
+        Raises ValueError if the batch isn't sorted by key.
+        """
+        pairs = list(pairs)
+        self._check_sorted(pairs)
+        size = self.size()
+        if len(pairs) * max(size, 1).bit_length() < size:
+            version = self
+            for key, value in pairs:
+                version = version.insert(key, value)
+            return version
+
+        # the existing nodes are cloned first, so _link can rewire them without touching older versions
+        existing = [self._clone(node) for node in self._iter_nodes()]
+        new_nodes = [self._node_type(key, value) for key, value in pairs]
+        merged = list(heapq.merge(existing, new_nodes, key=attrgetter('_key')))
+        version = self._version(None)
+        version._root = version._link(merged, 0, len(merged))
+        return version
+
+    def insert_many(self, pairs: Iterable[Tuple[K, V]]) -> PersistentAVLTree[K, V]:  # type: ignore[override]
+        """Returns a new version with a batch of pairs in any order added, like merge after one sort."""
+        return self.merge(sorted(pairs, key=itemgetter(0)))
+
+    # the join-based bulk operations rewire the nodes they're given, which older versions still share, so they're
+    # refused up front, before either tree is touched, even when one side is empty and nothing would get rewired
+
+    def _check_in_place(self) -> None:
+        raise TypeError(_JOIN_REFUSED)
+
+    def split(self, key: K) -> Tuple[AVLTree[K, V], AVLTree[K, V]]:
+        raise TypeError(_JOIN_REFUSED)
+
+    @classmethod
+    def join(cls, left: AVLTree[K, V], key: K, value: V, right: AVLTree[K, V]) -> AVLTree[K, V]:
+        raise TypeError(_JOIN_REFUSED)
+
+    def union(self, other: AVLTree[K, V]) -> None:
+        raise TypeError(_JOIN_REFUSED)
+
+    def intersection(self, other: AVLTree[K, V]) -> None:
+        raise TypeError(_JOIN_REFUSED)
+
+    def difference(self, other: AVLTree[K, V]) -> None:
+        raise TypeError(_JOIN_REFUSED)
+
+    def delete_many(self, keys: Iterable[K]) -> int:
+        raise TypeError(_JOIN_REFUSED)
+
+    def insert_helper(self, node: Optional[AVLNode], key: K, value: V) -> AVLNode:
+        raise TypeError("PersistentAVLTree can't be changed in place, use insert to get a new version.")
+
+    def delete_helper(self, node: Optional[AVLNode], key: K) -> Optional[AVLNode]:
+        raise TypeError("PersistentAVLTree can't be changed in place, use delete to get a new version.")
+
+    def _merge_nodes(self, new_nodes: List[AVLNode]) -> None:
+        raise TypeError("PersistentAVLTree can't be changed in place, use merge to get a new version.")
+
+    def _insert_node(self, new_node: AVLNode) -> None:
+        raise TypeError("PersistentAVLTree can't be changed in place, use insert to get a new version.")
+
+    def _join(self, left: Optional[AVLNode], node: AVLNode, right: Optional[AVLNode]) -> AVLNode:
+        raise TypeError(_JOIN_REFUSED)
@@ -0,0 +1,140 @@
+"""
+A small versioned binary container for tree snapshots.
+
+Layout, little endian:
+    magic      4 bytes   b'AVLS'
+    version    uint16    SNAPSHOT_VERSION
+    kind       4 bytes   what wrote the file, for example b'AVLT' for an AVLTree
+    sections   uint32    how many sections follow
+    then for every section:
+        length uint64
+        data   length bytes
+
+Readers map the file with mmap and get each section as a memoryview, so numeric key columns are
+copied straight out of the page cache and pickled values are unpickled without an extra read.
+"""
+from __future__ import annotations
+
+import gc
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Sequence
+
+MAGIC = b'AVLS'
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct('<4sH4sI')
+_LENGTH = struct.Struct('<Q')
+
+# the first byte of a packed key column says how the rest is stored
+_FLOAT_KEYS = b'd'
+_INT_KEYS = b'q'
+_PICKLED_KEYS = b'p'
+
+
+def write_snapshot(path: str, kind: bytes, sections: Sequence[bytes]) -> None:
+    """Writes sections to path, replacing the file only once the new one is complete. kind is a 4 byte tag
+    naming the writer, checked again on read.
+    """
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION, kind, len(sections)))
+        for section in sections:
+            file.write(_LENGTH.pack(len(section)))
+            file.write(section)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+@contextmanager
+def open_snapshot(path: str, kind: bytes) -> Iterator[List[memoryview]]:
+    """Maps a snapshot and yields its sections. The views are only valid inside the with block.
+
+    Raises ValueError if the file isn't a snapshot, was written by something else, has another version, or is truncated.
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < _HEADER.size:
+            raise ValueError(f"{path} is too short to be a snapshot.")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            sections: List[memoryview] = []
+            try:
+                magic, version, found_kind, count = _HEADER.unpack_from(view, 0)
+                if magic != MAGIC:
+                    raise ValueError(f"{path} is not a snapshot.")
+                if version != SNAPSHOT_VERSION:
+                    raise ValueError(f"{path} is snapshot version {version}, this code reads version {SNAPSHOT_VERSION}.")
+                if found_kind != kind:
+                    raise ValueError(f"{path} holds a {found_kind!r} snapshot, expected {kind!r}.")
+                position = _HEADER.size
+                for _ in range(count):
+                    if position + _LENGTH.size > len(view):
+                        raise ValueError(f"{path} is truncated.")
+                    (length,) = _LENGTH.unpack_from(view, position)
+                    position += _LENGTH.size
+                    if position + length > len(view):
+                        raise ValueError(f"{path} is truncated.")
+                    sections.append(view[position:position + length])
+                    position += length
+                yield sections
+            finally:
+                # every view has to be released before the map can close
+                for section in sections:
+                    section.release()
+                view.release()
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """Turns the cyclic garbage collector off for a bulk load and back on (if it was on) afterwards.
+
+    Loading a snapshot allocates millions of objects without freeing any. Each allocation burst makes
+    the collector rescan the ever larger heap, which can take longer than the load itself. Nothing a
+    load builds forms a reference cycle, so nothing is lost by waiting.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def pack_keys(keys: Sequence[Any]) -> bytes:
+    """Packs a key column, as raw doubles or int64s when every key is a float or an int, pickled otherwise."""
+    if all(type(key) is float for key in keys):
+        return _FLOAT_KEYS + array('d', keys).tobytes()
+    if all(type(key) is int for key in keys):
+        try:
+            return _INT_KEYS + array('q', keys).tobytes()
+        except OverflowError:
+            pass
+    return _PICKLED_KEYS + pickle.dumps(list(keys), pickle.HIGHEST_PROTOCOL)
+
+
+def unpack_keys(data: memoryview) -> Sequence[Any]:
+    """Reverses pack_keys."""
+    tag, payload = bytes(data[:1]), data[1:]
+    if tag == _PICKLED_KEYS:
+        return pickle.loads(payload)
+    if tag not in (_FLOAT_KEYS, _INT_KEYS):
+        raise ValueError(f"Unknown key column type {tag!r}.")
+    keys = array(tag.decode())
+    keys.frombytes(payload)
+    return keys.tolist()
+
+
+def pack_values(values: Any) -> bytes:
+    """Pickles values in one go, so objects shared between them stay shared after loading."""
+    return pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+
+
+def unpack_values(data: memoryview) -> Any:
+    """Reverses pack_values. Only load snapshots you wrote yourself, since this unpickles."""
+    return pickle.loads(data)
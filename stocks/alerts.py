@@ -0,0 +1,110 @@
+"""
+Price alerts that fire when a price crosses a threshold.
+
+Each symbol has two AVL trees of thresholds, one for alerts on a rise above a level and one for
+alerts on a drop below a level. A tick from old to new only looks at the thresholds between the two
+prices, through an irange on one of the trees. That costs O(log n + fired), however many alerts are
+registered and however many stocks are being watched.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+from datastructures.avltree import AVLTree
+
+ABOVE = 'above'
+BELOW = 'below'
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    """One alert firing: symbol crossed threshold in direction, moving from previous_price to price."""
+    symbol: str
+    threshold: float
+    direction: str
+    previous_price: float
+    price: float
+
+    def __str__(self) -> str:
+        verb = 'rose above' if self.direction == ABOVE else 'dropped below'
+        return f"Alert: {self.symbol} {verb} ${self.threshold:.2f} ({self.previous_price:.2f} -> {self.price:.2f})"
+
+
+class AlertRegistry:
+    """Per-symbol upper and lower thresholds kept in sorted trees.
+
+    Fired events go to on_alert if one is given, for example a callback or a queue's put_nowait.
+    Otherwise they are buffered until drain is called.
+    """
+
+    def __init__(self, on_alert: Optional[Callable[[AlertEvent], None]] = None) -> None:
+        """Creates an empty registry. on_alert, if given, gets every event as it fires."""
+        self._on_alert = on_alert
+        self._pending: Deque[AlertEvent] = deque()
+        self._trees: Dict[str, Dict[str, AVLTree]] = {ABOVE: {}, BELOW: {}}
+
+    def _check_direction(self, direction: str) -> None:
+        if direction not in self._trees:
+            raise ValueError(f"Direction must be '{ABOVE}' or '{BELOW}', got {direction!r}.")
+
+    def add(self, symbol: str, threshold: float, direction: str) -> None:
+        """Registers an alert. The same threshold can be registered more than once and then fires once per registration.
+
+        'above' fires when the price rises to or through the threshold, 'below' when it drops to or through it.
+        Raises ValueError if direction isn't 'above' or 'below'.
+        """
+        self._check_direction(direction)
+        self._trees[direction].setdefault(symbol, AVLTree()).insert(threshold, symbol)
+
+    def remove(self, symbol: str, threshold: float, direction: str) -> None:
+        """Removes one registration of an alert.
+
+        Raises ValueError if direction isn't 'above' or 'below'. Raises KeyError if no such alert is registered.
+        """
+        self._check_direction(direction)
+        tree = self._trees[direction].get(symbol)
+        if tree is None:
+            raise KeyError(f"No {direction} alerts registered for {symbol}.")
+        tree.delete(threshold)
+        if not len(tree):
+            del self._trees[direction][symbol]
+
+    def thresholds(self, symbol: str, direction: str) -> List[float]:
+        """Every threshold registered for symbol in direction, in ascending order."""
+        self._check_direction(direction)
+        tree = self._trees[direction].get(symbol)
+        return tree.inorder() if tree is not None else []
+
+    def evaluate(self, symbol: str, previous_price: float, price: float) -> List[AlertEvent]:
+        """Fires the alerts crossed by a move from previous_price to price, nearest threshold first.
+
+        A rise fires the 'above' thresholds in (previous_price, price]. A drop fires the 'below'
+        thresholds in [price, previous_price). A price that stays put fires nothing. The events are
+        returned as well as sent on.
+        """
+        if previous_price < price:
+            tree = self._trees[ABOVE].get(symbol)
+            crossed = tree.irange(previous_price, price, inclusive=(False, True)) if tree is not None else ()
+            direction = ABOVE
+        elif price < previous_price:
+            tree = self._trees[BELOW].get(symbol)
+            crossed = tree.irange(price, previous_price, inclusive=(True, False), reverse=True) if tree is not None else ()
+            direction = BELOW
+        else:
+            return []
+
+        events = [AlertEvent(symbol, threshold, direction, previous_price, price) for threshold, _ in crossed]
+        for event in events:
+            if self._on_alert is not None:
+                self._on_alert(event)
+            else:
+                self._pending.append(event)
+        return events
+
+    def drain(self) -> List[AlertEvent]:
+        """Returns and clears the events buffered since the last drain, oldest first."""
+        events = list(self._pending)
+        self._pending.clear()
+        return events
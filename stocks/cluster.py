@@ -0,0 +1,267 @@
+"""
+A multi-process deployment of StockPriceManager.
+
+The symbol universe is split over worker processes with the same stable crc32 hash that
+ShardedStockPriceManager uses. Each worker holds its own StockPriceManager and answers requests over
+a pipe. A single-symbol call (insert, lookup, delete) goes to the one worker that owns the symbol.
+A query over every symbol is scattered to all workers at once, so each works on its part on its own
+core. The coordinator then gathers the partial results, which come back already sorted, and combines
+them with k-way merges.
+
+Run the benchmark from the repo root:
+    python -m benchmarks.bench_cluster --stocks 400000 --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import multiprocessing
+from itertools import islice
+from multiprocessing.connection import Connection
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from stocks.loader import DEFAULT_CHUNK_SIZE, LoadStats, load_csv
+from stocks.sharded import shard_of
+from stocks.stock import StockNode, StockPriceManager
+
+
+def _select_middle(manager: StockPriceManager, low: int, high: int) -> Optional[float]:
+    # the low price halfway through positions [low, high) of this worker's tree, None if the window is empty
+    return manager._tree.select((low + high) // 2)[0] if low < high else None
+
+
+def _rank_pair(manager: StockPriceManager, key: float) -> Tuple[int, int]:
+    # how many stocks have a low price below key, and how many at or below it
+    return manager._tree.rank(key), manager._tree.rank(key, inclusive=True)
+
+
+def _range_rows(manager: StockPriceManager, low: float, high: float) -> List[Tuple[float, str, float]]:
+    # (low price, symbol, current price) for range_query, a lot cheaper to send back than whole stocks
+    return [(stock.low_price, stock.stock_symbol, stock.current_price)
+            for stock in manager.get_stocks_in_price_range(low, high)]
+
+
+def _add_rows(manager: StockPriceManager, rows: List[List[str]]) -> None:
+    manager.add_stocks([StockNode(symbol, name, current_price=float(high), low_price=float(low))
+                        for symbol, name, low, high in rows])
+
+
+# requests a worker understands besides the manager's own public methods
+_COMMANDS: Dict[str, Callable[..., Any]] = {
+    'size': lambda manager: manager._tree.size(),
+    'select': lambda manager, index: manager._tree.select(index),
+    'select_middle': _select_middle,
+    'rank_pair': _rank_pair,
+    'range_rows': _range_rows,
+    'add_rows': _add_rows,
+}
+
+
+def _worker_main(connection: Connection) -> None:
+    # runs in the worker process: apply each (name, args) request to the local manager and send back
+    # ('ok', result) or ('error', exception) until told to stop
+    manager = StockPriceManager()
+    while True:
+        name, args = connection.recv()
+        if name == 'stop':
+            connection.close()
+            return
+        try:
+            command = _COMMANDS.get(name)
+            if command is not None:
+                result = command(manager, *args)
+            elif name.startswith('_'):
+                raise AttributeError(f"{name} is not a public StockPriceManager method.")
+            else:
+                result = getattr(manager, name)(*args)
+            connection.send(('ok', result))
+        except Exception as error:  # the coordinator re-raises it, the worker keeps serving
+            connection.send(('error', error))
+
+
+class ClusterStockPriceManager:
+    """Coordinator for a pool of worker processes, each with its own StockPriceManager.
+
+    Use it as a context manager, or call close when done, so the workers exit. A coordinator is not
+    thread-safe: every call is a request/response exchange on the workers' pipes.
+    """
+
+    def __init__(self, workers: int = 4, start_method: Optional[str] = None) -> None:
+        """Starts the worker processes, with the platform's default start method unless start_method says
+        'fork', 'spawn' or 'forkserver'. Raises ValueError if workers is not positive.
+        """
+        if workers <= 0:
+            raise ValueError(f"Need at least one worker, got {workers}.")
+        context = multiprocessing.get_context(start_method)
+        self._connections: List[Connection] = []
+        self._processes = []
+        for _ in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker_main, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def __enter__(self) -> ClusterStockPriceManager:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops every worker and waits for it to exit."""
+        for connection in self._connections:
+            try:
+                connection.send(('stop', ()))
+                connection.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join()
+        self._connections, self._processes = [], []
+
+    @property
+    def workers(self) -> int:
+        return len(self._connections)
+
+    @staticmethod
+    def _receive(connection: Connection) -> Any:
+        status, result = connection.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def _call(self, worker: int, name: str, *args: Any) -> Any:
+        connection = self._connections[worker]
+        connection.send((name, args))
+        return self._receive(connection)
+
+    def _scatter(self, requests: Sequence[Tuple[str, Tuple[Any, ...]]]) -> List[Any]:
+        # sends request i to worker i, all before waiting on any reply, so the workers run in parallel
+        for connection, request in zip(self._connections, requests):
+            connection.send(request)
+        results = []
+        error: Optional[Exception] = None
+        for connection in self._connections[:len(requests)]:
+            try:  # every reply is read even after an error, so no stale answer is left in a pipe
+                results.append(self._receive(connection))
+            except Exception as failure:
+                error = error or failure
+                results.append(None)
+        if error is not None:
+            raise error
+        return results
+
+    def _broadcast(self, name: str, *args: Any) -> List[Any]:
+        return self._scatter([(name, args)] * self.workers)
+
+    def _owner(self, symbol: str) -> int:
+        return shard_of(symbol, self.workers)
+
+    def insert(self, stock_symbol: str, stock_name: str, current_price: float, low_price: float) -> None:
+        self._call(self._owner(stock_symbol), 'insert', stock_symbol, stock_name, current_price, low_price)
+
+    def delete(self, stock_symbol: str, low_price: Optional[float] = None) -> List[StockNode]:
+        """Same as StockPriceManager.delete, gives back copies of the removed stocks.
+
+        Raises KeyError if there's nothing to remove.
+        """
+        return self._call(self._owner(stock_symbol), 'delete', stock_symbol, low_price)
+
+    def add_stocks(self, stocks: List[StockNode]) -> None:
+        """Sends each worker its share of the stocks as one batch."""
+        batches: List[List[StockNode]] = [[] for _ in range(self.workers)]
+        for stock in stocks:
+            batches[self._owner(stock.stock_symbol)].append(stock)
+        self._scatter([('add_stocks', (batch,)) for batch in batches])
+
+    def load_from_csv(self, filepath: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> LoadStats:
+        """Streams a CSV, sending each worker its rows of every chunk. Workers parse their rows in parallel."""
+        def apply_chunk(rows: List[List[str]]) -> None:
+            batches: List[List[List[str]]] = [[] for _ in range(self.workers)]
+            for row in rows:
+                batches[self._owner(row[0])].append(row)
+            self._scatter([('add_rows', (batch,)) for batch in batches])
+        return load_csv(filepath, apply_chunk, chunk_size)
+
+    def lookup_stock_price(self, symbol: str) -> Optional[StockNode]:
+        return self._call(self._owner(symbol), 'lookup_stock_price', symbol)
+
+    def lookup_stock_bands(self, symbol: str) -> List[StockNode]:
+        return self._call(self._owner(symbol), 'lookup_stock_bands', symbol)
+
+    def size(self) -> int:
+        return sum(self._broadcast('size'))
+
+    def get_stocks_in_price_range(self, low: float, high: float) -> List[StockNode]:
+        """Stocks whose low price is in [low, high], in low price order across every worker.
+
+        These are copies, price history and all, so a wide range costs a lot more to ship than to find.
+        Use range_query when symbols and prices are enough.
+        """
+        return list(heapq.merge(*self._broadcast('get_stocks_in_price_range', low, high), key=attrgetter('low_price')))
+
+    def range_query(self, low_price: float, high: float) -> List[Tuple[str, float]]:
+        """(symbol, current price) of the stocks whose low price is in [low_price, high], in low price order."""
+        rows = heapq.merge(*self._broadcast('range_rows', low_price, high), key=itemgetter(0))
+        return [(symbol, price) for _, symbol, price in rows]
+
+    def get_top_k(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        """Every worker's top k, k-way merged down to the overall top k.
+
+        Raises ValueError if by isn't 'low_price' or 'max_price'.
+        """
+        partials = self._broadcast('get_top_k', k, by)
+        return list(islice(heapq.merge(*partials, key=attrgetter(by), reverse=True), k))
+
+    def get_bottom_k(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        """Every worker's bottom k, k-way merged down to the overall bottom k.
+
+        Raises ValueError if by isn't 'low_price' or 'max_price'.
+        """
+        partials = self._broadcast('get_bottom_k', k, by)
+        return list(islice(heapq.merge(*partials, key=attrgetter(by)), k))
+
+    def find_percentile(self, percentile: float) -> Optional[Tuple[str, float]]:
+        """The stock at a percentile of low price over every worker, nearest rank like StockPriceManager.
+
+        A distributed select: each round asks every worker for the middle of its remaining window,
+        takes the weighted median of those as a pivot, and asks every worker for the pivot's rank.
+        Each round rules out at least a quarter of the remaining stocks, so it needs O(log n) rounds of
+        two scatters each, and the stocks themselves never leave the workers.
+
+        Raises ValueError if percentile is not between 0 and 100.
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"Percentile must be between 0 and 100, got {percentile}.")
+        sizes = self._broadcast('size')
+        total = sum(sizes)
+        if not total:
+            return None
+        target = max(0, math.ceil(percentile / 100 * total) - 1)
+        windows = [[0, size] for size in sizes]  # the positions on each worker the answer can still be at
+
+        while True:
+            middles = self._scatter([('select_middle', (low, high)) for low, high in windows])
+            candidates = sorted((key, high - low) for key, (low, high) in zip(middles, windows) if key is not None)
+            half, seen, pivot = sum(weight for _, weight in candidates) / 2, 0, candidates[-1][0]
+            for key, weight in candidates:  # weighted median of the middles
+                seen += weight
+                if seen >= half:
+                    pivot = key
+                    break
+
+            ranks = self._broadcast('rank_pair', pivot)
+            below = sum(less for less, _ in ranks)
+            through = sum(at_most for _, at_most in ranks)
+            if below <= target < through:  # the target is one of the stocks priced exactly at the pivot
+                worker = next(index for index, (less, at_most) in enumerate(ranks) if less < at_most)
+                _, stock = self._call(worker, 'select', ranks[worker][0])
+                return (stock.stock_symbol, stock.current_price)
+            for window, (less, at_most) in zip(windows, ranks):
+                if target < below:
+                    window[1] = min(window[1], less)
+                else:
+                    window[0] = max(window[0], at_most)
@@ -0,0 +1,165 @@
+"""
+Columnar price history for batch analytics across every symbol.
+
+ColumnarHistory packs the price history of many series into one contiguous float64 array. Series i
+lives in prices[offsets[i]:offsets[i + 1]]. Returns, moving averages and volatility are then computed
+for every series in a handful of NumPy calls, instead of a Python loop over StockNodes that calls
+calculate_moving_average once per symbol.
+
+NumPy is only needed by this module. It is imported on first use, so the rest of the package works
+without it.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    from stocks.stock import StockPriceManager
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError("ColumnarHistory needs NumPy, install it with `pip install numpy`.") from error
+    return numpy
+
+
+class ColumnarHistory:
+    """Every series' prices packed end to end, with per-series offsets.
+
+    Batch methods return one value per series, in the order of keys, or a packed array that uses the
+    same offsets as prices. Positions that don't have enough data are NaN.
+    """
+
+    def __init__(self, keys: List[Hashable], prices: 'np.ndarray', offsets: 'np.ndarray') -> None:
+        """Wraps already packed arrays. Most callers want from_series or from_manager instead.
+
+        offsets holds len(keys) + 1 start positions into prices, the last one equal to len(prices).
+        Raises ValueError if the offsets don't describe len(keys) series covering prices.
+        """
+        np = _numpy()
+        self.keys = list(keys)
+        self.prices = np.ascontiguousarray(prices, dtype=np.float64)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        if (len(self.offsets) != len(self.keys) + 1 or self.offsets[0] != 0
+                or self.offsets[-1] != len(self.prices) or (np.diff(self.offsets) < 0).any()):
+            raise ValueError("Offsets must start at 0, never decrease, end at len(prices) and have one entry per key plus one.")
+        self._index: Dict[Hashable, int] = {key: position for position, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_series(cls, series: Mapping[Hashable, Sequence[float]]) -> ColumnarHistory:
+        """Packs a mapping of key to prices (oldest first) into one store, keeping the mapping's order."""
+        np = _numpy()
+        keys = list(series)
+        chunks = [np.asarray(series[key], dtype=np.float64) for key in keys]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+        prices = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64)
+        return cls(keys, prices, offsets)
+
+    @classmethod
+    def from_manager(cls, manager: 'StockPriceManager') -> ColumnarHistory:
+        """Snapshots the history of every stock in a manager.
+
+        A symbol can have several price bands, so each series is keyed on (stock_symbol, low_price),
+        in the order of the manager's price tree.
+        """
+        return cls.from_series({(stock.stock_symbol, stock.low_price): stock.historical_prices.to_array()
+                                for _, stock in manager._tree.iter_items()})
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lengths(self) -> 'np.ndarray':
+        """The number of prices in each series."""
+        return _numpy().diff(self.offsets)
+
+    def series(self, key: Hashable) -> 'np.ndarray':
+        """A read-only view of one series' prices. Raises KeyError if the key is not in the store."""
+        position = self._index[key]
+        view = self.prices[self.offsets[position]:self.offsets[position + 1]]
+        view.flags.writeable = False
+        return view
+
+    def _starts(self) -> 'np.ndarray':
+        # for every packed position, the offset where its series starts
+        return _numpy().repeat(self.offsets[:-1], self.lengths())
+
+    def returns(self) -> 'np.ndarray':
+        """Simple returns, price[t] / price[t - 1] - 1, packed like prices. Each series' first entry is NaN."""
+        np = _numpy()
+        result = np.full(len(self.prices), np.nan)
+        if len(self.prices) > 1:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[1:] = self.prices[1:] / self.prices[:-1] - 1.0
+        result[self.offsets[:-1][self.lengths() > 0]] = np.nan
+        return result
+
+    def moving_average(self, period: int) -> 'np.ndarray':
+        """Trailing simple moving average, packed like prices. The first period - 1 entries of each series are NaN.
+
+        Raises ValueError if period is not positive.
+        """
+        if period <= 0:
+            raise ValueError(f"Period must be positive, got {period}.")
+        np = _numpy()
+        totals = np.concatenate(([0.0], np.cumsum(self.prices)))
+        ends = np.arange(1, len(self.prices) + 1)
+        result = (totals[ends] - totals[np.maximum(ends - period, 0)]) / period
+        result[ends - self._starts() < period] = np.nan
+        return result
+
+    def _tail(self, period: Optional[int], skip_first: bool) -> Tuple['np.ndarray', 'np.ndarray']:
+        # start and end of the last `period` entries of each series, optionally leaving out its first entry
+        np = _numpy()
+        starts = self.offsets[:-1] + (1 if skip_first else 0)
+        ends = self.offsets[1:]
+        if period is not None:
+            starts = np.maximum(starts, ends - period)
+        return np.minimum(starts, ends), ends
+
+    def latest_moving_average(self, period: int) -> 'np.ndarray':
+        """The current moving average of each series, NaN where a series has fewer than period prices.
+
+        This is what calculate_moving_average returns, for every series at once.
+
+        Raises ValueError if period is not positive.
+        """
+        if period <= 0:
+            raise ValueError(f"Period must be positive, got {period}.")
+        np = _numpy()
+        totals = np.concatenate(([0.0], np.cumsum(self.prices)))
+        starts, ends = self._tail(period, skip_first=False)
+        result = (totals[ends] - totals[starts]) / period
+        result[ends - starts < period] = np.nan
+        return result
+
+    def volatility(self, period: Optional[int] = None) -> 'np.ndarray':
+        """Sample standard deviation of each series' simple returns, or of only the last period of them.
+        NaN where a series has fewer than two returns.
+
+        Raises ValueError if period is given and is less than 2.
+        """
+        if period is not None and period < 2:
+            raise ValueError(f"Period must be at least 2, got {period}.")
+        np = _numpy()
+        returns = np.nan_to_num(self.returns(), nan=0.0)
+        mean_source = np.concatenate(([0.0], np.cumsum(returns)))
+        starts, ends = self._tail(period, skip_first=True)
+        counts = (ends - starts).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = (mean_source[ends] - mean_source[starts]) / counts
+            # squares of deviations from each series' own mean, summed per series with the same cumsum trick,
+            # which avoids the cancellation of sum(x^2) - n * mean^2
+            deviations = returns - np.repeat(means, self.lengths())
+            deviations[~np.isfinite(deviations)] = 0.0
+            squares = np.concatenate(([0.0], np.cumsum(deviations * deviations)))
+            result = np.sqrt((squares[ends] - squares[starts]) / (counts - 1))
+        result[counts < 2] = np.nan
+        return result
+
+    def as_dict(self, values: 'np.ndarray') -> Dict[Hashable, float]:
+        """Pairs a per-series result (like latest_moving_average) back up with the keys."""
+        return dict(zip(self.keys, values.tolist()))
@@ -0,0 +1,165 @@
+"""
+Pearson correlation between stock prices.
+
+Tracked pairs are kept up to date one tick at a time. Each pair has a Welford-style accumulator of
+means, variances and the co-moment. When either symbol ticks, the pair takes one sample: the new
+price together with the other symbol's last known price. That costs O(partners) per tick and never
+looks back at history.
+
+For pairs nobody tracked, recompute builds the full correlation matrix from the recorded histories
+with vectorized NumPy calls. NumPy is imported only there.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+
+class PairStats:
+    """Running means, second moments and co-moment of a stream of (x, y) samples."""
+    __slots__ = ('count', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x: float, y: float) -> None:
+        """Adds one sample in O(1) with Welford's update, which stays accurate where the naive sums cancel."""
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        dy = y - self.mean_y
+        self.mean_y += dy / self.count
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def covariance(self) -> Optional[float]:
+        """Sample covariance, or None with fewer than two samples."""
+        return self.c_xy / (self.count - 1) if self.count > 1 else None
+
+    def correlation(self) -> Optional[float]:
+        """Pearson correlation, or None with fewer than two samples or a price that never moved."""
+        if self.count < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return max(-1.0, min(1.0, self.c_xy / math.sqrt(self.m2_x * self.m2_y)))
+
+
+def _pair(a: str, b: str) -> Tuple[str, str]:
+    # every pair is stored once, under its symbols in sorted order
+    return (a, b) if a < b else (b, a)
+
+
+class CorrelationEngine:
+    """Incremental correlations for tracked pairs, with a full-matrix recompute for everything else."""
+
+    def __init__(self) -> None:
+        self._last_price: Dict[str, float] = {}
+        self._partners: Dict[str, Set[str]] = {}
+        self._pairs: Dict[Tuple[str, str], PairStats] = {}
+        self._matrix_symbols: Dict[str, int] = {}
+        self._matrix: Any = None
+
+    def track(self, a: str, b: str) -> None:
+        """Starts accumulating the correlation between two symbols. Tracking a pair twice does nothing.
+
+        Raises ValueError if a and b are the same symbol.
+        """
+        if a == b:
+            raise ValueError(f"Can't correlate {a} with itself.")
+        self._pairs.setdefault(_pair(a, b), PairStats())
+        self._partners.setdefault(a, set()).add(b)
+        self._partners.setdefault(b, set()).add(a)
+
+    def untrack(self, a: str, b: str) -> None:
+        """Stops tracking a pair and drops its accumulator. Raises KeyError if the pair isn't tracked."""
+        del self._pairs[_pair(a, b)]
+        self._partners[a].discard(b)
+        self._partners[b].discard(a)
+
+    def partners(self, symbol: str) -> List[str]:
+        """The symbols tracked against this one, sorted."""
+        return sorted(self._partners.get(symbol, ()))
+
+    def on_tick(self, symbol: str, price: float) -> None:
+        """Records a new price and feeds one sample into every tracked pair whose other side has a price."""
+        self._last_price[symbol] = price
+        for partner in self._partners.get(symbol, ()):
+            other = self._last_price.get(partner)
+            if other is None:
+                continue
+            if symbol < partner:
+                self._pairs[(symbol, partner)].update(price, other)
+            else:
+                self._pairs[(partner, symbol)].update(other, price)
+
+    def correlation(self, a: str, b: str) -> Optional[float]:
+        """The tracked correlation of a pair if it has one, otherwise the value from the last recompute, None
+        if neither knows the pair.
+        """
+        stats = self._pairs.get(_pair(a, b))
+        value = stats.correlation() if stats is not None else None
+        if value is None and a in self._matrix_symbols and b in self._matrix_symbols:
+            value = float(self._matrix[self._matrix_symbols[a], self._matrix_symbols[b]])
+            if math.isnan(value):
+                return None
+        return value
+
+    def recompute(self, histories: Mapping[str, Sequence[float]], window: Optional[int] = None) -> None:
+        """Rebuilds the full correlation matrix from price histories in one vectorized call per history length.
+
+        Histories are lined up on their most recent prices and each pair covers the trailing ticks both
+        symbols have (capped at window), so a short history doesn't cut down every other pair.
+        Symbols with fewer than two prices are left out.
+
+        Raises ValueError if window is below 2, since a correlation needs at least two prices.
+        """
+        if window is not None and window < 2:
+            raise ValueError(f"A correlation window needs at least 2 prices, got {window}.")
+        import numpy as np
+
+        usable = {symbol: prices for symbol, prices in histories.items() if len(prices) > 1}
+        if len(usable) < 2:
+            self._matrix_symbols, self._matrix = {}, None
+            return
+        series = [np.asarray(prices, dtype=np.float64) for prices in usable.values()]
+        lengths = np.array([len(prices) if window is None else min(len(prices), window) for prices in series])
+        matrix = np.full((len(series), len(series)), np.nan)
+        # one corrcoef per distinct length: every symbol at least that long, cut to it, and only the pairs
+        # whose shorter side is exactly that long keep the result
+        for length in np.unique(lengths):
+            members = np.flatnonzero(lengths >= length)
+            if len(members) < 2:
+                continue
+            rows = np.stack([series[member][-length:] for member in members])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                block = np.corrcoef(rows)
+            shared = np.minimum.outer(lengths[members], lengths[members])
+            cells = np.ix_(members, members)
+            matrix[cells] = np.where(shared == length, block, matrix[cells])
+        self._matrix = matrix
+        self._matrix_symbols = {symbol: row for row, symbol in enumerate(usable)}
+
+    def top_correlated(self, symbol: str, n: int) -> List[Tuple[str, float]]:
+        """The n symbols most positively correlated with symbol, highest first.
+
+        Tracked pairs use their incremental value. Every other symbol comes from the last recompute,
+        if there was one.
+        """
+        scores: Dict[str, float] = {}
+        row = self._matrix_symbols.get(symbol)
+        if row is not None:
+            for other, column in self._matrix_symbols.items():
+                value = float(self._matrix[row, column])
+                if other != symbol and not math.isnan(value):
+                    scores[other] = value
+        for partner in self._partners.get(symbol, ()):
+            value = self._pairs[_pair(symbol, partner)].correlation()
+            if value is not None:
+                scores[partner] = value
+        return heapq.nlargest(n, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,200 @@
+"""
+Bounded price history for a single stock.
+
+PriceHistory keeps the last `capacity` prices in a ring buffer backed by a typed array, so a symbol
+that ticks all day never holds more than capacity doubles. Windows asked for through mean, ema,
+minimum and maximum are registered the first time they are used. From then on append keeps each of
+them up to date, so every later query is O(1) instead of O(period).
+"""
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+DEFAULT_CAPACITY = 1024
+
+
+class _Window:
+    """Running sum plus monotonic min/max deques over the last `period` prices."""
+    __slots__ = ('period', 'total', 'lows', 'highs')
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.total = 0.0
+        # (tick, price) pairs, prices increasing in lows and decreasing in highs, so the front is the answer
+        self.lows: Deque[Tuple[int, float]] = deque()
+        self.highs: Deque[Tuple[int, float]] = deque()
+
+    def push(self, tick: int, price: float, leaving: Optional[float]) -> None:
+        self.total += price
+        if leaving is not None:
+            self.total -= leaving
+        oldest = tick - self.period
+        lows, highs = self.lows, self.highs
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+        lows.append((tick, price))
+        if lows[0][0] <= oldest:
+            lows.popleft()
+        while highs and highs[-1][1] <= price:
+            highs.pop()
+        highs.append((tick, price))
+        if highs[0][0] <= oldest:
+            highs.popleft()
+
+
+class PriceHistory:
+    """A fixed-capacity ring buffer of prices with incrementally maintained rolling statistics.
+
+    Iterating, indexing and len() only see the prices still in the buffer, oldest first.
+    """
+    __slots__ = ('_capacity', '_prices', '_ticks', '_windows', '_emas')
+
+    def __init__(self, prices: Tuple[float, ...] = (), capacity: int = DEFAULT_CAPACITY) -> None:
+        """Creates a history that keeps the last capacity prices, optionally seeded with prices (oldest first).
+
+        Raises ValueError if capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, got {capacity}.")
+        self._capacity = capacity
+        # grows until it is full and only then starts wrapping, so a quiet symbol doesn't pay for the whole buffer
+        self._prices = array('d')
+        self._ticks = 0  # prices appended ever, the next one goes in slot ticks % capacity
+        self._windows: Dict[int, _Window] = {}
+        self._emas: Dict[int, float] = {}
+        for price in prices:
+            self.append(price)
+
+    @classmethod
+    def from_array(cls, prices: array, capacity: int = DEFAULT_CAPACITY) -> PriceHistory:
+        """Wraps an array('d') of prices (oldest first) without replaying them through append.
+
+        Only the last capacity prices are kept, and no windows are registered yet.
+
+        Raises ValueError if capacity is not positive.
+        """
+        history = cls(capacity=capacity)
+        history._prices = prices[-capacity:] if len(prices) > capacity else prices
+        history._ticks = len(history._prices)
+        return history
+
+    def snapshot(self) -> PriceHistory:
+        """An independent copy that costs one array slice: the buffered prices and the running EMAs.
+        Windows are only caches and get seeded again on first use, like after unpickling.
+        """
+        return _unpickle_history(self.to_array(), self._capacity, dict(self._emas))
+
+    def __reduce__(self) -> Tuple[object, ...]:
+        # pickles as one array plus the EMAs, much smaller and faster than the slots and window deques.
+        # Windows are only caches, they are seeded from the buffer again the first time they're asked for
+        return (_unpickle_history, (self.to_array(), self._capacity, self._emas or None))
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def append(self, price: float) -> None:
+        """Adds the newest price, dropping the oldest once the buffer is full, and updates every registered window."""
+        tick = self._ticks
+        for period, window in self._windows.items():
+            window.push(tick, price, self[-period] if tick >= period else None)
+        for span, ema in self._emas.items():
+            # an EMA registered on an empty history starts from the first price
+            self._emas[span] = ema + 2.0 / (span + 1) * (price - ema) if tick else price
+
+        if len(self._prices) < self._capacity:
+            self._prices.append(price)
+        else:
+            self._prices[tick % self._capacity] = price
+        self._ticks = tick + 1
+
+    def _window(self, period: int) -> Optional[_Window]:
+        # returns the window for this period, registering and seeding it from the buffer the first time
+        if not 0 < period <= self._capacity:
+            raise ValueError(f"Period must be between 1 and the capacity {self._capacity}, got {period}.")
+        if len(self) < period:
+            return None
+        window = self._windows.get(period)
+        if window is None:
+            window = _Window(period)
+            start = self._ticks - period
+            for offset in range(period):
+                window.push(start + offset, self[offset - period], None)
+            self._windows[period] = window
+        return window
+
+    def mean(self, period: int) -> Optional[float]:
+        """Simple moving average of the last period prices, or None if there aren't that many yet.
+
+        Raises ValueError if period is not between 1 and the capacity.
+        """
+        window = self._window(period)
+        return window.total / period if window is not None else None
+
+    def minimum(self, period: int) -> Optional[float]:
+        """Lowest of the last period prices, or None if there aren't that many yet.
+
+        Raises ValueError if period is not between 1 and the capacity.
+        """
+        window = self._window(period)
+        return window.lows[0][1] if window is not None else None
+
+    def maximum(self, period: int) -> Optional[float]:
+        """Highest of the last period prices, or None if there aren't that many yet.
+
+        Raises ValueError if period is not between 1 and the capacity.
+        """
+        window = self._window(period)
+        return window.highs[0][1] if window is not None else None
+
+    def ema(self, span: int) -> Optional[float]:
+        """Exponential moving average with smoothing 2 / (span + 1), or None if there are no prices yet.
+
+        The first call for a span replays the buffered prices, oldest first, to seed it.
+
+        Raises ValueError if span is not positive.
+        """
+        if span <= 0:
+            raise ValueError(f"Span must be positive, got {span}.")
+        if span not in self._emas:
+            alpha = 2.0 / (span + 1)
+            prices = iter(self)
+            ema = next(prices, 0.0)
+            for price in prices:
+                ema += alpha * (price - ema)
+            self._emas[span] = ema
+        return self._emas[span] if self._ticks else None
+
+    def to_array(self) -> array:
+        """A copy of the buffered prices, oldest first, as one array('d') built with two slices."""
+        split = self._ticks % self._capacity if len(self._prices) == self._capacity else 0
+        return self._prices[split:] + self._prices[:split]
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def __getitem__(self, index: int) -> float:
+        size = len(self._prices)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("PriceHistory index out of range")
+        return self._prices[(self._ticks - size + index) % self._capacity]
+
+    def __iter__(self) -> Iterator[float]:
+        size = len(self._prices)
+        start = (self._ticks - size) % self._capacity
+        for offset in range(size):
+            yield self._prices[(start + offset) % self._capacity]
+
+    def __repr__(self) -> str:
+        return f'PriceHistory({list(self)!r}, capacity={self._capacity})'
+
+
+def _unpickle_history(prices: array, capacity: int, emas: Optional[Dict[int, float]]) -> PriceHistory:
+    history = PriceHistory.from_array(prices, capacity)
+    if emas:
+        history._emas = emas
+    return history
@@ -0,0 +1,93 @@
+"""
+Streaming, chunked loading of stock price CSV files.
+
+The file is read a chunk of rows at a time, so memory use depends on the chunk size and not on the
+file size. Files ending in .gz (or starting with the gzip magic bytes) are decompressed on the fly.
+Each chunk is handed to a callback, which the managers use to sort the batch once and bulk-merge it
+into their trees.
+
+Run from the repo root to time a load into StockPriceManager:
+    python -m stocks.loader ./stocks/sample_stock_prices.csv --chunk-size 100000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterator, List, TextIO
+
+GZIP_MAGIC = b'\x1f\x8b'
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+@dataclass
+class LoadStats:
+    """How a load went: the row and chunk counts and the wall-clock time it took."""
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f'{self.rows:,} rows in {self.chunks:,} chunks, {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)'
+
+
+def open_price_file(filepath: str) -> TextIO:
+    """Opens a CSV file for reading as text, decompressing it if it is gzipped."""
+    with open(filepath, 'rb') as raw:
+        is_gzip = raw.read(2) == GZIP_MAGIC
+    if is_gzip or filepath.endswith('.gz'):
+        return gzip.open(filepath, 'rt', newline='')
+    return open(filepath, 'r', newline='')
+
+
+def iter_row_chunks(stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    skip_header: bool = True) -> Iterator[List[List[str]]]:
+    """Yields lists of up to chunk_size parsed CSV rows. Raises ValueError if chunk_size is not positive."""
+    if chunk_size <= 0:
+        raise ValueError(f"Chunk size must be positive, got {chunk_size}.")
+    reader = csv.reader(stream)
+    if skip_header:
+        next(reader, None)
+    while True:
+        chunk = list(islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_csv(filepath: str, apply_chunk: Callable[[List[List[str]]], None],
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> LoadStats:
+    """Streams a price file through apply_chunk one chunk at a time and times the whole load."""
+    stats = LoadStats()
+    start = time.perf_counter()
+    with open_price_file(filepath) as stream:
+        for chunk in iter_row_chunks(stream, chunk_size):
+            apply_chunk(chunk)
+            stats.rows += len(chunk)
+            stats.chunks += 1
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def main() -> None:
+    from stocks.stock import StockPriceManager
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('filepath')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    manager = StockPriceManager()
+    stats = manager.load_from_csv(args.filepath, chunk_size=args.chunk_size)
+    print(stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Async tick ingestion in front of a StockPriceManager.
+
+Producers await TickPipeline.put, which waits while the bounded queue is full, so a bursty feed is
+slowed down at the source instead of growing memory without limit. One consumer task pulls ticks
+until it has batch_size of them or batch_window seconds have passed since the first one. It then
+conflates them, keeping only the latest price for each (symbol, low price) band, and applies the batch
+to the manager in a worker thread. The event loop keeps accepting ticks while a batch is applied.
+
+Conflating means a band that ticks several times inside one window only records its last price.
+Alerts still fire on crossings between the previous applied price and the new one.
+
+Run from the repo root for a demo against the synthetic feed:
+    python -m stocks.pipeline --symbols 500 --ticks 200000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from stocks.stock import StockPriceManager
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 1_000
+DEFAULT_BATCH_WINDOW = 0.05
+
+
+class Tick(NamedTuple):
+    symbol: str
+    name: str
+    price: float
+    low_price: float
+
+
+@dataclass
+class PipelineStats:
+    """Counters for a pipeline run."""
+    received: int = 0
+    applied: int = 0
+    batches: int = 0
+    max_queue_depth: int = 0
+
+    @property
+    def conflated(self) -> int:
+        """Ticks that were replaced by a later tick for the same band before being applied."""
+        return self.received - self.applied
+
+
+class TickPipeline:
+    """Bounded async queue plus a batching, conflating consumer for one StockPriceManager.
+
+    Use it as an async context manager, or call start and stop yourself. Nothing else should write
+    to the manager while the pipeline is running, since batches are applied from a worker thread.
+    """
+
+    def __init__(self, manager: StockPriceManager, max_queue: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, batch_window: float = DEFAULT_BATCH_WINDOW) -> None:
+        """Creates a pipeline. The queue is made on start, inside the running event loop.
+
+        Up to max_queue ticks wait before put starts waiting, and a batch takes at most batch_size ticks
+        or batch_window seconds. Raises ValueError if max_queue or batch_size is not positive, or
+        batch_window is negative.
+        """
+        if max_queue <= 0 or batch_size <= 0:
+            raise ValueError(f"Queue and batch sizes must be positive, got {max_queue} and {batch_size}.")
+        if batch_window < 0:
+            raise ValueError(f"Batch window can't be negative, got {batch_window}.")
+        self.manager = manager
+        self.stats = PipelineStats()
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._batch_window = batch_window
+        self._queue: Optional[asyncio.Queue[Tick]] = None
+        self._consumer: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        """Starts the consumer task."""
+        if self._consumer is not None:
+            raise RuntimeError("The pipeline is already running.")
+        self._queue = asyncio.Queue(self._max_queue)
+        self._consumer = asyncio.create_task(self._consume(self._queue))
+
+    async def stop(self) -> None:
+        """Waits for every queued tick to be applied, then stops the consumer.
+
+        Re-raises whatever the manager raised if applying a batch failed and killed the consumer.
+        """
+        if self._consumer is None or self._queue is None:
+            return
+        # both are cleared first, so a put from here on raises instead of queueing ticks nobody applies
+        consumer, self._consumer = self._consumer, None
+        queue, self._queue = self._queue, None
+        drained = asyncio.create_task(queue.join())
+        await asyncio.wait((drained, consumer), return_when=asyncio.FIRST_COMPLETED)
+        drained.cancel()
+        consumer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await consumer  # re-raises the error if a batch failed
+
+    async def __aenter__(self) -> TickPipeline:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    async def put(self, tick: Tick) -> None:
+        """Queues a tick, waiting while the queue is full. This wait is the backpressure on the feed.
+
+        Re-raises whatever the manager raised if applying a batch failed and killed the consumer, since
+        nothing would ever drain the queue again. Raises RuntimeError if the pipeline isn't running, or is
+        stopped while the tick waits for room.
+        """
+        queue, consumer = self._queue, self._consumer
+        if queue is None or consumer is None:
+            raise RuntimeError("The pipeline isn't running, start it before putting ticks on it.")
+        if consumer.done():
+            consumer.result()
+        if not queue.full():
+            queue.put_nowait(tick)
+        else:  # wait for room, unless the consumer dies or is stopped first
+            queued = asyncio.ensure_future(queue.put(tick))
+            await asyncio.wait((queued, consumer), return_when=asyncio.FIRST_COMPLETED)
+            if not queued.done():
+                queued.cancel()
+                if consumer.cancelled():
+                    raise RuntimeError("The pipeline was stopped before the tick could be queued.")
+                consumer.result()
+        self.stats.received += 1
+        depth = queue.qsize()
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+
+    async def _next_batch(self, queue: asyncio.Queue[Tick]) -> List[Tick]:
+        # waits for one tick, then takes more until the batch is full or the window since the first one closes
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + self._batch_window
+        while len(batch) < self._batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _consume(self, queue: asyncio.Queue[Tick]) -> None:
+        while True:
+            batch = await self._next_batch(queue)
+            try:
+                latest: Dict[Tuple[str, float], Tick] = {}
+                for tick in batch:  # a later tick for the same band replaces the earlier one
+                    latest.pop((tick.symbol, tick.low_price), None)
+                    latest[(tick.symbol, tick.low_price)] = tick
+                ticks = list(latest.values())
+                await asyncio.to_thread(self._apply, ticks)
+                self.stats.applied += len(ticks)
+                self.stats.batches += 1
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _apply(self, ticks: List[Tick]) -> None:
+        insert = self.manager.insert
+        for tick in ticks:
+            insert(tick.symbol, tick.name, tick.price, tick.low_price)
+
+
+async def synthetic_feed(symbols: int = 100, ticks: int = 10_000, burst: int = 500, pause: float = 0.001,
+                         seed: int = 351) -> AsyncIterator[Tick]:
+    """A local random-walk feed for tests and demos.
+
+    Ticks come in bursts of up to burst back to back, each followed by a short pause, which is how a
+    real feed bunches up around news. Symbols are named S0, S1, ... and the same seed gives the same feed.
+    """
+    rng = random.Random(seed)
+    prices = [rng.uniform(20, 500) for _ in range(symbols)]
+    sent = 0
+    while sent < ticks:
+        for _ in range(min(rng.randint(1, burst), ticks - sent)):
+            index = rng.randrange(symbols)
+            prices[index] = max(0.01, prices[index] * (1 + rng.gauss(0, 0.002)))
+            # every symbol has a single band, its low price is fixed at its index
+            yield Tick(f'S{index}', f'Synthetic {index}', round(prices[index], 2), float(index))
+            sent += 1
+        await asyncio.sleep(pause)
+
+
+async def _demo(args: argparse.Namespace) -> None:
+    manager = StockPriceManager()
+    start = time.perf_counter()
+    async with TickPipeline(manager, args.queue, args.batch, args.window) as pipeline:
+        async for tick in synthetic_feed(args.symbols, args.ticks):
+            await pipeline.put(tick)
+    elapsed = time.perf_counter() - start
+    stats = pipeline.stats
+    print(f'{stats.received:,} ticks in {elapsed:.2f}s ({stats.received / elapsed:,.0f} ticks/s), '
+          f'{stats.batches:,} batches, {stats.conflated:,} conflated, max queue depth {stats.max_queue_depth:,}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--ticks', type=int, default=200_000)
+    parser.add_argument('--queue', type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--window', type=float, default=DEFAULT_BATCH_WINDOW)
+    args = parser.parse_args()
+    asyncio.run(_demo(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+A StockPriceManager that several feed handler threads can write to at once.
+
+Symbols are spread over N shards by a stable hash. Each shard is an ordinary StockPriceManager
+guarded by its own readers-writer lock, so ticks for symbols on different shards never wait on each
+other, and readers only wait for writers on the shard they read. Queries that span shards (range,
+top-k, percentile) hold every shard's read lock, in shard order, so they see one consistent state.
+They then merge the per-shard results, which are already sorted, with heapq.merge. Writers only
+ever hold one lock, so taking the read locks in order can't deadlock.
+
+Stocks handed back to callers are copies taken while the lock is held, history included. The shard's
+own StockNodes keep changing under later ticks, so handing those out would let a caller read a price
+and a history that a writer is halfway through updating.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from dataclasses import replace
+from itertools import islice
+from operator import attrgetter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from stocks.alerts import AlertEvent
+from stocks.loader import DEFAULT_CHUNK_SIZE, LoadStats, load_csv
+from stocks.stock import StockNode, StockPriceManager
+
+DEFAULT_SHARDS = 8
+
+
+class ReadWriteLock:
+    """Many readers or one writer at a time. Waiting writers go first, so a steady stream of readers
+    can't starve ingestion. Not reentrant.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read_lock(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_lock(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _copied(stocks: List[StockNode]) -> List[StockNode]:
+    # called with the shard's lock held, the copies are the caller's to read after it's released. A history
+    # snapshot is one array slice rather than a deepcopy of the buffer and every window deque
+    return [replace(stock, historical_prices=stock.historical_prices.snapshot()) for stock in stocks]
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    """The shard a symbol lives on. crc32 instead of hash() so it's the same in every process."""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+class ShardedStockPriceManager:
+    """Thread-safe StockPriceManager front end that shards symbols over independent managers."""
+
+    def __init__(self, shards: int = DEFAULT_SHARDS, on_alert: Optional[Callable[[AlertEvent], None]] = None) -> None:
+        """Creates the shards. Raises ValueError if shards is not positive.
+
+        on_alert goes to every shard and is called from whichever thread inserted the crossing price,
+        so it has to be thread-safe itself.
+        """
+        if shards <= 0:
+            raise ValueError(f"Need at least one shard, got {shards}.")
+        self._shards = [StockPriceManager(on_alert) for _ in range(shards)]
+        self._locks = [ReadWriteLock() for _ in range(shards)]
+
+    def _shard(self, symbol: str) -> int:
+        return shard_of(symbol, len(self._shards))
+
+    @contextmanager
+    def _read_all(self) -> Iterator[List[StockPriceManager]]:
+        # every shard's read lock in shard order, for queries that need one consistent view across shards
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock.read_lock())
+            yield self._shards
+
+    def insert(self, stock_symbol: str, stock_name: str, current_price: float, low_price: float) -> None:
+        """Same as StockPriceManager.insert. Only the symbol's shard is locked."""
+        index = self._shard(stock_symbol)
+        with self._locks[index].write_lock():
+            self._shards[index].insert(stock_symbol, stock_name, current_price, low_price)
+
+    def add_stocks(self, stocks: List[StockNode]) -> None:
+        """Bulk adds stocks, one batch merge per shard."""
+        batches: Dict[int, List[StockNode]] = {}
+        for stock in stocks:
+            batches.setdefault(self._shard(stock.stock_symbol), []).append(stock)
+        for index, batch in batches.items():
+            with self._locks[index].write_lock():
+                self._shards[index].add_stocks(batch)
+
+    def load_from_csv(self, filepath: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> LoadStats:
+        """Streams a CSV like StockPriceManager.load_from_csv, routing each chunk's rows to their shards."""
+        def apply_chunk(rows: List[List[str]]) -> None:
+            self.add_stocks([StockNode(symbol, name, current_price=float(high), low_price=float(low))
+                             for symbol, name, low, high in rows])
+        return load_csv(filepath, apply_chunk, chunk_size)
+
+    def delete(self, stock_symbol: str, low_price: Optional[float] = None) -> List[StockNode]:
+        """Same as StockPriceManager.delete. Raises KeyError if there's nothing to remove."""
+        index = self._shard(stock_symbol)
+        with self._locks[index].write_lock():
+            return self._shards[index].delete(stock_symbol, low_price)
+
+    def lookup_stock_price(self, symbol: str) -> Optional[StockNode]:
+        index = self._shard(symbol)
+        with self._locks[index].read_lock():
+            stock = self._shards[index].lookup_stock_price(symbol)
+            return _copied([stock])[0] if stock is not None else None
+
+    def lookup_stock_bands(self, symbol: str) -> List[StockNode]:
+        index = self._shard(symbol)
+        with self._locks[index].read_lock():
+            return _copied(self._shards[index].lookup_stock_bands(symbol))
+
+    def size(self) -> int:
+        """How many stocks (price bands) there are over every shard."""
+        with self._read_all() as shards:
+            return sum(shard._tree.size() for shard in shards)
+
+    @property
+    def times_called(self) -> int:
+        return sum(shard.times_called for shard in self._shards)
+
+    def get_stocks_in_price_range(self, low: float, high: float) -> List[StockNode]:
+        """Stocks whose low price is in [low, high], in low price order across every shard."""
+        with self._read_all() as shards:
+            per_shard = [_copied(shard.get_stocks_in_price_range(low, high)) for shard in shards]
+        return list(heapq.merge(*per_shard, key=attrgetter('low_price')))
+
+    def range_query(self, low_price: float, high: float) -> List[Tuple[str, float]]:
+        return [(stock.stock_symbol, stock.current_price) for stock in self.get_stocks_in_price_range(low_price, high)]
+
+    def get_top_k(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        """The k stocks with the largest low_price (or max_price) over every shard.
+
+        Each shard gives its own top k, and a k-way merge keeps the best k of those.
+
+        Raises ValueError if by isn't 'low_price' or 'max_price'.
+        """
+        with self._read_all() as shards:
+            per_shard = [_copied(shard.get_top_k(k, by)) for shard in shards]
+        return list(islice(heapq.merge(*per_shard, key=attrgetter(by), reverse=True), k))
+
+    def get_bottom_k(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        """The k stocks with the smallest low_price (or max_price) over every shard.
+
+        Raises ValueError if by isn't 'low_price' or 'max_price'.
+        """
+        with self._read_all() as shards:
+            per_shard = [_copied(shard.get_bottom_k(k, by)) for shard in shards]
+        return list(islice(heapq.merge(*per_shard, key=attrgetter(by)), k))
+
+    def find_percentile(self, percentile: float) -> Optional[Tuple[str, float]]:
+        """The stock at a percentile of low price over every shard, with the same nearest rank rule as
+        StockPriceManager.find_percentile.
+
+        This is a select over the union of the shards' trees. For each shard, a binary search over its
+        positions looks for a low price whose global rank range (the sum of every shard's rank) covers
+        the target. That is O(S^2 log^2 n) for S shards and never walks the stocks themselves.
+
+        Raises ValueError if percentile is not between 0 and 100.
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"Percentile must be between 0 and 100, got {percentile}.")
+        with self._read_all() as shards:
+            trees = [shard._tree for shard in shards]
+            total = sum(tree.size() for tree in trees)
+            if not total:
+                return None
+            target = max(0, math.ceil(percentile / 100 * total) - 1)
+            for tree in trees:
+                low, high = 0, tree.size() - 1
+                while low <= high:
+                    middle = (low + high) // 2
+                    key, stock = tree.select(middle)
+                    if sum(other.rank(key, inclusive=True) for other in trees) <= target:
+                        low = middle + 1  # everything up to this key is still before the target
+                    elif sum(other.rank(key) for other in trees) > target:
+                        high = middle - 1  # the target comes before this key
+                    else:
+                        return (stock.stock_symbol, stock.current_price)
+        return None  # only reachable if the shards' counts are broken
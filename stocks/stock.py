@@ -1,29 +1,37 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Optional, Tuple, List
-from datastructures.avltree import AVLNode, AVLTree
-import csv
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, List
+from operator import attrgetter, itemgetter
+from array import array
+import os
+from datastructures.avltree import AVLTree
+from datastructures.bplustree import BPlusTree
+from datastructures.metrics import Metrics, instrument_methods, uninstrument
+from datastructures.multimapavltree import BucketNode, MultiMapAVLTree
+from datastructures.snapshot import open_snapshot, pack_keys, paused_gc, pack_values, unpack_keys, unpack_values, write_snapshot
+from stocks.alerts import AlertEvent, AlertRegistry
+from stocks.correlation import CorrelationEngine
+from stocks.history import PriceHistory
+from stocks.loader import DEFAULT_CHUNK_SIZE, LoadStats, load_csv
 #-------------------------------------
-@dataclass
-class StockNode: #the class of the node I am using
+@dataclass(slots=True)
+class StockNode: #the class of the node I am using, slots so millions of them don't each carry a __dict__
     stock_symbol: str #stock symbol is the abbreviation
     stock_name: str #Stock name is the company name 
     current_price: float #price is the current price of the stock
-    max_price: float = 0 #the maximum price a stock has been
-    low : float = 0 #the lowest price a stock has been
-    height: int = 1 #height of the tree?
-#    historical_prices: List[float] = None  # a list for later to hopefully implement historical prices
-    size: int = 1  # size of the tree? (percentile calculations)
-    left: Optional[StockNode] = None #left of the node
-    right: Optional[StockNode] = None #right of the node
+    max_price: float #the maximum price a stock has been
+    low_price: float #the lowest price a stock has been (this is the key in the tree)
+    historical_prices: PriceHistory #the most recent prices in a fixed size ring buffer, so a busy symbol can't grow forever
 
-    def __init__(self, stock_symbol: str, stock_name: str, current_price: float, low_price: float): #initalizes the data class
+    def __init__(self, stock_symbol: str, stock_name: str, current_price: float, low_price: float,
+                 max_price: Optional[float] = None, historical_prices: Optional[PriceHistory] = None): #initalizes the data class, the last two are for restoring a saved stock
         self.stock_symbol = stock_symbol # a stock will have  symbol (aka abbreveation) associated with it
         self.stock_name = stock_name #a stock will have a name (company name) associated with it
         self.current_price = current_price #a stock will have a current price assocaiated with it
-        self.max_price = current_price#a stock will have a maximum price assocaited with it
+        self.max_price = current_price if max_price is None else max_price #a stock will have a maximum price assocaited with it
         self.low_price = low_price #a stock will have a lowest price associated with it
-        self.historical_prices = [current_price]  # Initialize historical prices with the current price
+        # Initialize historical prices with the current price
+        self.historical_prices = PriceHistory((current_price,)) if historical_prices is None else historical_prices
 
 #@dataclass(order=True)
 
@@ -32,46 +40,172 @@ class StockNode: #the class of the node I am using
 #     name: str
 #     low: int
 #     high: int
+
+_current_price = attrgetter('current_price') #for the max over a bucket of stocks, quicker than a generator
+#------------------------------------------------------------------------------------------------
+class PriceNode(BucketNode): #a tree node for every stock with one low price, that also knows the highest current price anywhere below it
+    __slots__ = ('_bucket_max', '_max_price')
+
+    def __init__(self, key: float, value: StockNode):
+        super().__init__(key, value)
+        self._bucket_max = self._max_price = value.current_price #highest current price in this node's own bucket, and in its subtree
+#------------------------------------------------------------------------------------------------
+class PriceTree(MultiMapAVLTree): #the AVL tree the manager keeps its stocks in, keyed on low price with a subtree max of current price
+    # a multimap, so all the stocks that share a low price sit in one node instead of stacking up extra nodes and height
+    _node_type = PriceNode
+
+    def _bucket_changed(self, node: PriceNode) -> None:
+        node._bucket_max = max(map(_current_price, node._value))
+#------------------------------------------------------------------------------------------------
+    def _update(self, node: PriceNode) -> None:
+        # rotations and the insert/delete retrace already call this on every node they touch, so the
+        # subtree max stays right without ever walking the whole tree
+        super()._update(node)
+        max_price = node._bucket_max
+        if node._left is not None and node._left._max_price > max_price:
+            max_price = node._left._max_price
+        if node._right is not None and node._right._max_price > max_price:
+            max_price = node._right._max_price
+        node._max_price = max_price
+#------------------------------------------------------------------------------------------------
+    def refresh(self, key: float, stock: StockNode) -> None:
+        # a stock's current price changed in place, so redo its bucket's max and the subtree max on the path down to it
+        path = self._find_path(key, lambda node: any(value is stock for value in node._value))
+        if path is None:
+            raise KeyError(f"Stock {stock.stock_symbol} with key {key} is not in the tree.")
+        node = path[-1]
+        if stock.current_price >= node._bucket_max: #a new high for the bucket, no need to look at the others
+            node._bucket_max = stock.current_price
+        else: #it might have been the bucket's max before, so look again
+            self._bucket_changed(node)
+        self._refresh_path(path)
+#------------------------------------------------------------------------------------------------
+    def max_in_range(self, lo: float, hi: float) -> Optional[float]:
+        # highest current price among the stocks keyed in [lo, hi], O(log n). First find the top-most node in
+        # range (where the paths to lo and hi split), then walk down towards lo and towards hi. Every time one
+        # of those walks steps past an in-range node, the whole subtree on the inside is in range too, so its
+        # stored max can be used as is
+        node = self._root
+        while node is not None and (node._key < lo or hi < node._key):
+            node = node._left if hi < node._key else node._right
+        if node is None: #nothing keyed in the range
+            return None
+
+        best = node._bucket_max
+
+        inner = node._left #the walk towards lo
+        while inner is not None:
+            if inner._key < lo: #this node and its left side are too small
+                inner = inner._right
+            else:
+                best = max(best, inner._bucket_max)
+                if inner._right is not None:
+                    best = max(best, inner._right._max_price)
+                inner = inner._left
+
+        inner = node._right #the walk towards hi
+        while inner is not None:
+            if hi < inner._key: #this node and its right side are too big
+                inner = inner._left
+            else:
+                best = max(best, inner._bucket_max)
+                if inner._left is not None:
+                    best = max(best, inner._left._max_price)
+                inner = inner._right
+        return best
+#------------------------------------------------------------------------------------------------
+class DiskPriceTree(BPlusTree): #the manager's stocks in a B+ tree page file instead of in memory, see datastructures/bplustree.py
+    def _same(self, stored: StockNode, value: StockNode) -> bool:
+        # a stock read back from the file is a copy, so it's matched by its band (symbol and low price) the same
+        # way the manager's _find_band does, not by identity
+        return stored.stock_symbol == value.stock_symbol and stored.low_price == value.low_price
+#------------------------------------------------------------------------------------------------
+    def refresh(self, key: float, stock: StockNode) -> None:
+        # a stock changed, so its stored copy is written over with it
+        self.replace(key, stock)
+#------------------------------------------------------------------------------------------------
+    def max_in_range(self, lo: float, hi: float) -> Optional[float]:
+        # no subtree max on disk, so this reads the stocks in the range off the linked leaves, O(log n + k)
+        return max((stock.current_price for _, stock in self.irange(lo, hi)), default=None)
+#------------------------------------------------------------------------------------------------
+# the manager methods enable_metrics times, one latency histogram each
+TIMED_OPERATIONS = ('insert', 'add_stock', 'add_stocks', 'delete', 'lookup', 'lookup_stock_price', 'lookup_stock_bands',
+                    'range_query', 'get_stocks_in_price_range', 'max_in_range', 'get_top_k', 'get_bottom_k',
+                    'find_percentile', 'calculate_moving_average', 'calculate_ema', 'rolling_min_max',
+                    'correlation', 'top_correlated')
 #------------------------------------------------------------------------------------------------
 class StockPriceManager: #creating a class to manage the stocks
-    def __init__(self): #intializes the class 
-        self._tree = AVLTree() #the class will have an AVL tree assocaited with it
-        self.correlation_map = {}  # For market basket analysis
-        self._stock_dictionary = {} #a dictionary to hold all of the stocks in a key value pair, where the key is the low price, and the value is the stock (like the whole node)
+    def __init__(self, on_alert: Optional[Callable[[AlertEvent], None]] = None, storage: Optional[str] = None): #intializes the class, on_alert gets every alert as it fires
+        # storage is a directory to keep both trees and the symbol index in as B+ tree files instead of in memory, for
+        # more stocks than fit in RAM. Opening a directory that already has the files picks up the stocks in them, and
+        # only the pages a call needs are ever read
+        self._on_disk = storage is not None
+        if storage is None:
+            self._tree = PriceTree() #the class will have an AVL tree assocaited with it, one that tracks the max price of every subtree
+            self._max_price_tree = MultiMapAVLTree() #the same stocks again but keyed on max price, so ranking by max price is a walk down one side of a tree
+        else:
+            os.makedirs(storage, exist_ok=True)
+            self._tree = DiskPriceTree(os.path.join(storage, 'low_price.bpt'))
+            self._max_price_tree = DiskPriceTree(os.path.join(storage, 'max_price.bpt'))
+            self._symbol_tree = BPlusTree(os.path.join(storage, 'symbols.bpt')) #symbol -> the low price of each of its bands, the stocks themselves stay in the low price tree
+        self._correlations = CorrelationEngine()  # For market basket analysis, pearson correlations kept up to date on every tick
+        self._symbol_index: Dict[str, List[StockNode]] = {} #symbol -> every price band we have for that symbol, so symbol lookups don't scan anything (stays empty with storage)
+        self._alerts = AlertRegistry(on_alert) #upper and lower thresholds per symbol, checked on every tick
         self.times_called= 0 #setting up a counter for debug purposes
+        self._metrics: Optional[Metrics] = None #off until enable_metrics, and free while it's off
 
 
     def insert(self, stock_symbol: str, stock_name: str, current_price: float, low_price: float):# an insert function
-        node: StockNode = self._tree.search(current_price) #search the tree for a node with a key of the current price
+        node = self._find_band(stock_symbol, low_price) #look for this symbol's band with the same low price through the symbol index
         self.times_called +=1 #a counter for debugging purposes
-        print(self.times_called) #printing counter for debugging purposes
         if node: #if the node exists, we will want to update it
             # Update existing stock price and historical prices
             node.historical_prices.append(current_price)  # Store new price in history
+            previous_price = node.current_price
             node.current_price = current_price #set the the nodes current price to the newest input
-            node.max_price = max(node.max_price, current_price) #check to see if we need to update the max price if the new current price is greater than the current max
-            print("Updated Stock Dictionary with {} and {}".format(node.stock_symbol, current_price)) #a print statement for debugging
+            if current_price > node.max_price: #a new high moves the stock in the max price tree
+                self._max_price_tree.remove(node.max_price, node)
+                node.max_price = current_price
+                self._max_price_tree.insert(node.max_price, node)
+            elif self._on_disk: #the disk trees keep copies, so the max price tree's copy needs the new price too
+                self._max_price_tree.refresh(node.max_price, node)
+            self._tree.refresh(node.low_price, node) #only the nodes above this stock need their subtree max redone
+            self._alerts.evaluate(stock_symbol, previous_price, current_price) #only the thresholds between the old and new price are looked at
         else: #if the node doesn't exist, we need to make one
             # Insert a new stock
             new_node = StockNode(stock_symbol=stock_symbol, stock_name=stock_name, current_price=current_price, low_price= low_price) #creating a new stock, as a stockNode,with the symbol, name of the company, the current price, and the low price
-            self._tree.insert(low_price, new_node)#inserting the new stock we just made into the tree, using the low price as the key
-            self._stock_dictionary[low_price] = new_node#creating an entry into our dictionary, once again using the low price as the key
-            print("Created Entry in Stock Dictionary with {} with the key {}".format(new_node.stock_symbol, low_price))
+            self.add_stock(new_node) #puts it in the tree (keyed on the low price), the dictionary and the symbol index
+        self._correlations.on_tick(stock_symbol, current_price) #feeds the tracked pairs this symbol is in
 
-        self._update_max_price(self._tree._root) #we then want to update the maximum price, although I am unsure if this is the best way to do this
-        
-####COME BACK TO LOOK OVER THIS AND FIGURE OUT WHAT I'M DOING HERE
-    def _update_max_price(self, node: Optional[StockNode]): #a function to update the maximum price found in a tree
-        left_max = 0 #always setting the left max to be 0, DO I WANT TO DO THAT HERE OR SHOULD I SET THIS OUTSIDE THE FUNCTION TO PREVENT OVERWRITING
-        if not node: #if no node exists
-            return 0 # don't bother, move on
-        if node._left is not None: #if a node DOES exist
-            left_max = self._update_max_price(node._left) #update the the max price by looking at the left node, OH NO I THINK I HAVE BEEN OVERWRITING IT?!?!
-        right_max = self._update_max_price(node._right) #I think i'm confusing myself here, will come back
-        max_price = max(node._value.current_price, left_max, right_max)
-
-        node.max_price = max_price
-        return node.max_price
+#---------------------------------------------------------------------------------------------------------------------------
+    def _find_band(self, stock_symbol: str, low_price: float) -> Optional[StockNode]: #the band of this symbol with this low price, if we have one
+        if self._on_disk: #one O(log n) read of the stocks with this low price, the symbol index isn't needed for it
+            return next((stock for stock in self._tree.search_all(low_price) if stock.stock_symbol == stock_symbol), None)
+        for stock in self._symbol_index.get(stock_symbol, ()): #a symbol only has a handful of bands, so this is O(1) for our purposes
+            if stock.low_price == low_price:
+                return stock
+        return None
+#---------------------------------------------------------------------------------------------------------------------------
+    def _bands(self, stock_symbol: str) -> List[StockNode]: #every band of the symbol, in the order they came in
+        if not self._on_disk:
+            return self._symbol_index.get(stock_symbol, [])
+        # the symbol index on disk only has the low prices, so each band is read from the low price tree. A symbol can have
+        # the same low price twice (the sample CSV does), so each repeat of a low price takes the next stock with it
+        found: Dict[float, Iterator[StockNode]] = {}
+        bands = []
+        for low_price in self._symbol_tree.search_all(stock_symbol):
+            if low_price not in found:
+                found[low_price] = iter([stock for stock in self._tree.search_all(low_price) if stock.stock_symbol == stock_symbol])
+            bands.append(next(found[low_price]))
+        return bands
+#---------------------------------------------------------------------------------------------------------------------------
+    def _symbols(self) -> List[str]: #every symbol we have a band for
+        if self._on_disk:
+            return list(dict.fromkeys(self._symbol_tree)) #the keys come out sorted, so repeats are next to each other
+        return list(self._symbol_index)
+#---------------------------------------------------------------------------------------------------------------------------
+    def max_in_range(self, low_price: float, high_price: float) -> Optional[float]: #highest current price of the stocks whose low price is in the range
+        return self._tree.max_in_range(low_price, high_price)
 #---------------------------------------------------------------------------------------------------------------------------
     def lookup(self, price: int) -> Optional[float]: #a look up function to find stocks with a certain price
         node: StockNode = self._tree.search(price) # 
@@ -80,145 +214,239 @@ class StockPriceManager: #creating a class to manage the stocks
         return None  # Stock not found
 #---------------------------------------------------------------------------------------------------------------------------
     def range_query(self, low_price: float, high: float) -> List[Tuple[str, float]]:
-        results = []
-        self._range_query_helper(self._tree._root, low_price, high, results)
-        return results
+        # the tree is keyed on the low price, so irange only visits the stocks whose low price is in the band
+        return [(stock.stock_symbol, stock.current_price) for _, stock in self._tree.irange(low_price, high)]
 #---------------------------------------------------------------------------------------------------------------------------
-    def _range_query_helper(self, node: Optional[StockNode], low_price: float, high: float, results: list):
-        if not node:
-            return
-
-        if node._value.current_price >= low_price:
-            self._range_query_helper(node._left, low_price, high, results)
-
-        if low_price <= node._value.current_price <= high:
-            results.append((node.stock_symbol, node.price))
-
-        if node._value.current_price <= high:
-            self._range_query_helper(node._right, low_price, high, results)
+    def add_alert(self, stock_symbol: str, threshold: float, direction: str): #direction is 'above' or 'below'
+        self._alerts.add(stock_symbol, threshold, direction)
+#---------------------------------------------------------------------------------------------------------------------------
+    def remove_alert(self, stock_symbol: str, threshold: float, direction: str):
+        self._alerts.remove(stock_symbol, threshold, direction)
 #---------------------------------------------------------------------------------------------------------------------------
     def check_alerts(self) -> List[str]:
-        alerts = []
-        for stock in self._get_all_stocks(self._tree._root):
-            if stock._value.current_price < 120:  # Example threshold for alert
-                alerts.append(f"Alert: {stock.stock_name}'s price has dropped below $120!")
-        return alerts
-#---------------------------------------------------------------------------------------------------------------------------
-    def _get_all_stocks(self, node: Optional[StockNode]) -> List[StockNode]:
-        if not node:
-            return []
-        return (self._get_all_stocks(node._left) +
-                [node] +
-                self._get_all_stocks(node._right))
+        # alerts fire inside insert when a price crosses a threshold, so this just hands back the ones that fired
+        # since the last call (when there's no on_alert callback to send them to)
+        return [str(event) for event in self._alerts.drain()]
 #---------------------------------------------------------------------------------------------------------------------------
     def find_percentile(self, percentile: float) -> Optional[Tuple[str, float]]:
-        target_index = int(percentile / 100 * self._tree._root._value.size)  # Convert to index
-        return self._find_percentile_helper(self._tree._root, target_index)
-#---------------------------------------------------------------------------------------------------------------------------
-    def _find_percentile_helper(self, node: Optional[StockNode], index: int) -> Optional[Tuple[str, float]]:
-        if not node:
+        # the tree keeps subtree counts, so this is an O(log n) select instead of walking every stock
+        found = self._tree.quantile(percentile / 100)
+        if found is None: #no stocks yet
             return None
-        
-        left_size = node._left._value.size if node._left else 0
-
-        if index < left_size:
-            return self._find_percentile_helper(node._left, index)
-        elif index > left_size:
-            return self._find_percentile_helper(node.right, index - left_size - 1)
-        else:
-            return (node._value.stock_symbol, node._value.current_price)  # Found the node at the index
+        _, stock = found
+        return (stock.stock_symbol, stock.current_price)
 #---------------------------------------------------------------------------------------------------------------------------
     def calculate_moving_average(self, price: int, period: int) -> Optional[float]:
+        # the history keeps a running sum for every period it has been asked about, so after the first call this is O(1)
+        node: StockNode = self._tree.search(price)
+        if node:
+            return node.historical_prices.mean(period)  # None when there isn't enough data yet
+        return None
+#---------------------------------------------------------------------------------------------------------------------------
+    def calculate_ema(self, price: int, span: int) -> Optional[float]: #exponential moving average, updated on every tick
+        node: StockNode = self._tree.search(price)
+        if node:
+            return node.historical_prices.ema(span)
+        return None
+#---------------------------------------------------------------------------------------------------------------------------
+    def rolling_min_max(self, price: int, period: int) -> Optional[Tuple[float, float]]: #lowest and highest of the last period prices
         node: StockNode = self._tree.search(price)
         if node and len(node.historical_prices) >= period:
-            return sum(node.historical_prices[-period:]) / period
-        return None  # Not enough data for moving average
+            return (node.historical_prices.minimum(period), node.historical_prices.maximum(period))
+        return None
 #---------------------------------------------------------------------------------------------------------------------------
     def track_correlation(self, stock_symbol: str, correlated_stock_symbol: str):
-        if stock_symbol not in self.correlation_map:
-            self.correlation_map[stock_symbol] = []
-        self.correlation_map[stock_symbol].append(correlated_stock_symbol)
+        # the pair gets an accumulator that every later tick of either symbol updates in O(1)
+        self._correlations.track(stock_symbol, correlated_stock_symbol)
+#---------------------------------------------------------------------------------------------------------------------------
+    def find_correlated_stocks(self, stock_symbol: str) -> List[str]: #the symbols tracked against this one
+        return self._correlations.partners(stock_symbol)
 #---------------------------------------------------------------------------------------------------------------------------
-    def find_correlated_stocks(self, stock_symbol: str) -> List[str]:
-        return self.correlation_map.get(stock_symbol, [])
+    def correlation(self, stock_symbol: str, other_symbol: str) -> Optional[float]: #pearson correlation of two symbols' prices
+        return self._correlations.correlation(stock_symbol, other_symbol)
 #---------------------------------------------------------------------------------------------------------------------------
-    def add_stock(self, stock: Stock):
-        # Add stock to the interval tree
-        #print("stock.low is {}, stock: {}".format(stock.low, stock))
+    def recompute_correlations(self, window: Optional[int] = None):
+        # the fallback for pairs nobody tracked, one vectorized pass over every symbol's history (needs numpy).
+        # a symbol with several bands uses the band with the longest history
+        histories = {symbol: max((stock.historical_prices for stock in self._bands(symbol)), key=len).to_array()
+                     for symbol in self._symbols()}
+        self._correlations.recompute(histories, window)
+#---------------------------------------------------------------------------------------------------------------------------
+    def top_correlated(self, stock_symbol: str, n: int) -> List[Tuple[str, float]]: #the n symbols that move most like this one
+        return self._correlations.top_correlated(stock_symbol, n)
+#---------------------------------------------------------------------------------------------------------------------------
+    def add_stock(self, stock: StockNode):
+        # the price tree is keyed on the low price, and the max price tree and symbol index have to agree with it
+        self._tree.insert(stock.low_price, stock)
+        self._max_price_tree.insert(stock.max_price, stock)
+        if self._on_disk:
+            self._symbol_tree.insert(stock.stock_symbol, stock.low_price)
+        else:
+            self._symbol_index.setdefault(stock.stock_symbol, []).append(stock)
+#---------------------------------------------------------------------------------------------------------------------------
+    def delete(self, stock_symbol: str, low_price: Optional[float] = None) -> List[StockNode]:
+        # removes one band of a symbol (the one with this low price) or every band if no low price is given,
+        # and gives back what was removed. Raises KeyError if there's nothing to remove
+        bands = self._bands(stock_symbol)
+        doomed = [stock for stock in bands if low_price is None or stock.low_price == low_price]
+        if not doomed:
+            raise KeyError(f"No stock {stock_symbol} with low price {low_price} to delete.")
 
-        self._tree.insert(stock.low,stock)
+        for stock in doomed:
+            self._tree.remove(stock.low_price, stock) #removes this exact stock even if another one has the same low price
+            self._max_price_tree.remove(stock.max_price, stock)
+        if self._on_disk:
+            for stock in doomed:
+                self._symbol_tree.remove(stock_symbol, stock.low_price)
+            return doomed
+        remaining = [stock for stock in bands if all(stock is not gone for gone in doomed)]
+        if remaining:
+            self._symbol_index[stock_symbol] = remaining
+        else:
+            del self._symbol_index[stock_symbol]
+        return doomed
+#---------------------------------------------------------------------------------------------------------------------------
+    def add_stocks(self, stocks: List[StockNode]):
+        # bulk version of add_stock, sorts the batch once per tree and merges it in instead of inserting one at a time
+        self._tree.merge((stock.low_price, stock) for stock in sorted(stocks, key=attrgetter('low_price')))
+        self._max_price_tree.merge((stock.max_price, stock) for stock in sorted(stocks, key=attrgetter('max_price')))
+        if self._on_disk: #sorted is stable, so a symbol's bands keep the order they came in
+            self._symbol_tree.merge(sorted(((stock.stock_symbol, stock.low_price) for stock in stocks), key=itemgetter(0)))
+            return
+        for stock in stocks:
+            self._symbol_index.setdefault(stock.stock_symbol, []).append(stock)
+#---------------------------------------------------------------------------------------------------------------------------
+    def load_from_csv(self, filepath: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> LoadStats:
+        # streams the file (gzipped or not) in chunks so a huge end-of-day file never sits in memory all at once,
+        # and gives back how many rows were loaded and how fast
+        def apply_chunk(rows: List[List[str]]):
+            #the band is [LowPrice, HighPrice], so the high is the max we've seen
+            self.add_stocks([StockNode(symbol, name, current_price=float(high), low_price=float(low))
+                             for symbol, name, low, high in rows])
+        return load_csv(filepath, apply_chunk, chunk_size)
+#---------------------------------------------------------------------------------------------------------------------------
+    def save(self, path: str):
+        # a warm start file, one column per field for the stocks in low price order, every price history packed
+        # back to back as raw doubles, where each stock sits in max price order, and the symbol index as positions.
+        # Columns instead of pickled StockNodes, since unpickling millions of small objects is slower than reading
+        # the CSV again. Alerts, correlations and registered moving average windows are set up per run, not saved
+        if self._on_disk: #its trees hold copies, so the positions below can't be matched up by identity
+            raise TypeError("A manager with storage keeps its stocks in its storage directory, close() it instead of saving.")
+        stocks = [stock for _, stock in self._tree.iter_items()]
+        position = {id(stock): index for index, stock in enumerate(stocks)}
+        histories = [stock.historical_prices for stock in stocks]
+        write_snapshot(path, b'SPMG', [
+            pack_keys([stock.low_price for stock in stocks]),
+            pack_values(([stock.stock_symbol for stock in stocks], [stock.stock_name for stock in stocks])),
+            pack_keys([stock.current_price for stock in stocks]),
+            pack_keys([stock.max_price for stock in stocks]),
+            array('q', [len(history) for history in histories]).tobytes(),
+            array('q', [history.capacity for history in histories]).tobytes(),
+            b''.join(history.to_array().tobytes() for history in histories),
+            array('q', [position[id(stock)] for _, stock in self._max_price_tree.iter_items()]).tobytes(),
+            pack_values({symbol: [position[id(stock)] for stock in bands] for symbol, bands in self._symbol_index.items()}),
+        ])
+#---------------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def load(cls, path: str, on_alert: Optional[Callable[[AlertEvent], None]] = None) -> StockPriceManager:
+        # everything comes back already sorted, so both trees are bulk built in O(n) without a single rotation
+        manager = cls(on_alert)
+        lengths, capacities, prices, max_order = array('q'), array('q'), array('d'), array('q')
+        with paused_gc(): #nothing here makes a reference cycle, and the collector rescanning the heap costs more than the load
+            with open_snapshot(path, b'SPMG') as sections:
+                low_prices = unpack_keys(sections[0])
+                symbols, names = unpack_values(sections[1])
+                current_prices = unpack_keys(sections[2])
+                max_prices = unpack_keys(sections[3])
+                lengths.frombytes(sections[4])
+                capacities.frombytes(sections[5])
+                prices.frombytes(sections[6])
+                max_order.frombytes(sections[7])
+                index = unpack_values(sections[8])
 
-        self._tree.insert(stock.max_price, stock) #, stock
-        
-        #self._stocks.update(stock) 
-#---------------------------------------------------------------------------------------------------------------------------
-    def load_from_csv(self, filepath):
-        with open(filepath, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Skip header row
-            for row in reader:
-                symbol, name, low, high = row[0], row[1], int(row[2]), int(row[3])
-                stock = StockNode(symbol,name, low, high)
-                #print(stock)
-                self.add_stock(stock)
-#---------------------------------------------------------------------------------------------------------------------------
-    def lookup_stock_price(self, symbol: str) -> Stock:
-        for price, stock in self._stock_dictionary.items(): #for some reason item is 0????
-            if stock.stock_symbol == symbol:
-                return stock
-        return None
+            stocks: List[StockNode] = []
+            start = 0
+            for row in range(len(low_prices)):
+                end = start + lengths[row]
+                history = PriceHistory.from_array(prices[start:end], capacities[row])
+                stocks.append(StockNode(symbols[row], names[row], current_prices[row], low_prices[row], max_prices[row], history))
+                start = end
+            manager._tree = PriceTree.from_sorted(zip(low_prices, stocks))
+            manager._max_price_tree = MultiMapAVLTree.from_sorted((stocks[i].max_price, stocks[i]) for i in max_order)
+            manager._symbol_index = {symbol: [stocks[i] for i in positions] for symbol, positions in index.items()}
+        return manager
+#---------------------------------------------------------------------------------------------------------------------------
+    def lookup_stock_price(self, symbol: str) -> Optional[StockNode]:
+        bands = self._bands(symbol) #straight to the symbol instead of scanning every stock
+        return bands[0] if bands else None
 #---------------------------------------------------------------------------------------------------------------------------
-    def get_top_k(self, k: int):
-#put this into a list, need to pull out the key (not the value) into a list, order by decending, return top 5
-       list_of_stocks = list(self._stock_dictionary.keys())
-       list_of_names = list(self._stock_dictionary.values())
-       list_of_stocks.sort(reverse = True)
-       return list_of_names [:k]
-#---------------------------------------------------------------------------------------------------------------------------
-    def get_top_k_stocks(self, k: int) -> List[StockNode]:
-        if not self._stock_dictionary:
-            print("No stocks available.")
-            return []
-        
-        # Retrieve top k from the _tree directly
-        return self.get_top_k(k)  # Call the get_top_k method directly
-#---------------------------------------------------------------------------------------------------------------------------
-    def get_bottom_k_stocks(self, k: int):
-        return self.get_bottom_k(k)  
-#---------------------------------------------------------------------------------------------------------------------------
-    def get_bottom_k(self, k: int):
-        list_of_stocks = list(self._stock_dictionary.keys())
-        list_of_names = list(self._stock_dictionary.values())
-        list_of_stocks.sort()
-        return list_of_names [:k]
+    def lookup_stock_bands(self, symbol: str) -> List[StockNode]:
+        # every price band recorded for the symbol (the CSV has GOOGL several times), in the order they came in
+        return list(self._bands(symbol))
+#---------------------------------------------------------------------------------------------------------------------------
+    def _ranking_tree(self, by: str) -> AVLTree: #which tree to walk for a ranking
+        if by == 'low_price':
+            return self._tree
+        if by == 'max_price':
+            return self._max_price_tree
+        raise ValueError(f"Can only rank stocks by 'low_price' or 'max_price', not {by!r}.")
+#---------------------------------------------------------------------------------------------------------------------------
+    def get_top_k(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        # walks the tree backwards from the biggest key and stops after k stocks, O(log n + k)
+        return [stock for _, stock in self._ranking_tree(by).top_k(k)]
+#---------------------------------------------------------------------------------------------------------------------------
+    def get_top_k_stocks(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        # Retrieve top k from the _tree directly, an empty tree just gives back []
+        return self.get_top_k(k, by)  # Call the get_top_k method directly
+#---------------------------------------------------------------------------------------------------------------------------
+    def get_bottom_k_stocks(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        return self.get_bottom_k(k, by)
+#---------------------------------------------------------------------------------------------------------------------------
+    def get_bottom_k(self, k: int, by: str = 'low_price') -> List[StockNode]:
+        # same as get_top_k but from the smallest key up
+        return [stock for _, stock in self._ranking_tree(by).bottom_k(k)]
 #---------------------------------------------------------------------------------------------------------------------------
     def get_stocks_in_price_range(self, low: float, high: float) -> List[StockNode]:
-        results = []
-    
-        # Use in-order traversal to collect stocks within the price range
-        self._inorder_price_range(self._tree._root, low, high, results)
-    
-        return results
+        # same idea as range_query, but hands back the stocks themselves in low price order
+        return [stock for _, stock in self._tree.irange(low, high)]
 #---------------------------------------------------------------------------------------------------------------------------
-    def _inorder_price_range(self, node: Optional[StockNode], low: float, high: float, results: list):
-        if not node:
-            return
-
-        # Traverse the left subtree
-        self._inorder_price_range(node._left, low, high, results)
 
-        # Check if the current node's price is within the range
-        if low <= node._value.max_price <= high: #was current_price, but it broke, avl node doesn't seem to have a current_price attatched, check for mislabel
-            results.append(node)
+    def enable_metrics(self) -> Metrics:
+        # times every operation in TIMED_OPERATIONS and counts comparisons, rotations and visits in both trees.
+        # Only this manager is instrumented, and disable_metrics puts the plain methods back
+        if self._metrics is None:
+            self._metrics = Metrics()
+            instrument_methods(self, TIMED_OPERATIONS, self._metrics.latencies)
+        if not self._on_disk: #the disk trees have no counters of their own, only the latencies are timed
+            self._metrics.trees['low_price'] = self._tree.enable_metrics(self._metrics.trees.get('low_price'))
+            self._metrics.trees['max_price'] = self._max_price_tree.enable_metrics(self._metrics.trees.get('max_price'))
+        return self._metrics
+#---------------------------------------------------------------------------------------------------------------------------
+    def disable_metrics(self):
+        uninstrument(self, TIMED_OPERATIONS)
+        if not self._on_disk:
+            self._tree.disable_metrics()
+            self._max_price_tree.disable_metrics()
+        self._metrics = None
+#---------------------------------------------------------------------------------------------------------------------------
+    def metrics_snapshot(self) -> Dict[str, Any]: #everything recorded so far as plain numbers, {} while metrics are off
+        if self._metrics is None:
+            return {}
+        return {'times_called': self.times_called, **self._metrics.snapshot()}
+#---------------------------------------------------------------------------------------------------------------------------
 
-        # Traverse the right subtree
-        self._inorder_price_range(node._right, low, high, results)
+    def close(self):
+        # writes everything a manager with storage still has cached out to its files and closes them,
+        # nothing to do for one in memory
+        if self._on_disk:
+            self._tree.close()
+            self._max_price_tree.close()
+            self._symbol_tree.close()
 #---------------------------------------------------------------------------------------------------------------------------
 
     def display_all_stocks(self):
-        stocks = self._tree.inorder()# change this, inorder doesn't do what i thought it did?
-        for stock in stocks:
-            print(f"{stock.stock_symbol} - {stock.stock_name} - {stock.low}-{stock.max_price}")
+        for _, stock in self._tree.iter_items(): #inorder() only gives back the keys, iter_items streams the stocks themselves
+            print(f"{stock.stock_symbol} - {stock.stock_name} - {stock.low_price}-{stock.max_price}")
 #---------------------------------------------------------------------------------------------------------------------------
 
 # Example usage:
@@ -227,13 +455,11 @@ if __name__ == "__main__":
     manager.insert("AAPL", "Apple Inc.", 150.0, 0)
     manager.insert("GOOGL", "Alphabet Inc.", 2800.0, 0)
     manager.insert("AMZN", "Amazon.com Inc.", 3400.0, 0)
+    manager.add_alert("AAPL", 148.0, 'below')
 
     print("Current price of AAPL:", manager.lookup(3400))
     print("Stocks in price range 1000 to 2000:", manager.range_query(1000, 2000))
     
-    # Check alerts
-    print("Alerts:", manager.check_alerts())
-    
     # Find 50th percentile stock
     print("Finding 50th percentile stock:", manager.find_percentile(50))
     
@@ -241,13 +467,16 @@ if __name__ == "__main__":
     manager.insert("AAPL", "Apple Inc.", 145.0, 0)
     manager.insert("AAPL", "Apple Inc.", 155.0, 0)
     print("AAPL moving average (last 3 prices):", manager.calculate_moving_average(150, 3))
+
+    # Check alerts, the drop to 145 crossed the 148 threshold
+    print("Alerts:", manager.check_alerts())
     
     # Correlation tracking
     manager.track_correlation("AAPL", "GOOGL")
     print("Correlated stocks with AAPL:", manager.find_correlated_stocks("AAPL"))
 
-    manager.load_from_csv('./stocks/sample_stock_prices.csv')  # Load stocks from CSV
-    print("Successfully Loaded Stocks From CSV")
+    stats = manager.load_from_csv('./stocks/sample_stock_prices.csv')  # Load stocks from CSV
+    print("Successfully Loaded Stocks From CSV:", stats)
     # Display all stocks
     #print("All Stocks:")
     #manager.display_all_stocks()
@@ -256,7 +485,7 @@ if __name__ == "__main__":
     symbol_to_lookup = 'AAPL'
     stock = manager.lookup_stock_price(symbol_to_lookup)
     if stock:
-        print(f"\nStock Price Lookup for {symbol_to_lookup}: {stock.low}-{stock.max_price}")
+        print(f"\nStock Price Lookup for {symbol_to_lookup}: {stock.low_price}-{stock.max_price}")
     else:
         print(f"\nStock {symbol_to_lookup} not found.")
 
@@ -277,5 +506,5 @@ if __name__ == "__main__":
     stocks_in_range = manager.get_stocks_in_price_range(low_price, high_price)
     print(f"\nStocks in price range {low_price}-{high_price}:")
     for stock in stocks_in_range:
-        print(f"{stock._value.stock_symbol} - {stock._value.stock_name} - {stock._value.low_price}-{stock._value.max_price}")
+        print(f"{stock.stock_symbol} - {stock.stock_name} - {stock.low_price}-{stock.max_price}")
  
\ No newline at end of file
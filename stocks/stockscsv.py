@@ -1,58 +1,78 @@
-import csv
 from dataclasses import dataclass
+from operator import attrgetter
 from datastructures.avltree import AVLTree  # Ensure you have this module
 from datastructures.intervaltree import IntervalTree  # Ensure you have this module
+from stocks.loader import DEFAULT_CHUNK_SIZE, LoadStats, load_csv
 
 @dataclass(order=True)
 class Stock:
     symbol: str
     name: str
-    low: int
-    high: int
+    low: float
+    high: float
 
 class StockManager:
     def __init__(self):
         self._interval_tree = IntervalTree()
-        self._stocks = AVLTree()  # Assuming AVLTree is used to keep stocks sorted
+        self._stocks = AVLTree()  # stocks sorted by their high price, for top-k
+        self._symbol_index = {}  # symbol -> list of that symbol's stocks (one per price band)
 
     def add_stock(self, stock: Stock):
         # Add stock to the interval tree
         self._interval_tree.insert(stock.low, stock.high, stock)
-        # Add stock to AVL tree for sorted access
-        self._stocks.insert(stock)  # Assuming AVLTree has an insert method
-
-    def load_from_csv(self, filepath):
-        with open(filepath, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Skip header row
-            for row in reader:
-                symbol, name, low, high = row[0], row[1], int(row[2]), int(row[3])
-                stock = Stock(symbol, name, low, high)
-                self.add_stock(stock)
+        # Add stock to AVL tree for sorted access by high price
+        self._stocks.insert(stock.high, stock)
+        self._symbol_index.setdefault(stock.symbol, []).append(stock)
+
+    def remove_stock(self, stock: Stock):
+        # takes the stock out of both trees and the symbol index, KeyError if it isn't there
+        self._interval_tree.delete(stock.low, stock.high, stock)
+        self._stocks.remove(stock.high, stock)
+        bands = self._symbol_index[stock.symbol]
+        del bands[next(index for index, band in enumerate(bands) if band is stock)]  # by identity, equal bands are separate stocks
+        if not bands:
+            del self._symbol_index[stock.symbol]
+
+    def add_stocks(self, stocks):
+        # bulk version of add_stock: each tree gets the batch sorted once and merged in
+        self._interval_tree.merge((stock.low, stock.high, stock) for stock in sorted(stocks, key=attrgetter('low')))
+        self._stocks.merge((stock.high, stock) for stock in sorted(stocks, key=attrgetter('high')))
+        for stock in stocks:
+            self._symbol_index.setdefault(stock.symbol, []).append(stock)
+
+    def load_from_csv(self, filepath, chunk_size: int = DEFAULT_CHUNK_SIZE) -> LoadStats:
+        # streams the (possibly gzipped) file in chunks and returns rows loaded and rows per second
+        def apply_chunk(rows):
+            self.add_stocks([Stock(symbol, name, float(low), float(high)) for symbol, name, low, high in rows])
+        return load_csv(filepath, apply_chunk, chunk_size)
 
     def lookup_stock_price(self, symbol: str) -> Stock:
-        for stock in self._stocks.inorder():  # Assuming inorder() returns sorted stocks
-            if stock.symbol == symbol:
-                return stock
-        return None
+        bands = self._symbol_index.get(symbol)  # O(1) through the index instead of walking the tree
+        return bands[0] if bands else None
+
+    def lookup_stock_bands(self, symbol: str):
+        return list(self._symbol_index.get(symbol, []))
 
     def get_top_k_stocks(self, k: int):
-        return self._stocks.get_top_k(k)  # Assuming get_top_k returns top k stocks based on high price
+        # top k stocks based on high price, walking backwards from the highest and stopping after k
+        return [stock for _, stock in self._stocks.top_k(k)]
 
     def get_bottom_k_stocks(self, k: int):
-        return self._stocks.get_bottom_k(k)  # Assuming get_bottom_k returns bottom k stocks based on low price
+        # bottom k stocks based on low price, the interval tree is already keyed on the low end
+        return [stock for _, stock in self._interval_tree.bottom_k(k)]
 
     def get_stocks_in_price_range(self, low: int, high: int):
-        return self._interval_tree.range_query(low, high)
+        # every stock whose [low, high] band overlaps the range, in order of their low price
+        return [stock for _, _, stock in self._interval_tree.overlap(low, high)]
 
     def display_all_stocks(self):
-        stocks = self._stocks.inorder()
-        for stock in stocks:
+        for _, stock in self._stocks.iter_items():
             print(f"{stock.symbol} - {stock.name} - {stock.low}-{stock.high}")
 
 def main():
     stock_manager = StockManager()
-    stock_manager.load_from_csv('./stocks/sample_stock_prices.csv')  # Load stocks from CSV
+    stats = stock_manager.load_from_csv('./stocks/sample_stock_prices.csv')  # Load stocks from CSV
+    print(f"Loaded {stats}")
 
     # Display all stocks
     print("All Stocks:")
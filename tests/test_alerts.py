@@ -0,0 +1,74 @@
+import queue
+
+import pytest
+
+from stocks.alerts import ABOVE, BELOW, AlertEvent, AlertRegistry
+from stocks.stock import StockPriceManager
+
+
+class TestAlertRegistry:
+    @pytest.fixture
+    def registry(self) -> AlertRegistry:
+        registry = AlertRegistry()
+        for threshold in (100.0, 110.0, 120.0):
+            registry.add('ACME', threshold, ABOVE)
+        for threshold in (90.0, 80.0):
+            registry.add('ACME', threshold, BELOW)
+        return registry
+
+    def test_rise_fires_only_the_crossed_upper_thresholds(self, registry: AlertRegistry):
+        # Act
+        events = registry.evaluate('ACME', 100.0, 115.0)
+
+        # Assert
+        assert events == [AlertEvent('ACME', 110.0, ABOVE, 100.0, 115.0)]
+        assert registry.drain() == events
+        assert registry.drain() == []
+
+    def test_drop_fires_nearest_threshold_first(self, registry: AlertRegistry):
+        events = registry.evaluate('ACME', 95.0, 80.0)
+        assert [event.threshold for event in events] == [90.0, 80.0]
+        assert all(event.direction == BELOW for event in events)
+
+    def test_flat_price_and_other_symbols_fire_nothing(self, registry: AlertRegistry):
+        assert registry.evaluate('ACME', 105.0, 105.0) == []
+        assert registry.evaluate('OTHER', 50.0, 150.0) == []
+
+    def test_events_go_to_a_queue(self):
+        # Arrange
+        events: queue.Queue = queue.Queue()
+        registry = AlertRegistry(on_alert=events.put_nowait)
+        registry.add('ACME', 50.0, ABOVE)
+
+        # Act
+        registry.evaluate('ACME', 40.0, 60.0)
+
+        # Assert
+        assert events.get_nowait().threshold == 50.0
+        assert registry.drain() == []
+
+    def test_remove(self, registry: AlertRegistry):
+        registry.remove('ACME', 110.0, ABOVE)
+        assert registry.thresholds('ACME', ABOVE) == [100.0, 120.0]
+        with pytest.raises(KeyError):
+            registry.remove('ACME', 110.0, ABOVE)
+        with pytest.raises(ValueError):
+            registry.add('ACME', 1.0, 'sideways')
+
+
+class TestManagerAlerts:
+    def test_insert_fires_on_crossings_only(self):
+        # Arrange
+        manager = StockPriceManager()
+        manager.insert('ACME', 'Acme Corp', 125.0, 100.0)
+        manager.add_alert('ACME', 120.0, BELOW)
+
+        # Act
+        manager.insert('ACME', 'Acme Corp', 121.0, 100.0)
+        quiet = manager.check_alerts()
+        manager.insert('ACME', 'Acme Corp', 119.0, 100.0)
+        manager.insert('ACME', 'Acme Corp', 118.0, 100.0)
+
+        # Assert
+        assert quiet == []
+        assert manager.check_alerts() == ['Alert: ACME dropped below $120.00 (121.00 -> 119.00)']
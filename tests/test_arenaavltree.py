@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from datastructures.arenaavltree import NIL, ArenaAVLTree
+
+
+def check_slot(tree: ArenaAVLTree, slot: int) -> int:
+    """Checks heights, counts and balance below a slot and returns the real height."""
+    if slot == NIL:
+        return 0
+    left_height = check_slot(tree, tree._left[slot])
+    right_height = check_slot(tree, tree._right[slot])
+    assert tree._height[slot] == 1 + max(left_height, right_height)
+    assert tree._size[slot] == 1 + tree._node_size(tree._left[slot]) + tree._node_size(tree._right[slot])
+    assert abs(left_height - right_height) <= 1
+    return tree._height[slot]
+
+
+class TestArenaAVLTree:
+    def test_random_inserts_and_deletes_match_a_set(self):
+        # Arrange
+        rng = random.Random(99)
+        tree: ArenaAVLTree = ArenaAVLTree()
+        expected: set[int] = set()
+
+        # Act
+        for _ in range(3000):
+            key = rng.randrange(400)
+            if key in expected:
+                tree.delete(key)
+                expected.remove(key)
+            else:
+                tree.insert(key, str(key))
+                expected.add(key)
+
+        # Assert
+        check_slot(tree, tree._root)
+        assert tree.inorder() == sorted(expected)
+        assert tree.size() == len(expected)
+        assert all(tree.search(key) == str(key) for key in expected)
+
+    def test_deleted_slots_are_reused(self):
+        # Arrange
+        tree: ArenaAVLTree = ArenaAVLTree()
+        for key in range(100):
+            tree.insert(key, key)
+
+        # Act
+        for key in range(50):
+            tree.delete(key)
+        for key in range(100, 150):
+            tree.insert(key, key)
+
+        # Assert
+        assert len(tree._values) == 100
+        assert tree.inorder() == list(range(50, 150))
+
+    def test_typed_keys_and_bulk_load(self):
+        tree: ArenaAVLTree = ArenaAVLTree([(3.5, 'c'), (1.5, 'a'), (2.5, 'b')], key_typecode='d')
+        check_slot(tree, tree._root)
+        assert tree.inorder() == [1.5, 2.5, 3.5]
+        assert tree.search(2.5) == 'b'
+        assert tree.search(9.0) is None
+
+    def test_traversals_match_avltree_order(self):
+        tree: ArenaAVLTree = ArenaAVLTree([(key, key * 10) for key in range(1, 8)])
+        assert tree.preorder() == [4, 2, 1, 3, 6, 5, 7]
+        assert tree.postorder() == [1, 3, 2, 5, 7, 6, 4]
+        assert tree.bforder() == [4, 2, 6, 1, 3, 5, 7]
+        visited: list[int] = []
+        tree.inorder(visited.append)
+        assert visited == [10, 20, 30, 40, 50, 60, 70]
+
+    def test_delete_missing_key_raises(self):
+        with pytest.raises(KeyError):
+            ArenaAVLTree().delete(1)
@@ -0,0 +1,435 @@
+import random
+
+import pytest
+
+from datastructures.avltree import AVLNode, AVLTree
+
+
+def check_node(tree: AVLTree, node: AVLNode | None) -> int:
+    """Walks a subtree and checks the stored heights, counts and AVL balance, returns the real height."""
+    if node is None:
+        return 0
+    left_height = check_node(tree, node._left)
+    right_height = check_node(tree, node._right)
+    assert node._height == 1 + max(left_height, right_height)
+    assert node._size == 1 + tree._node_size(node._left) + tree._node_size(node._right)
+    assert abs(left_height - right_height) <= 1
+    return node._height
+
+
+class TestAVLTreeOrderStatistics:
+    @pytest.fixture
+    def keys(self) -> list[int]:
+        keys = list(range(0, 200, 2))
+        random.Random(351).shuffle(keys)
+        return keys
+
+    @pytest.fixture
+    def tree(self, keys: list[int]) -> AVLTree:
+        tree: AVLTree = AVLTree()
+        for key in keys:
+            tree.insert(key, str(key))
+        return tree
+
+    def test_size_tracks_inserts_and_deletes(self, tree: AVLTree, keys: list[int]):
+        # Arrange
+        to_delete = keys[:40]
+
+        # Act
+        for key in to_delete:
+            tree.delete(key)
+
+        # Assert
+        assert tree.size() == len(keys) - len(to_delete)
+        check_node(tree, tree._root)
+
+    def test_rank_counts_smaller_keys(self, tree: AVLTree):
+        assert tree.rank(0) == 0
+        assert tree.rank(1) == 1
+        assert tree.rank(100) == 50
+        assert tree.rank(1000) == 100
+
+    def test_inclusive_rank_counts_equal_keys(self):
+        tree: AVLTree = AVLTree([(1, 'a'), (2, 'b'), (2, 'c'), (2, 'd'), (3, 'e')])
+        assert tree.rank(2) == 1
+        assert tree.rank(2, inclusive=True) == 4
+        assert tree.rank(2.5, inclusive=True) == 4
+
+    def test_select_returns_sorted_positions(self, tree: AVLTree):
+        assert tree.select(0) == (0, '0')
+        assert tree.select(50) == (100, '100')
+        assert tree.select(99) == (198, '198')
+
+    def test_select_out_of_range_raises(self, tree: AVLTree):
+        with pytest.raises(IndexError):
+            tree.select(100)
+        with pytest.raises(IndexError):
+            tree.select(-1)
+
+    def test_select_is_inverse_of_rank(self, tree: AVLTree):
+        for index in range(tree.size()):
+            key, _ = tree.select(index)
+            assert tree.rank(key) == index
+
+    def test_quantile(self, tree: AVLTree):
+        assert tree.quantile(0) == (0, '0')
+        assert tree.quantile(0.5) == (98, '98')
+        assert tree.quantile(1) == (198, '198')
+        with pytest.raises(ValueError):
+            tree.quantile(1.5)
+
+    def test_quantile_uses_the_nearest_rank_on_an_even_size(self):
+        # nearest rank is index ceil(p * n) - 1, so the median of 4 keys is the 2nd and not the 3rd
+        tree = AVLTree([(key, str(key)) for key in (10, 20, 30, 40)])
+        assert tree.quantile(0.5) == (20, '20')
+        assert tree.quantile(0.25) == (10, '10')
+        assert tree.quantile(0.26) == (20, '20')
+        assert tree.quantile(0.75) == (30, '30')
+        assert tree.quantile(0.01) == (10, '10')
+
+    def test_quantile_on_empty_tree(self):
+        assert AVLTree().quantile(0.5) is None
+
+
+class TestAVLTreeIterativeEngine:
+    def test_search_finds_keys_below_the_root(self):
+        # Arrange
+        tree: AVLTree = AVLTree()
+        for key in range(32):
+            tree.insert(key, key * 10)
+
+        # Act / Assert
+        for key in range(32):
+            assert tree.search(key) == key * 10
+        assert tree.search(99) is None
+
+    def test_random_inserts_and_deletes_keep_the_tree_balanced(self):
+        # Arrange
+        rng = random.Random(2024)
+        tree: AVLTree = AVLTree()
+        expected: set[int] = set()
+
+        # Act
+        for _ in range(2000):
+            key = rng.randrange(500)
+            if key in expected:
+                tree.delete(key)
+                expected.remove(key)
+            else:
+                tree.insert(key, key)
+                expected.add(key)
+
+        # Assert
+        check_node(tree, tree._root)
+        assert tree.inorder() == sorted(expected)
+        assert tree.size() == len(expected)
+
+    def test_delete_missing_key_raises(self):
+        tree: AVLTree = AVLTree()
+        tree.insert(1, 'one')
+        with pytest.raises(KeyError):
+            tree.delete(2)
+
+    def test_recursive_helpers_match_the_iterative_engine(self):
+        # Arrange
+        keys = list(range(100))
+        random.Random(7).shuffle(keys)
+        iterative: AVLTree = AVLTree()
+        recursive: AVLTree = AVLTree()
+
+        # Act
+        for key in keys:
+            iterative.insert(key, key)
+            recursive._root = recursive.insert_helper(recursive._root, key, key)
+        for key in keys[:50]:
+            iterative.delete(key)
+            recursive._root = recursive.delete_helper(recursive._root, key)
+
+        # Assert
+        check_node(recursive, recursive._root)
+        assert iterative.inorder() == recursive.inorder()
+        assert recursive.search_helper(recursive._root, keys[75]) == keys[75]
+
+
+class TestAVLTreeBulkLoad:
+    def test_from_sorted_builds_a_balanced_tree(self):
+        # Arrange
+        pairs = [(key, str(key)) for key in range(1000)]
+
+        # Act
+        tree: AVLTree = AVLTree.from_sorted(pairs)
+
+        # Assert
+        check_node(tree, tree._root)
+        assert tree.size() == 1000
+        assert tree._root._height == 10
+        assert tree.search(123) == '123'
+
+    def test_from_sorted_rejects_unsorted_input(self):
+        with pytest.raises(ValueError):
+            AVLTree.from_sorted([(2, 'b'), (1, 'a')])
+
+    def test_from_iterable_sorts_first(self):
+        # Arrange
+        keys = list(range(500))
+        random.Random(3).shuffle(keys)
+
+        # Act
+        tree: AVLTree = AVLTree.from_iterable((key, key) for key in keys)
+
+        # Assert
+        check_node(tree, tree._root)
+        assert tree.inorder() == list(range(500))
+
+    def test_starting_sequence_is_bulk_loaded(self):
+        tree: AVLTree = AVLTree([(3, 'c'), (1, 'a'), (2, 'b')])
+        check_node(tree, tree._root)
+        assert tree.inorder() == [1, 2, 3]
+
+    def test_bulk_loaded_tree_accepts_more_inserts_and_deletes(self):
+        tree: AVLTree = AVLTree.from_sorted((key, key) for key in range(0, 100, 2))
+        for key in range(1, 100, 2):
+            tree.insert(key, key)
+        for key in range(0, 50):
+            tree.delete(key)
+        check_node(tree, tree._root)
+        assert tree.inorder() == list(range(50, 100))
+
+
+class TestAVLTreeMerge:
+    @pytest.mark.parametrize('batch_size', [3, 60, 400])  # one insert each, a union, a full relink
+    def test_merge_keeps_order_and_balance(self, batch_size: int):
+        # Arrange
+        rng = random.Random(batch_size)
+        existing = rng.sample(range(10_000), 500)
+        batch = sorted(rng.sample(range(10_000), batch_size))
+        tree: AVLTree = AVLTree([(key, key) for key in existing])
+
+        # Act
+        tree.merge((key, key) for key in batch)
+
+        # Assert
+        check_node(tree, tree._root)
+        assert tree.inorder() == sorted(existing + batch)
+        assert tree.size() == 500 + batch_size
+
+    def test_merge_into_empty_tree(self):
+        tree: AVLTree = AVLTree()
+        tree.merge([(1, 'a'), (2, 'b')])
+        assert list(tree.iter_items()) == [(1, 'a'), (2, 'b')]
+
+    def test_merge_rejects_unsorted_batch(self):
+        with pytest.raises(ValueError):
+            AVLTree().merge([(2, 'b'), (1, 'a')])
+
+
+class TestAVLTreeTraversals:
+    @pytest.fixture
+    def tree(self) -> AVLTree:
+        #         4
+        #       /   \
+        #      2     6
+        #     / \   / \
+        #    1   3 5   7
+        return AVLTree.from_sorted((key, key * 10) for key in range(1, 8))
+
+    def test_list_traversals(self, tree: AVLTree):
+        assert tree.inorder() == [1, 2, 3, 4, 5, 6, 7]
+        assert tree.preorder() == [4, 2, 1, 3, 6, 5, 7]
+        assert tree.postorder() == [1, 3, 2, 5, 7, 6, 4]
+        assert tree.bforder() == [4, 2, 6, 1, 3, 5, 7]
+
+    def test_visit_is_called_with_each_value(self, tree: AVLTree):
+        # Arrange
+        visited: list[int] = []
+
+        # Act
+        tree.preorder(visited.append)
+
+        # Assert
+        assert visited == [40, 20, 10, 30, 60, 50, 70]
+
+    def test_iterators_yield_key_value_pairs_lazily(self, tree: AVLTree):
+        # Act
+        items = tree.iter_items()
+
+        # Assert
+        assert next(items) == (1, 10)
+        assert next(items) == (2, 20)
+        assert list(tree.iter_inorder(reverse=True))[:2] == [(7, 70), (6, 60)]
+        assert list(tree.iter_bforder())[:3] == [(4, 40), (2, 20), (6, 60)]
+
+    def test_dunder_iteration(self, tree: AVLTree):
+        assert list(tree) == [1, 2, 3, 4, 5, 6, 7]
+        assert list(reversed(tree)) == [7, 6, 5, 4, 3, 2, 1]
+        assert len(tree) == 7
+
+    def test_empty_tree_traversals(self):
+        tree: AVLTree = AVLTree()
+        assert tree.inorder() == tree.preorder() == tree.postorder() == tree.bforder() == []
+        assert list(tree.iter_items()) == []
+
+
+class TestAVLTreeRange:
+    @pytest.fixture
+    def tree(self) -> AVLTree:
+        keys = list(range(0, 100, 5))
+        random.Random(11).shuffle(keys)
+        tree: AVLTree = AVLTree()
+        for key in keys:
+            tree.insert(key, f'v{key}')
+        return tree
+
+    def test_inclusive_range(self, tree: AVLTree):
+        assert [key for key, _ in tree.irange(10, 30)] == [10, 15, 20, 25, 30]
+
+    def test_exclusive_ends(self, tree: AVLTree):
+        assert [key for key, _ in tree.irange(10, 30, inclusive=(False, False))] == [15, 20, 25]
+        assert [key for key, _ in tree.irange(10, 30, inclusive=(True, False))] == [10, 15, 20, 25]
+
+    def test_bounds_between_keys(self, tree: AVLTree):
+        assert list(tree.irange(11, 19)) == [(15, 'v15')]
+        assert list(tree.irange(12, 14)) == []
+
+    def test_open_ended_ranges(self, tree: AVLTree):
+        assert [key for key, _ in tree.irange(hi=10)] == [0, 5, 10]
+        assert [key for key, _ in tree.irange(lo=85)] == [85, 90, 95]
+        assert len(list(tree.irange())) == 20
+
+    def test_reverse_range(self, tree: AVLTree):
+        assert [key for key, _ in tree.irange(10, 30, reverse=True)] == [30, 25, 20, 15, 10]
+        assert [key for key, _ in tree.irange(10, 30, inclusive=(False, False), reverse=True)] == [25, 20, 15]
+
+    def test_range_matches_a_filter_of_every_key(self, tree: AVLTree):
+        for lo in range(-5, 105, 7):
+            for hi in range(lo, 105, 11):
+                expected = [key for key in range(0, 100, 5) if lo <= key <= hi]
+                assert [key for key, _ in tree.irange(lo, hi)] == expected
+
+
+class TestAVLTreeRemove:
+    def test_remove_deletes_the_entry_with_the_given_value(self):
+        # Arrange
+        tree: AVLTree = AVLTree()
+        for index in range(20):
+            tree.insert(index % 3, f'v{index}')
+
+        # Act
+        tree.remove(1, 'v10')
+
+        # Assert
+        check_node(tree, tree._root)
+        assert tree.size() == 19
+        assert 'v10' not in [value for _, value in tree.iter_items()]
+        with pytest.raises(KeyError):
+            tree.remove(1, 'v10')
+
+
+class TestAVLTreeTopK:
+    def test_top_and_bottom_k(self):
+        tree: AVLTree = AVLTree.from_iterable((key, -key) for key in (5, 1, 9, 3, 7))
+        assert tree.top_k(2) == [(9, -9), (7, -7)]
+        assert tree.bottom_k(3) == [(1, -1), (3, -3), (5, -5)]
+        assert tree.top_k(10) == [(9, -9), (7, -7), (5, -5), (3, -3), (1, -1)]
+        assert tree.bottom_k(0) == []
+
+
+class TestAVLTreeSetOperations:
+    @staticmethod
+    def make(keys: list[int], tag: str) -> AVLTree:
+        tree: AVLTree = AVLTree()
+        for key in keys:
+            tree.insert(key, f'{tag}{key}')
+        return tree
+
+    @pytest.mark.parametrize('size', [0, 1, 2, 17, 300])
+    def test_split_then_join_round_trips(self, size: int):
+        # Arrange
+        keys = random.Random(size).sample(range(1_000), size)
+        tree = self.make(keys + keys[:size // 3], 'a')  # some keys twice
+        pivot = 500
+
+        # Act
+        less, greater = tree.split(pivot)
+
+        # Assert
+        check_node(less, less._root)
+        check_node(greater, greater._root)
+        assert tree.size() == 0
+        assert all(key < pivot for key in less) and all(key >= pivot for key in greater)
+        assert less.size() + greater.size() == size + size // 3
+
+        joined = AVLTree.join(less, pivot, 'pivot', greater)
+        check_node(joined, joined._root)
+        assert joined.inorder() == sorted(keys + keys[:size // 3] + [pivot])
+        assert less.size() == greater.size() == 0
+
+    def test_join_rejects_keys_on_the_wrong_side(self):
+        with pytest.raises(ValueError):
+            AVLTree.join(self.make([1, 9], 'a'), 5, 'x', AVLTree())
+        with pytest.raises(ValueError):
+            AVLTree.join(AVLTree(), 5, 'x', self.make([1, 9], 'a'))
+
+    @pytest.mark.parametrize('sizes', [(500, 500), (1_000, 7), (7, 1_000), (0, 40), (40, 0)])
+    def test_set_operations_match_sorted_lists(self, sizes: tuple[int, int]):
+        # Arrange
+        rng = random.Random(sum(sizes))
+        ours = [rng.randrange(2_000) for _ in range(sizes[0])]  # duplicates on both sides
+        theirs = [rng.randrange(2_000) for _ in range(sizes[1])]
+        union, intersection, difference = (self.make(ours, 'a') for _ in range(3))
+        other = self.make(theirs, 'b')
+        before = list(other.iter_items())
+
+        # Act
+        union.union(other)
+        intersection.intersection(other)
+        difference.difference(other)
+
+        # Assert
+        for tree in (union, intersection, difference):
+            check_node(tree, tree._root)
+        assert union.inorder() == sorted(ours + theirs)
+        assert intersection.inorder() == sorted(key for key in ours if key in set(theirs))
+        assert difference.inorder() == sorted(key for key in ours if key not in set(theirs))
+        assert list(other.iter_items()) == before  # other is never changed
+        # our entries stay in front of theirs on equal keys, like insert
+        tags = sorted([(key, 'a') for key in ours] + [(key, 'b') for key in theirs], key=lambda pair: pair[0])
+        assert [value[0] for _, value in union.iter_items()] == [tag for _, tag in tags]
+
+    def test_combining_a_tree_with_itself(self):
+        tree = self.make([3, 1, 2], 'a')
+        tree.union(tree)
+        assert tree.inorder() == [1, 1, 2, 2, 3, 3]
+        tree.intersection(tree)
+        assert tree.size() == 6
+        tree.difference(tree)
+        assert tree.size() == 0
+
+    def test_insert_many_matches_one_insert_at_a_time(self):
+        # Arrange
+        rng = random.Random(351)
+        existing = [(rng.randrange(100), f'old{index}') for index in range(200)]
+        batch = [(rng.randrange(100), f'new{index}') for index in range(150)]
+        one_by_one = AVLTree.from_iterable(existing)
+        bulk = AVLTree.from_iterable(existing)
+
+        # Act
+        for key, value in batch:
+            one_by_one.insert(key, value)
+        bulk.insert_many(batch)
+
+        # Assert
+        check_node(bulk, bulk._root)
+        assert list(bulk.iter_items()) == list(one_by_one.iter_items())
+
+    def test_delete_many_removes_every_entry_for_each_key(self):
+        # Arrange
+        tree = self.make([5, 1, 5, 9, 3, 5, 7], 'a')
+
+        # Act
+        removed = tree.delete_many([7, 5, 100])
+
+        # Assert
+        check_node(tree, tree._root)
+        assert removed == 4
+        assert tree.inorder() == [1, 3, 9]
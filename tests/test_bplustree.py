@@ -0,0 +1,131 @@
+import bisect
+import random
+
+import pytest
+
+from datastructures.bplustree import BPlusTree
+
+
+def small_tree(path: str, **options) -> BPlusTree:
+    """Tiny pages, leaves and cache, so a few hundred entries already need overflow pages, splits and evictions."""
+    return BPlusTree(path, **{'page_size': 256, 'leaf_size': 4, 'fanout': 4, 'cache_nodes': 16, **options})
+
+
+class TestBPlusTree:
+    @pytest.fixture
+    def pairs(self) -> list[tuple[int, str]]:
+        rng = random.Random(25)
+        return [(rng.randrange(0, 80), f'v{index}' * rng.randrange(1, 30)) for index in range(600)]
+
+    @staticmethod
+    def ordered(pairs: list[tuple[int, str]]) -> list[tuple[int, str]]:
+        return sorted(pairs, key=lambda pair: pair[0])  # stable, so equal keys stay in insert order
+
+    def test_inserts_come_back_in_order(self, pairs: list[tuple[int, str]], tmp_path):
+        # Arrange
+        tree = small_tree(str(tmp_path / 'tree.bpt'))
+
+        # Act
+        for key, value in pairs:
+            tree.insert(key, value)
+
+        # Assert
+        assert len(tree) == tree.size() == 600
+        assert list(tree.iter_items()) == self.ordered(pairs)
+        assert list(tree.iter_items(reverse=True)) == self.ordered(pairs)[::-1]
+        assert tree.inorder() == tree.preorder() == tree.bforder() == [key for key, _ in self.ordered(pairs)]
+        assert tree.stats()['misses'] > 0  # the cache really was too small for the whole tree
+        tree.close()
+
+    def test_lookups_ranks_and_ranges(self, pairs: list[tuple[int, str]], tmp_path):
+        # Arrange
+        ordered = self.ordered(pairs)
+        keys = [key for key, _ in ordered]
+        tree = BPlusTree.from_sorted(str(tmp_path / 'tree.bpt'), ordered, page_size=256, leaf_size=4, fanout=4, cache_nodes=16)
+
+        # Act / Assert
+        for key in range(-1, 82, 3):
+            assert tree.search_all(key) == [value for stored, value in ordered if stored == key]
+            assert tree.search(key) == (tree.search_all(key) or [None])[0]
+            assert tree.rank(key) == bisect.bisect_left(keys, key)
+            assert tree.rank(key, inclusive=True) == bisect.bisect_right(keys, key)
+            for inclusive in ((True, True), (False, False), (True, False)):
+                low_ok = (lambda k: key <= k) if inclusive[0] else (lambda k: key < k)
+                high_ok = (lambda k: k <= key + 10) if inclusive[1] else (lambda k: k < key + 10)
+                expected = [pair for pair in ordered if low_ok(pair[0]) and high_ok(pair[0])]
+                assert list(tree.irange(key, key + 10, inclusive)) == expected
+                assert list(tree.irange(key, key + 10, inclusive, reverse=True)) == expected[::-1]
+        assert [tree.select(index) for index in range(0, 600, 7)] == ordered[::7]
+        assert tree.top_k(3) == ordered[::-1][:3]
+        assert tree.bottom_k(3) == ordered[:3]
+        tree.close()
+
+    def test_deletes_and_removes(self, pairs: list[tuple[int, str]], tmp_path):
+        # Arrange
+        tree = small_tree(str(tmp_path / 'tree.bpt'))
+        tree.merge(self.ordered(pairs))
+        rng = random.Random(4)
+        doomed = rng.sample(pairs, 400)
+
+        # Act
+        for key, value in doomed[:200]:
+            tree.remove(key, value)
+        for key, _ in doomed[200:]:
+            tree.delete(key)
+
+        # Assert
+        expected = self.ordered([pair for pair in pairs if pair not in doomed[:200]])
+        for key, _ in doomed[200:]:
+            expected.remove(next(pair for pair in expected if pair[0] == key))  # delete takes the first entry of a key
+        assert list(tree.iter_items()) == expected
+        assert [tree.select(index) for index in range(len(expected))] == expected
+        with pytest.raises(KeyError):
+            tree.delete(1_000)
+        with pytest.raises(KeyError):
+            tree.remove(*doomed[0])
+        tree.close()
+
+    def test_emptied_tree_reuses_its_pages(self, pairs: list[tuple[int, str]], tmp_path):
+        # Arrange
+        tree = small_tree(str(tmp_path / 'tree.bpt'))
+        tree.merge(self.ordered(pairs))
+        tree.flush()
+        pages = tree.stats()['pages']
+
+        # Act
+        for key, value in pairs:
+            tree.remove(key, value)
+        tree.flush()
+        for key, value in pairs:
+            tree.insert(key, value)
+        tree.flush()
+
+        # Assert
+        assert tree.stats()['pages'] <= 2 * pages
+        assert list(tree.iter_items()) == self.ordered(pairs)
+        tree.close()
+
+    def test_reopening_finds_everything(self, pairs: list[tuple[int, str]], tmp_path):
+        # Arrange
+        path = str(tmp_path / 'tree.bpt')
+        with small_tree(path) as tree:
+            for key, value in pairs:
+                tree.insert(key, value)
+            tree.replace(pairs[0][0], pairs[0][1])
+
+        # Act
+        with BPlusTree(path, cache_nodes=16) as reopened:
+            found = list(reopened.iter_items())
+
+        # Assert
+        assert found == self.ordered(pairs)
+
+    def test_rejects_other_files_and_bad_options(self, tmp_path):
+        path = tmp_path / 'not-a-tree'
+        path.write_bytes(b'x' * 4096)
+        with pytest.raises(ValueError):
+            BPlusTree(str(path))
+        with pytest.raises(ValueError):
+            BPlusTree(str(tmp_path / 'tree.bpt'), cache_nodes=2)
+        with pytest.raises(ValueError):
+            BPlusTree.from_sorted(str(tmp_path / 'unsorted.bpt'), [(2, 'b'), (1, 'a')])
@@ -0,0 +1,67 @@
+from typing import Iterator
+
+import pytest
+
+from stocks.cluster import ClusterStockPriceManager
+from stocks.stock import StockPriceManager
+
+
+class TestClusterStockPriceManager:
+    @pytest.fixture
+    def single(self) -> StockPriceManager:
+        manager = StockPriceManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        return manager
+
+    @pytest.fixture
+    def cluster(self) -> Iterator[ClusterStockPriceManager]:
+        with ClusterStockPriceManager(workers=3) as manager:
+            manager.load_from_csv('./stocks/sample_stock_prices.csv', chunk_size=37)
+            yield manager
+
+    def test_scattered_queries_match_one_manager(self, single: StockPriceManager, cluster: ClusterStockPriceManager):
+        assert cluster.size() == 200
+        assert ([stock.low_price for stock in cluster.get_stocks_in_price_range(100, 200)]
+                == [stock.low_price for stock in single.get_stocks_in_price_range(100, 200)])
+        for by in ('low_price', 'max_price'):
+            assert ([getattr(stock, by) for stock in cluster.get_top_k(7, by)]
+                    == [getattr(stock, by) for stock in single.get_top_k(7, by)])
+            assert ([getattr(stock, by) for stock in cluster.get_bottom_k(7, by)]
+                    == [getattr(stock, by) for stock in single.get_bottom_k(7, by)])
+
+    def test_percentile_matches_one_manager(self, single: StockPriceManager, cluster: ClusterStockPriceManager):
+        for percentile in (0, 1, 25, 50, 73, 99, 100):
+            expected_low, _ = single._tree.quantile(percentile / 100)
+            symbol, _ = cluster.find_percentile(percentile)
+            # ties on low price may pick another stock with the same low price
+            assert expected_low in [stock.low_price for stock in cluster.lookup_stock_bands(symbol)]
+
+    def test_lookup_goes_to_the_owning_worker(self, single: StockPriceManager, cluster: ClusterStockPriceManager):
+        assert cluster.lookup_stock_price('GOOGL').current_price == single.lookup_stock_price('GOOGL').current_price
+        assert cluster.lookup_stock_price('NOPE') is None
+
+    def test_worker_errors_reach_the_caller_and_the_worker_survives(self):
+        with ClusterStockPriceManager(workers=2) as cluster:
+            # Arrange
+            cluster.insert('AAA', 'A', 12.0, 10.0)
+
+            # Act / Assert
+            with pytest.raises(KeyError):
+                cluster.delete('MISSING')
+            with pytest.raises(ValueError):
+                cluster.get_top_k(3, by='volume')
+            assert cluster.lookup_stock_price('AAA').current_price == 12.0
+            assert [stock.stock_symbol for stock in cluster.delete('AAA')] == ['AAA']
+            assert cluster.size() == 0
+            assert cluster.find_percentile(50) is None
+
+    def test_needs_a_worker(self):
+        with pytest.raises(ValueError):
+            ClusterStockPriceManager(workers=0)
+
+    def test_range_query_matches_one_manager(self, single: StockPriceManager, cluster: ClusterStockPriceManager):
+        expected = single.range_query(150, 250)
+        actual = cluster.range_query(150, 250)
+        # stocks with the same low price can come back in another order
+        assert sorted(actual) == sorted(expected)
+        assert len(actual) == len(cluster.get_stocks_in_price_range(150, 250))
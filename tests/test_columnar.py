@@ -0,0 +1,85 @@
+import math
+import random
+import statistics
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from stocks.columnar import ColumnarHistory
+from stocks.stock import StockPriceManager
+
+
+class TestColumnarHistory:
+    @pytest.fixture
+    def series(self) -> dict[str, list[float]]:
+        rng = random.Random(13)
+        series = {f'S{index}': [round(rng.uniform(10, 200), 2) for _ in range(rng.randrange(0, 40))]
+                  for index in range(25)}
+        series['ONE'] = [42.0]
+        return series
+
+    @pytest.fixture
+    def store(self, series: dict[str, list[float]]) -> ColumnarHistory:
+        return ColumnarHistory.from_series(series)
+
+    def test_packs_every_series_behind_offsets(self, store: ColumnarHistory, series: dict[str, list[float]]):
+        assert len(store) == len(series)
+        for key, prices in series.items():
+            assert store.series(key).tolist() == prices
+
+    def test_moving_average_matches_a_loop(self, store: ColumnarHistory, series: dict[str, list[float]]):
+        # Act
+        packed = store.moving_average(5)
+        latest = store.as_dict(store.latest_moving_average(5))
+
+        # Assert
+        for position, (key, prices) in enumerate(series.items()):
+            chunk = packed[store.offsets[position]:store.offsets[position + 1]]
+            for index, value in enumerate(chunk):
+                if index < 4:
+                    assert math.isnan(value)
+                else:
+                    assert value == pytest.approx(sum(prices[index - 4:index + 1]) / 5)
+            if len(prices) >= 5:
+                assert latest[key] == pytest.approx(sum(prices[-5:]) / 5)
+            else:
+                assert math.isnan(latest[key])
+
+    def test_returns_and_volatility_match_a_loop(self, store: ColumnarHistory, series: dict[str, list[float]]):
+        # Act
+        returns = store.returns()
+        volatility = store.as_dict(store.volatility())
+        recent = store.as_dict(store.volatility(10))
+
+        # Assert
+        for position, (key, prices) in enumerate(series.items()):
+            expected = [after / before - 1 for before, after in zip(prices, prices[1:])]
+            chunk = returns[store.offsets[position]:store.offsets[position + 1]]
+            if prices:
+                assert math.isnan(chunk[0])
+                assert chunk[1:].tolist() == pytest.approx(expected)
+            if len(expected) >= 2:
+                assert volatility[key] == pytest.approx(statistics.stdev(expected))
+                assert recent[key] == pytest.approx(statistics.stdev(expected[-10:]))
+            else:
+                assert math.isnan(volatility[key])
+
+    def test_from_manager_agrees_with_calculate_moving_average(self):
+        # Arrange
+        manager = StockPriceManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        stock = manager.lookup_stock_price('GOOGL')
+        for price in (200.0, 205.0, 199.5, 210.0):
+            manager.insert('GOOGL', stock.stock_name, price, stock.low_price)
+
+        # Act
+        store = ColumnarHistory.from_manager(manager)
+        latest = store.as_dict(store.latest_moving_average(3))
+
+        # Assert
+        assert latest[('GOOGL', stock.low_price)] == pytest.approx(manager.calculate_moving_average(stock.low_price, 3))
+
+    def test_rejects_bad_offsets(self):
+        with pytest.raises(ValueError):
+            ColumnarHistory(['a'], np.array([1.0, 2.0]), np.array([0, 1]))
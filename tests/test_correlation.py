@@ -0,0 +1,114 @@
+import random
+import statistics
+
+import pytest
+
+from stocks.correlation import CorrelationEngine, PairStats
+from stocks.stock import StockPriceManager
+
+
+class TestPairStats:
+    def test_matches_statistics_correlation(self):
+        # Arrange
+        rng = random.Random(14)
+        xs = [rng.uniform(100, 200) for _ in range(300)]
+        ys = [0.5 * x + rng.gauss(0, 10) for x in xs]
+        stats = PairStats()
+
+        # Act
+        for x, y in zip(xs, ys):
+            stats.update(x, y)
+
+        # Assert
+        assert stats.correlation() == pytest.approx(statistics.correlation(xs, ys))
+        assert stats.covariance() == pytest.approx(statistics.covariance(xs, ys))
+
+    def test_undefined_until_both_sides_move(self):
+        stats = PairStats()
+        stats.update(1.0, 5.0)
+        assert stats.correlation() is None
+        stats.update(2.0, 5.0)
+        assert stats.correlation() is None
+
+
+class TestCorrelationEngine:
+    def test_ticks_sample_against_the_partners_last_price(self):
+        # Arrange
+        engine = CorrelationEngine()
+        engine.track('A', 'B')
+        ticks = [('A', 10.0), ('B', 20.0), ('A', 11.0), ('B', 23.0), ('A', 12.0), ('B', 21.0)]
+
+        # Act
+        for symbol, price in ticks:
+            engine.on_tick(symbol, price)
+
+        # Assert
+        # the first A tick has no B price yet, after that each tick pairs with the other side's last price
+        xs = [10.0, 11.0, 11.0, 12.0, 12.0]
+        ys = [20.0, 20.0, 23.0, 23.0, 21.0]
+        assert engine.correlation('B', 'A') == pytest.approx(statistics.correlation(xs, ys))
+
+    def test_top_correlated_mixes_tracked_pairs_and_the_recompute(self):
+        # Arrange
+        pytest.importorskip('numpy')
+        base = [float(price) for price in range(1, 30)]
+        histories = {'A': base, 'UP': [price * 2 for price in base], 'DOWN': [-price for price in base],
+                     'NOISE': [float(price % 3) for price in range(29)]}
+        engine = CorrelationEngine()
+
+        # Act
+        engine.recompute(histories)
+
+        # Assert
+        top = engine.top_correlated('A', 2)
+        assert [symbol for symbol, _ in top] == ['UP', 'NOISE']
+        assert top[0][1] == pytest.approx(1.0)
+        assert engine.correlation('A', 'DOWN') == pytest.approx(-1.0)
+
+    def test_a_short_history_does_not_shrink_the_other_pairs(self):
+        # Arrange
+        np = pytest.importorskip('numpy')
+        rng = random.Random(14)
+        a = [100 + step + rng.gauss(0, 2) for step in range(50)]
+        b = [2 * price + rng.gauss(0, 4) for price in a]
+        # the last two ticks move apart, so a 2-price window would say -1
+        a[-2:], b[-2:] = [150.0, 151.0], [300.0, 299.0]
+        engine = CorrelationEngine()
+
+        # Act
+        engine.recompute({'A': a, 'B': b, 'SHORT': [10.0, 11.0]})
+
+        # Assert
+        assert engine.correlation('A', 'B') == pytest.approx(float(np.corrcoef(a, b)[0, 1]))
+        assert engine.correlation('A', 'B') > 0.9
+        assert engine.correlation('A', 'SHORT') == pytest.approx(1.0)
+        assert engine.correlation('B', 'SHORT') == pytest.approx(-1.0)
+
+    def test_cannot_track_a_symbol_with_itself(self):
+        with pytest.raises(ValueError):
+            CorrelationEngine().track('A', 'A')
+
+    @pytest.mark.parametrize('window', [0, 1, -5])
+    def test_recompute_rejects_windows_below_two(self, window: int):
+        with pytest.raises(ValueError):
+            CorrelationEngine().recompute({'A': [1.0, 2.0, 3.0], 'B': [3.0, 2.0, 1.0]}, window)
+
+
+class TestManagerCorrelation:
+    def test_insert_feeds_tracked_pairs(self):
+        # Arrange
+        manager = StockPriceManager()
+        manager.track_correlation('AAPL', 'MSFT')
+
+        # Act
+        for apple, microsoft in [(100.0, 200.0), (101.0, 202.0), (103.0, 206.0), (102.0, 204.0)]:
+            manager.insert('AAPL', 'Apple Inc.', apple, 90.0)
+            manager.insert('MSFT', 'Microsoft Corp.', microsoft, 190.0)
+
+        # Assert
+        assert manager.find_correlated_stocks('AAPL') == ['MSFT']
+        assert manager.top_correlated('MSFT', 1)[0][0] == 'AAPL'
+        # each tick pairs with the other symbol's last price, so the samples lag by half a step
+        xs = [100.0, 101.0, 101.0, 103.0, 103.0, 102.0, 102.0]
+        ys = [200.0, 200.0, 202.0, 202.0, 206.0, 206.0, 204.0]
+        assert manager.correlation('AAPL', 'MSFT') == pytest.approx(statistics.correlation(xs, ys))
@@ -0,0 +1,114 @@
+import pickle
+import random
+
+import pytest
+
+from stocks.history import PriceHistory
+
+
+def brute_force_ema(prices: list[float], span: int) -> float:
+    alpha = 2 / (span + 1)
+    ema = prices[0]
+    for price in prices[1:]:
+        ema += alpha * (price - ema)
+    return ema
+
+
+class TestPriceHistory:
+    @pytest.fixture
+    def prices(self) -> list[float]:
+        rng = random.Random(12)
+        return [round(rng.uniform(50, 150), 2) for _ in range(500)]
+
+    def test_keeps_only_the_last_capacity_prices(self, prices: list[float]):
+        # Arrange
+        history = PriceHistory(capacity=64)
+
+        # Act
+        for price in prices:
+            history.append(price)
+
+        # Assert
+        assert len(history) == 64
+        assert list(history) == prices[-64:]
+        assert history[0] == prices[-64]
+        assert history[-1] == prices[-1]
+
+    def test_rolling_windows_match_brute_force_on_every_tick(self, prices: list[float]):
+        # Arrange
+        history = PriceHistory(capacity=50)
+        seen: list[float] = []
+
+        for price in prices:
+            # Act
+            history.append(price)
+            seen.append(price)
+
+            # Assert
+            for period in (1, 7, 50):
+                if len(seen) < period:
+                    assert history.mean(period) is None
+                    continue
+                window = seen[-period:]
+                assert history.mean(period) == pytest.approx(sum(window) / period)
+                assert history.minimum(period) == min(window)
+                assert history.maximum(period) == max(window)
+
+    def test_ema_registered_late_matches_ema_registered_early(self, prices: list[float]):
+        # Arrange
+        early = PriceHistory(capacity=len(prices))
+        early.ema(10)
+        late = PriceHistory(capacity=len(prices))
+
+        # Act
+        for price in prices:
+            early.append(price)
+            late.append(price)
+
+        # Assert
+        assert early.ema(10) == pytest.approx(brute_force_ema(prices, 10))
+        assert late.ema(10) == pytest.approx(brute_force_ema(prices, 10))
+
+    def test_period_longer_than_capacity_raises(self):
+        with pytest.raises(ValueError):
+            PriceHistory((1.0, 2.0), capacity=4).mean(5)
+
+    def test_to_array_unwraps_the_ring(self, prices: list[float]):
+        history = PriceHistory(prices[:70], capacity=64)
+        assert history.to_array().tolist() == prices[6:70]
+        assert PriceHistory(prices[:3], capacity=64).to_array().tolist() == prices[:3]
+
+    def test_pickle_keeps_prices_and_emas(self, prices: list[float]):
+        # Arrange
+        history = PriceHistory(prices[:70], capacity=64)
+        history.ema(10)
+        history.mean(5)
+
+        # Act
+        restored = pickle.loads(pickle.dumps(history))
+        history.append(99.0)
+        restored.append(99.0)
+
+        # Assert
+        assert list(restored) == list(history)
+        assert restored.capacity == 64
+        assert restored.ema(10) == history.ema(10)
+        assert restored.mean(5) == pytest.approx(history.mean(5))
+
+    def test_snapshot_is_independent_and_keeps_emas(self, prices: list[float]):
+        # Arrange
+        history = PriceHistory(prices[:70], capacity=64)
+        history.ema(10)
+        history.mean(5)
+
+        # Act
+        snapshot = history.snapshot()
+        history.append(99.0)
+
+        # Assert
+        assert list(snapshot) == prices[6:70]
+        assert snapshot.capacity == 64
+        snapshot.append(99.0)
+        assert list(snapshot) == list(history)
+        assert snapshot.ema(10) == history.ema(10)
+        assert snapshot.mean(5) == pytest.approx(history.mean(5))
@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+from datastructures.avltree import AVLTree
+from datastructures.intervaltree import IntervalNode, IntervalTree
+
+
+def check_max_high(node: IntervalNode | None) -> int:
+    """Checks the max_high field everywhere below node and returns the real max high."""
+    if node is None:
+        return -1
+    expected = max(node._high, check_max_high(node._left), check_max_high(node._right))
+    assert node._max_high == expected
+    return expected
+
+
+def brute_force(intervals: list[tuple[int, int, str]], lo: int, hi: int) -> list[tuple[int, int, str]]:
+    return sorted((interval for interval in intervals if interval[0] <= hi and lo <= interval[1]),
+                  key=lambda interval: interval[0])
+
+
+class TestIntervalTree:
+    @pytest.fixture
+    def intervals(self) -> list[tuple[int, int, str]]:
+        rng = random.Random(5)
+        intervals = []
+        for index in range(300):
+            low = rng.randrange(0, 1000)
+            intervals.append((low, low + rng.randrange(0, 120), f'i{index}'))
+        return intervals
+
+    def test_overlap_matches_brute_force(self, intervals: list[tuple[int, int, str]]):
+        # Arrange
+        tree: IntervalTree = IntervalTree()
+        for low, high, value in intervals:
+            tree.insert(low, high, value)
+
+        # Act / Assert
+        check_max_high(tree._root)
+        for lo in range(0, 1100, 37):
+            hi = lo + 25
+            assert sorted(tree.overlap(lo, hi)) == sorted(brute_force(intervals, lo, hi))
+
+    def test_at_finds_every_interval_containing_the_point(self, intervals: list[tuple[int, int, str]]):
+        tree: IntervalTree = IntervalTree(intervals)
+        check_max_high(tree._root)
+        for point in range(0, 1100, 13):
+            assert sorted(tree.at(point)) == sorted(brute_force(intervals, point, point))
+
+    def test_results_come_out_sorted_by_low(self, intervals: list[tuple[int, int, str]]):
+        tree: IntervalTree = IntervalTree(intervals)
+        lows = [low for low, _, _ in tree.overlap(200, 600)]
+        assert lows == sorted(lows)
+
+    def test_delete_keeps_max_high_correct(self, intervals: list[tuple[int, int, str]]):
+        # Arrange
+        tree: IntervalTree = IntervalTree(intervals)
+        removed, kept = intervals[:150], intervals[150:]
+
+        # Act
+        for low, high, _ in removed:
+            tree.delete(low, high)
+
+        # Assert
+        check_max_high(tree._root)
+        assert tree.size() == len(kept)
+        assert sorted(tree.overlap(0, 2000)) == sorted(kept)
+
+    def test_delete_picks_the_matching_interval_among_equal_lows(self):
+        # Arrange
+        tree: IntervalTree = IntervalTree()
+        for high in (10, 50, 20, 40, 30):
+            tree.insert(5, high, f'h{high}')
+
+        # Act
+        tree.delete(5, 40)
+
+        # Assert
+        assert sorted(high for _, high, _ in tree.iter_intervals()) == [10, 20, 30, 50]
+        with pytest.raises(KeyError):
+            tree.delete(5, 40)
+
+    def test_rejects_backwards_interval(self):
+        with pytest.raises(ValueError):
+            IntervalTree().insert(10, 5, 'bad')
+
+    def test_merge_keeps_max_high_correct(self, intervals: list[tuple[int, int, str]]):
+        # Arrange
+        tree: IntervalTree = IntervalTree(intervals[:200])
+
+        # Act
+        tree.merge(sorted(intervals[200:], key=lambda interval: interval[0]))
+
+        # Assert
+        check_max_high(tree._root)
+        assert tree.overlap(300, 400) == brute_force(intervals, 300, 400)
+
+    def test_bulk_loaders_take_triples(self, intervals: list[tuple[int, int, str]]):
+        # Act
+        loaded = IntervalTree.from_iterable(intervals)
+        also = IntervalTree.from_sorted(sorted(intervals, key=lambda interval: interval[0]))
+
+        # Assert
+        for tree in (loaded, also):
+            check_max_high(tree._root)
+            assert sorted(tree.overlap(100, 200)) == sorted(brute_force(intervals, 100, 200))
+        with pytest.raises(ValueError):
+            IntervalTree.from_iterable([(10, 5, 'bad')])
+
+    def test_insert_many_join_and_union_keep_the_high_ends(self, intervals: list[tuple[int, int, str]]):
+        # Arrange
+        tree = IntervalTree(intervals[:100])
+        other = IntervalTree(intervals[200:])
+        low_half = [interval for interval in intervals if interval[0] < 500]
+        high_half = [interval for interval in intervals if interval[0] > 500]
+
+        # Act
+        tree.insert_many(intervals[100:200])
+        tree.union(other)
+        joined = IntervalTree.join(IntervalTree(low_half), 500, 900, 'middle', IntervalTree(high_half))
+
+        # Assert
+        check_max_high(tree._root)
+        check_max_high(joined._root)
+        assert sorted(tree.overlap(0, 1100)) == sorted(intervals)
+        assert other.size() == 100  # only read
+        assert (500, 900, 'middle') in joined.at(850)
+        assert sorted(joined.at(700)) == sorted(brute_force(low_half + high_half + [(500, 900, 'middle')], 700, 700))
+
+    def test_pair_based_operations_are_refused(self):
+        # Arrange
+        tree = IntervalTree([(1, 5, 'a'), (3, 9, 'b')])
+
+        # Act / Assert
+        with pytest.raises(TypeError):
+            tree.remove(1, 'a')
+        with pytest.raises(TypeError):
+            tree.union(AVLTree([(2, 'x')]))
+        with pytest.raises(TypeError):
+            IntervalTree.join(IntervalTree(), 4, 6, 'c', AVLTree())
+        assert tree.at(4) == [(1, 5, 'a'), (3, 9, 'b')]
+
+    def test_recursive_helpers_are_refused(self):
+        # Arrange
+        tree = IntervalTree([(1, 5, 'a'), (3, 9, 'b'), (5, 7, 'c')])
+        before = list(tree.iter_intervals())
+
+        # Act / Assert
+        # the inherited delete_helper would copy the successor's low into a node and keep the old high end
+        with pytest.raises(TypeError):
+            tree._root = tree.delete_helper(tree._root, 3)
+        with pytest.raises(TypeError):
+            tree._root = tree.insert_helper(tree._root, 4, 'd')
+        assert list(tree.iter_intervals()) == before
+        assert all(low <= high for low, high, _ in tree.iter_intervals())
@@ -0,0 +1,163 @@
+import json
+
+import pytest
+
+from datastructures.avltree import AVLTree
+from datastructures.metrics import TREE_METHODS, Histogram
+from datastructures.persistentavltree import PersistentAVLTree
+from stocks.stock import TIMED_OPERATIONS, StockPriceManager
+
+
+class TestHistogram:
+    def test_buckets_are_powers_of_two(self):
+        # Arrange
+        histogram = Histogram()
+
+        # Act
+        for value in (0, 1, 2, 3, 4, 100):
+            histogram.record(value)
+
+        # Assert
+        snapshot = histogram.snapshot()
+        assert snapshot['buckets'] == {0: 1, 1: 1, 3: 2, 7: 1, 127: 1}
+        assert (snapshot['count'], snapshot['total'], snapshot['min'], snapshot['max']) == (6, 110, 0, 100)
+        assert histogram.percentile(50) == 3
+        assert histogram.percentile(100) == 100  # capped by the largest value seen
+
+    def test_empty_histogram(self):
+        assert Histogram().percentile(50) is None
+        assert Histogram().snapshot()['mean'] is None
+
+
+class TestTreeMetrics:
+    @pytest.mark.parametrize('keys, case', [((3, 2, 1), 'LL'), ((1, 2, 3), 'RR'), ((3, 1, 2), 'LR'), ((1, 3, 2), 'RL')])
+    def test_rotations_are_counted_by_case(self, keys: tuple, case: str):
+        # Arrange
+        tree: AVLTree = AVLTree()
+        metrics = tree.enable_metrics()
+
+        # Act
+        for key in keys:
+            tree.insert(key, key)
+
+        # Assert
+        assert metrics.rotations == {name: int(name == case) for name in ('LL', 'RR', 'LR', 'RL')}
+        assert metrics.comparisons == 3  # nothing to compare for the first key, then 1 and 2
+        assert metrics.snapshot()['height'] == 2
+
+    def test_visits_per_query(self):
+        # Arrange
+        tree = AVLTree.from_sorted((key, key) for key in range(15))  # a perfect tree of height 4
+        metrics = tree.enable_metrics()
+
+        # Act
+        tree.search(7)
+        tree.search(0)
+        assert list(tree.irange(0, 2)) == [(0, 0), (1, 1), (2, 2)]
+        tree.top_k(2)
+
+        # Assert
+        visits = metrics.snapshot()['visits']
+        assert (visits['search']['min'], visits['search']['max']) == (1, 4)
+        assert visits['irange']['total'] == 4 + 3
+        assert visits['top_k']['total'] == 4 + 2
+
+    def test_disable_puts_the_plain_methods_back(self):
+        # Arrange
+        tree = AVLTree.from_sorted((key, key) for key in range(10))
+        tree.enable_metrics()
+
+        # Act
+        tree.disable_metrics()
+
+        # Assert
+        assert not set(TREE_METHODS) & set(vars(tree))
+        assert tree.search(3) == 3
+
+    def test_counting_does_no_extra_tree_work(self):
+        # Arrange
+        class CountingTree(AVLTree):
+            updates = 0
+
+            def _update(self, node):
+                CountingTree.updates += 1
+                super()._update(node)
+
+        def updates_for(tree: AVLTree) -> int:
+            CountingTree.updates = 0
+            for key in (5, 3, 8, 1, 4, 2, 9, 7, 6, 0):
+                tree.insert(key, key)
+            tree.delete(5)
+            return CountingTree.updates
+
+        plain = updates_for(CountingTree())
+        measured = CountingTree()
+        metrics = measured.enable_metrics()
+
+        # Act / Assert
+        assert updates_for(measured) == plain
+        assert sum(metrics.rotations.values()) > 0
+
+    def test_persistent_versions_keep_counting(self):
+        # Arrange
+        first: PersistentAVLTree = PersistentAVLTree()
+        metrics = first.enable_metrics()
+
+        # Act
+        latest = first
+        for key in (1, 2, 3):
+            latest = latest.insert(key, key)
+        latest.search(3)
+
+        # Assert
+        assert metrics.rotations['RR'] == 1
+        assert metrics.tree is latest
+        assert first.search(3) is None
+
+
+class TestManagerMetrics:
+    def test_off_by_default_and_nothing_printed(self, capsys: pytest.CaptureFixture):
+        # Arrange
+        manager = StockPriceManager()
+
+        # Act
+        manager.insert('AAPL', 'Apple Inc.', 150.0, 100.0)
+        manager.insert('AAPL', 'Apple Inc.', 155.0, 100.0)
+
+        # Assert
+        assert capsys.readouterr().out == ''
+        assert manager.metrics_snapshot() == {}
+        assert not set(TIMED_OPERATIONS) & set(vars(manager))
+
+    def test_snapshot_has_latencies_and_tree_counts(self):
+        # Arrange
+        manager = StockPriceManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        manager.enable_metrics()
+
+        # Act
+        manager.insert('GOOGL', 'Alphabet Inc.', 180.0, 173.0)
+        manager.range_query(100, 200)
+        manager.find_percentile(50)
+        snapshot = json.loads(json.dumps(manager.metrics_snapshot()))
+
+        # Assert
+        assert set(snapshot['latencies_ns']) == {'insert', 'range_query', 'find_percentile'}
+        assert snapshot['latencies_ns']['insert']['count'] == 1
+        assert snapshot['trees']['low_price']['size'] == 200
+        assert snapshot['trees']['low_price']['visits']['select']['count'] == 1
+        assert snapshot['trees']['low_price']['comparisons'] > 0  # the band's refresh walked down to it
+
+    def test_disable_stops_recording(self):
+        # Arrange
+        manager = StockPriceManager()
+        metrics = manager.enable_metrics()
+        manager.insert('AAPL', 'Apple Inc.', 150.0, 100.0)
+
+        # Act
+        manager.disable_metrics()
+        manager.insert('AAPL', 'Apple Inc.', 151.0, 100.0)
+
+        # Assert
+        assert metrics.latencies['insert'].count == 1
+        assert manager.metrics_snapshot() == {}
@@ -0,0 +1,199 @@
+import random
+
+import pytest
+
+from datastructures.avltree import AVLTree
+from datastructures.multimapavltree import BucketNode, MultiMapAVLTree
+
+
+def check_buckets(tree: MultiMapAVLTree, node: BucketNode | None) -> int:
+    """Checks heights, balance, one node per key and counts in values, returns the real height."""
+    if node is None:
+        return 0
+    left_height = check_buckets(tree, node._left)
+    right_height = check_buckets(tree, node._right)
+    assert node._value  # an emptied bucket takes its node with it
+    assert node._left is None or node._left._key < node._key
+    assert node._right is None or node._key < node._right._key
+    assert node._height == 1 + max(left_height, right_height)
+    assert node._size == len(node._value) + tree._node_size(node._left) + tree._node_size(node._right)
+    assert abs(left_height - right_height) <= 1
+    return node._height
+
+
+def expected_pairs(pairs: list[tuple[int, str]]) -> list[tuple[int, str]]:
+    return sorted(pairs, key=lambda pair: pair[0])  # stable, so values under a key stay in the order they came
+
+
+class TestMultiMapAVLTree:
+    @pytest.fixture
+    def pairs(self) -> list[tuple[int, str]]:
+        rng = random.Random(24)
+        return [(rng.randrange(0, 40), f'v{index}') for index in range(500)]
+
+    def test_equal_keys_share_a_node(self, pairs: list[tuple[int, str]]):
+        # Arrange
+        tree: MultiMapAVLTree = MultiMapAVLTree()
+
+        # Act
+        for key, value in pairs:
+            tree.insert(key, value)
+
+        # Assert
+        check_buckets(tree, tree._root)
+        assert sum(1 for _ in tree._iter_nodes()) == len({key for key, _ in pairs})
+        assert tree._root._height <= 7  # 40 distinct keys, where one node per entry would need at least 9 levels
+        assert tree.size() == len(tree) == 500
+        assert list(tree.iter_inorder()) == expected_pairs(pairs)
+        assert list(tree) == [key for key, _ in expected_pairs(pairs)]
+
+    def test_search_all_count_and_search(self, pairs: list[tuple[int, str]]):
+        tree = MultiMapAVLTree.from_iterable(pairs)
+        for key in range(-1, 42):
+            values = [value for stored, value in pairs if stored == key]
+            assert tree.search_all(key) == values
+            assert tree.count(key) == len(values)
+            assert tree.search(key) == (values[0] if values else None)
+
+    def test_remove_takes_out_one_value(self, pairs: list[tuple[int, str]]):
+        # Arrange
+        tree = MultiMapAVLTree.from_iterable(pairs)
+        rng = random.Random(3)
+        doomed = rng.sample(pairs, 350)
+
+        # Act
+        for key, value in doomed:
+            tree.remove(key, value)
+
+        # Assert
+        check_buckets(tree, tree._root)
+        remaining = [pair for pair in pairs if pair not in doomed]
+        assert list(tree.iter_inorder()) == expected_pairs(remaining)
+        with pytest.raises(KeyError):
+            tree.remove(*doomed[0])
+
+    def test_delete_takes_the_oldest_value_first(self):
+        # Arrange
+        tree: MultiMapAVLTree = MultiMapAVLTree()
+        for value in ('a', 'b', 'c'):
+            tree.insert(5, value)
+        tree.insert(1, 'x')
+
+        # Act
+        tree.delete(5)
+        tree.delete(5)
+
+        # Assert
+        assert tree.search_all(5) == ['c']
+        tree.delete(5)
+        assert tree.count(5) == 0 and list(tree) == [1]
+        with pytest.raises(KeyError):
+            tree.delete(5)
+
+    def test_recursive_helpers_use_the_buckets(self, pairs: list[tuple[int, str]]):
+        # Arrange
+        tree: MultiMapAVLTree = MultiMapAVLTree()
+
+        # Act
+        for key, value in pairs:
+            tree._root = tree.insert_helper(tree._root, key, value)
+        for key in range(0, 40, 3):
+            tree._root = tree.delete_helper(tree._root, key)
+
+        # Assert
+        check_buckets(tree, tree._root)
+        kept = [(key, value) for key, value in expected_pairs(pairs) if key % 3]
+        assert list(tree.iter_inorder()) == kept
+        assert tree.search_all(1) == [value for key, value in kept if key == 1]
+        with pytest.raises(KeyError):
+            tree.delete_helper(tree._root, 0)
+
+    def test_rank_and_select_count_values(self, pairs: list[tuple[int, str]]):
+        tree = MultiMapAVLTree.from_iterable(pairs)
+        ordered = expected_pairs(pairs)
+        assert [tree.select(index) for index in range(len(ordered))] == ordered
+        for key in range(-1, 42):
+            assert tree.rank(key) == sum(1 for stored, _ in pairs if stored < key)
+            assert tree.rank(key, inclusive=True) == sum(1 for stored, _ in pairs if stored <= key)
+        assert tree.quantile(1.0) == ordered[-1]
+
+    def test_traversals_and_ranges_yield_every_value(self, pairs: list[tuple[int, str]]):
+        tree = MultiMapAVLTree.from_iterable(pairs)
+        ordered = expected_pairs(pairs)
+        assert list(tree.irange(10, 20)) == [pair for pair in ordered if 10 <= pair[0] <= 20]
+        assert list(tree.irange(10, 20, reverse=True)) == [pair for pair in reversed(ordered) if 10 <= pair[0] <= 20]
+        assert tree.top_k(5) == ordered[::-1][:5]
+        for walk in (tree.iter_preorder, tree.iter_postorder, tree.iter_bforder):
+            assert sorted(walk()) == sorted(pairs)
+
+    @pytest.mark.parametrize('batch', [5, 60, 300, 1_000])
+    def test_merge_folds_batches_into_buckets(self, pairs: list[tuple[int, str]], batch: int):
+        # Arrange
+        tree = MultiMapAVLTree.from_iterable(pairs)
+        rng = random.Random(batch)
+        extra = sorted(((rng.randrange(-5, 45), f'n{index}') for index in range(batch)), key=lambda pair: pair[0])
+
+        # Act
+        tree.merge(extra)
+
+        # Assert
+        check_buckets(tree, tree._root)
+        assert list(tree.iter_inorder()) == expected_pairs(pairs + extra)
+
+    def test_set_operations_keep_one_node_per_key(self, pairs: list[tuple[int, str]]):
+        # Arrange
+        first = MultiMapAVLTree.from_iterable(pairs[:250])
+        second = MultiMapAVLTree.from_iterable(pairs[250:])
+        second_keys = {key for key, _ in pairs[250:]}
+
+        # Act
+        union = MultiMapAVLTree.from_iterable(pairs[:250])
+        union.union(second)
+        intersection = MultiMapAVLTree.from_iterable(pairs[:250])
+        intersection.intersection(second)
+        first.difference(second)
+
+        # Assert
+        for tree in (union, intersection, first):
+            check_buckets(tree, tree._root)
+        assert list(union.iter_inorder()) == expected_pairs(pairs)
+        assert list(second.iter_inorder()) == expected_pairs(pairs[250:])  # only read, buckets not shared
+        assert list(intersection.iter_inorder()) == expected_pairs([pair for pair in pairs[:250] if pair[0] in second_keys])
+        assert list(first.iter_inorder()) == expected_pairs([pair for pair in pairs[:250] if pair[0] not in second_keys])
+
+    def test_insert_many_split_and_join(self, pairs: list[tuple[int, str]]):
+        # Arrange
+        tree = MultiMapAVLTree.from_iterable(pairs[:100])
+        tree.insert_many(pairs[100:])
+
+        # Act
+        left, right = tree.split(20)
+        joined = MultiMapAVLTree.join(left, 20, 'middle', right)
+
+        # Assert
+        check_buckets(joined, joined._root)
+        assert joined.search_all(20) == ['middle'] + [value for key, value in pairs if key == 20]
+        assert joined.size() == len(pairs) + 1
+        with pytest.raises(ValueError):
+            MultiMapAVLTree.join(MultiMapAVLTree.from_sorted([(5, 'a')]), 4, 'b', MultiMapAVLTree())
+
+    def test_snapshot_round_trip(self, pairs: list[tuple[int, str]], tmp_path):
+        # Arrange
+        tree = MultiMapAVLTree.from_iterable(pairs)
+        path = str(tmp_path / 'multimap.snap')
+
+        # Act
+        tree.save(path)
+        loaded = MultiMapAVLTree.load(path)
+
+        # Assert
+        check_buckets(loaded, loaded._root)
+        assert list(loaded.iter_inorder()) == list(tree.iter_inorder())
+        assert sum(1 for _ in loaded._iter_nodes()) == sum(1 for _ in tree._iter_nodes())
+
+    def test_same_answers_as_avltree(self, pairs: list[tuple[int, str]]):
+        plain = AVLTree.from_iterable(pairs)
+        multi = MultiMapAVLTree.from_iterable(pairs)
+        assert list(multi.iter_inorder()) == list(plain.iter_inorder())
+        assert [multi.rank(key) for key in range(40)] == [plain.rank(key) for key in range(40)]
+        assert multi._root._height < plain._root._height
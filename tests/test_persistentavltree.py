@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from datastructures.avltree import AVLNode, AVLTree
+from datastructures.persistentavltree import PersistentAVLTree
+from tests.test_avltree import check_node
+
+
+def all_nodes(node: AVLNode | None) -> set[int]:
+    if node is None:
+        return set()
+    return {id(node)} | all_nodes(node._left) | all_nodes(node._right)
+
+
+class TestPersistentAVLTree:
+    def test_every_version_keeps_its_contents(self):
+        # Arrange
+        rng = random.Random(17)
+        versions = [PersistentAVLTree()]
+        expected: list[list[int]] = [[]]
+
+        # Act
+        for _ in range(600):
+            current, keys = versions[-1], expected[-1]
+            if keys and rng.random() < 0.4:
+                key = rng.choice(keys)
+                versions.append(current.delete(key))
+                keys = list(keys)
+                keys.remove(key)
+            else:
+                key = rng.randrange(300)
+                versions.append(current.insert(key, str(key)))
+                keys = sorted(keys + [key])
+            expected.append(keys)
+
+        # Assert
+        for version, keys in zip(versions, expected):
+            check_node(version, version._root)
+            assert version.inorder() == keys
+
+    def test_updates_share_untouched_subtrees(self):
+        # Arrange
+        tree = PersistentAVLTree.from_sorted((key, key) for key in range(1024))
+        before = all_nodes(tree._root)
+
+        # Act
+        newer = tree.insert(2000, 2000)
+        after = all_nodes(newer._root)
+
+        # Assert
+        copied = after - before
+        assert len(copied) <= 2 * tree._root._height + 1
+        assert tree.size() == 1024 and newer.size() == 1025
+
+    def test_remove_and_merge_return_new_versions(self):
+        # Arrange
+        tree = PersistentAVLTree([(1, 'a'), (2, 'b'), (2, 'c'), (3, 'd')])
+
+        # Act
+        removed = tree.remove(2, 'c')
+        small = tree.merge([(5, 'e')])
+        large = tree.merge([(0, 'z'), (2, 'y'), (9, 'x'), (10, 'w'), (11, 'v')])
+
+        # Assert
+        assert list(tree.iter_items()) == [(1, 'a'), (2, 'b'), (2, 'c'), (3, 'd')]
+        assert list(removed.iter_items()) == [(1, 'a'), (2, 'b'), (3, 'd')]
+        assert small.inorder() == [1, 2, 2, 3, 5]
+        assert large.inorder() == [0, 1, 2, 2, 2, 3, 9, 10, 11]
+        check_node(large, large._root)
+
+    def test_missing_key_raises(self):
+        with pytest.raises(KeyError):
+            PersistentAVLTree([(1, 'a')]).delete(2)
+
+    def test_join_based_bulk_operations_are_refused(self):
+        tree = PersistentAVLTree([(1, 'a'), (2, 'b'), (3, 'c')])
+        with pytest.raises(TypeError):
+            tree.union(PersistentAVLTree([(4, 'd')]))
+        with pytest.raises(TypeError):
+            tree.split(2)
+        assert tree.inorder() == [1, 2, 3]
+
+    @pytest.mark.parametrize('operation', [
+        lambda tree, other: tree.union(other),
+        lambda tree, other: other.union(tree),
+        lambda tree, other: tree.intersection(other),
+        lambda tree, other: other.intersection(tree),
+        lambda tree, other: tree.difference(other),
+        lambda tree, other: tree.delete_many([1, 2]),
+        lambda tree, other: other.delete_many([1]),
+        lambda tree, other: tree.split(2),
+        lambda tree, other: PersistentAVLTree.join(tree, 9, 'x', other),
+        lambda tree, other: AVLTree.join(tree, 9, 'x', other),
+        lambda tree, other: AVLTree.join(other, 0, 'x', tree),
+    ])
+    def test_refused_even_when_one_side_is_empty(self, operation):
+        # Arrange
+        tree = PersistentAVLTree([(1, 'a'), (2, 'b')])
+        empty = PersistentAVLTree()
+
+        # Act / Assert
+        with pytest.raises(TypeError):
+            operation(tree, empty)
+        assert list(tree.iter_items()) == [(1, 'a'), (2, 'b')]
+        assert empty._root is None
+
+    def test_insert_many_returns_a_new_version(self):
+        # Arrange
+        empty = PersistentAVLTree()
+        tree = PersistentAVLTree([(1, 'a'), (3, 'c')])
+
+        # Act
+        first = empty.insert_many([(2, 'b'), (1, 'a')])
+        second = tree.insert_many([(2, 'b'), (1, 'z')])
+
+        # Assert
+        assert empty._root is None
+        assert list(tree.iter_items()) == [(1, 'a'), (3, 'c')]
+        assert list(first.iter_items()) == [(1, 'a'), (2, 'b')]
+        assert list(second.iter_items()) == [(1, 'a'), (1, 'z'), (2, 'b'), (3, 'c')]
+        check_node(second, second._root)
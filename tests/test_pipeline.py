@@ -0,0 +1,135 @@
+import asyncio
+import threading
+
+import pytest
+
+from stocks.pipeline import Tick, TickPipeline, synthetic_feed
+from stocks.stock import StockPriceManager
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestTickPipeline:
+    def test_feed_ends_with_every_bands_last_price(self):
+        # Arrange
+        manager = StockPriceManager()
+        last: dict[str, float] = {}
+
+        async def scenario() -> TickPipeline:
+            async with TickPipeline(manager, max_queue=64, batch_size=50, batch_window=0.01) as pipeline:
+                async for tick in synthetic_feed(symbols=20, ticks=2_000, burst=200, seed=19):
+                    last[tick.symbol] = tick.price
+                    await pipeline.put(tick)
+            return pipeline
+
+        # Act
+        pipeline = run(scenario())
+
+        # Assert
+        assert pipeline.stats.received == 2_000
+        assert pipeline.stats.applied + pipeline.stats.conflated == 2_000
+        assert pipeline.stats.max_queue_depth <= 64
+        for symbol, price in last.items():
+            assert manager.lookup_stock_price(symbol).current_price == price
+
+    def test_a_window_keeps_only_the_latest_tick_per_band(self):
+        # Arrange
+        manager = StockPriceManager()
+        ticks = [Tick('A', 'a', 10.0, 1.0), Tick('B', 'b', 20.0, 2.0), Tick('A', 'a', 11.0, 1.0),
+                 Tick('A', 'a', 12.0, 1.0)]
+
+        async def scenario() -> TickPipeline:
+            async with TickPipeline(manager, batch_size=10, batch_window=0.05) as pipeline:
+                for tick in ticks:
+                    await pipeline.put(tick)
+            return pipeline
+
+        # Act
+        pipeline = run(scenario())
+
+        # Assert
+        assert pipeline.stats.batches == 1
+        assert pipeline.stats.conflated == 2
+        assert list(manager.lookup_stock_price('A').historical_prices) == [12.0]
+
+    def test_put_waits_while_the_queue_is_full(self):
+        class Stuck(StockPriceManager):
+            def __init__(self):
+                super().__init__()
+                self.release = threading.Event()
+
+            def insert(self, *args):
+                self.release.wait()
+                super().insert(*args)
+
+        async def scenario() -> bool:
+            manager = Stuck()
+            pipeline = TickPipeline(manager, max_queue=1, batch_size=1, batch_window=0)
+            await pipeline.start()
+            try:
+                await pipeline.put(Tick('A', 'a', 1.0, 1.0))  # taken by the consumer, which then hangs
+                await asyncio.sleep(0.01)
+                await pipeline.put(Tick('A', 'a', 2.0, 1.0))  # fills the queue
+                await asyncio.wait_for(pipeline.put(Tick('A', 'a', 3.0, 1.0)), 0.05)
+            except asyncio.TimeoutError:
+                return True
+            finally:
+                manager.release.set()
+                await pipeline.stop()
+            return False
+
+        assert run(scenario())
+
+    def test_put_after_stop_raises(self):
+        # Arrange
+        async def scenario() -> TickPipeline:
+            pipeline = TickPipeline(StockPriceManager(), max_queue=1, batch_window=0)
+            async with pipeline:
+                await pipeline.put(Tick('A', 'a', 1.0, 1.0))
+
+            # Act / Assert
+            for price in (2.0, 3.0):  # the second would hang on the full queue if the first got in
+                with pytest.raises(RuntimeError):
+                    await asyncio.wait_for(pipeline.put(Tick('A', 'a', price, 1.0)), 1)
+            return pipeline
+
+        pipeline = run(scenario())
+        assert pipeline.stats.received == pipeline.stats.applied == 1
+
+    def test_put_before_start_raises(self):
+        with pytest.raises(RuntimeError):
+            run(TickPipeline(StockPriceManager()).put(Tick('A', 'a', 1.0, 1.0)))
+
+    def test_a_failing_batch_surfaces_on_stop(self):
+        class Broken(StockPriceManager):
+            def insert(self, *args):
+                raise RuntimeError('boom')
+
+        async def scenario() -> None:
+            async with TickPipeline(Broken(), batch_window=0) as pipeline:
+                await pipeline.put(Tick('A', 'a', 1.0, 1.0))
+
+        with pytest.raises(RuntimeError, match='boom'):
+            run(scenario())
+
+    def test_put_raises_once_a_failed_batch_stops_the_draining(self):
+        # Arrange
+        class Broken(StockPriceManager):
+            def insert(self, *args):
+                raise RuntimeError('boom')
+
+        async def scenario() -> None:
+            pipeline = TickPipeline(Broken(), max_queue=4, batch_size=1, batch_window=0)
+            await pipeline.start()
+            try:
+                for price in range(20):  # well past max_queue, so without the check put would wait forever
+                    await asyncio.wait_for(pipeline.put(Tick('A', 'a', float(price), 1.0)), 1)
+            finally:
+                with pytest.raises(RuntimeError):
+                    await pipeline.stop()
+
+        # Act / Assert
+        with pytest.raises(RuntimeError, match='boom'):
+            run(scenario())
@@ -0,0 +1,105 @@
+import random
+import threading
+
+import pytest
+
+from stocks.sharded import ReadWriteLock, ShardedStockPriceManager
+from stocks.stock import StockPriceManager
+
+
+class TestShardedStockPriceManager:
+    @pytest.fixture
+    def single(self) -> StockPriceManager:
+        manager = StockPriceManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        return manager
+
+    @pytest.fixture
+    def sharded(self) -> ShardedStockPriceManager:
+        manager = ShardedStockPriceManager(shards=4)
+        manager.load_from_csv('./stocks/sample_stock_prices.csv', chunk_size=37)
+        return manager
+
+    def test_cross_shard_queries_match_one_manager(self, single: StockPriceManager, sharded: ShardedStockPriceManager):
+        assert sharded.size() == 200
+        assert ([stock.low_price for stock in sharded.get_stocks_in_price_range(100, 200)]
+                == [stock.low_price for stock in single.get_stocks_in_price_range(100, 200)])
+        for by in ('low_price', 'max_price'):
+            assert ([getattr(stock, by) for stock in sharded.get_top_k(7, by)]
+                    == [getattr(stock, by) for stock in single.get_top_k(7, by)])
+            assert ([getattr(stock, by) for stock in sharded.get_bottom_k(7, by)]
+                    == [getattr(stock, by) for stock in single.get_bottom_k(7, by)])
+
+    def test_percentile_matches_one_manager(self, single: StockPriceManager, sharded: ShardedStockPriceManager):
+        for percentile in (0, 1, 25, 50, 73, 99, 100):
+            expected_low, _ = single._tree.quantile(percentile / 100)
+            symbol, _ = sharded.find_percentile(percentile)
+            # ties on low price may pick another stock with the same low price
+            assert expected_low in [stock.low_price for stock in sharded.lookup_stock_bands(symbol)]
+
+    def test_concurrent_inserts_lose_nothing(self):
+        # Arrange
+        manager = ShardedStockPriceManager(shards=4)
+        symbols = [f'S{index}' for index in range(40)]
+        for symbol in symbols:
+            manager.insert(symbol, symbol, 100.0, 50.0)
+
+        def feed(seed: int) -> None:
+            rng = random.Random(seed)
+            for _ in range(250):
+                manager.insert(rng.choice(symbols), 'x', rng.uniform(60, 140), 50.0)
+
+        threads = [threading.Thread(target=feed, args=(seed,)) for seed in range(6)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert manager.times_called == 40 + 6 * 250
+        assert manager.size() == 40
+        assert sum(len(manager.lookup_stock_price(symbol).historical_prices) for symbol in symbols) == 40 + 6 * 250
+
+    def test_readers_get_copies_that_later_ticks_leave_alone(self, sharded: ShardedStockPriceManager):
+        # Arrange
+        stock = sharded.lookup_stock_price('GOOGL')
+        bands = sharded.lookup_stock_bands('GOOGL')
+        top = sharded.get_top_k(3)
+        prices = list(stock.historical_prices)
+
+        # Act
+        sharded.insert('GOOGL', stock.stock_name, 999.0, stock.low_price)
+
+        # Assert
+        assert stock.current_price != 999.0 and list(stock.historical_prices) == prices
+        assert bands[0].current_price == stock.current_price
+        assert sharded.lookup_stock_price('GOOGL').current_price == 999.0
+        assert list(sharded.lookup_stock_price('GOOGL').historical_prices) == prices + [999.0]
+        assert all(found is not again for found, again in zip(top, sharded.get_top_k(3)))
+
+
+class TestReadWriteLock:
+    def test_readers_share_and_writers_exclude(self):
+        # Arrange
+        lock = ReadWriteLock()
+        writer_done = threading.Event()
+
+        def write() -> None:
+            with lock.write_lock():
+                writer_done.set()
+
+        # Act
+        lock.acquire_read()
+        lock.acquire_read()
+        writer = threading.Thread(target=write)
+        writer.start()
+        blocked = not writer_done.wait(0.05)
+        lock.release_read()
+        lock.release_read()
+        writer.join()
+
+        # Assert
+        assert blocked
+        assert writer_done.is_set()
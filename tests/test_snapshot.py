@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from datastructures.avltree import AVLTree
+from datastructures.intervaltree import IntervalTree
+from datastructures.snapshot import open_snapshot, pack_keys, unpack_keys, write_snapshot
+from stocks.stock import StockPriceManager
+from tests.test_avltree import check_node
+from tests.test_intervaltree import check_max_high
+
+
+class TestSnapshotFormat:
+    @pytest.mark.parametrize('keys', [[1.5, 2.5], [1, 2, 3], ['a', 'b'], [1, 2.5], [2 ** 70], []])
+    def test_key_columns_round_trip(self, keys: list, tmp_path):
+        # Arrange
+        path = str(tmp_path / 'keys.snap')
+
+        # Act
+        write_snapshot(path, b'TEST', [pack_keys(keys)])
+        with open_snapshot(path, b'TEST') as sections:
+            loaded = unpack_keys(sections[0])
+
+        # Assert
+        assert list(loaded) == keys
+        assert [type(key) for key in loaded] == [type(key) for key in keys]
+
+    def test_rejects_other_kinds_versions_and_truncation(self, tmp_path):
+        # Arrange
+        path = tmp_path / 'tree.snap'
+        AVLTree([(1, 'a')]).save(str(path))
+        data = path.read_bytes()
+
+        # Act / Assert
+        with pytest.raises(ValueError):
+            IntervalTree.load(str(path))
+        path.write_bytes(data[:4] + b'\x63\x00' + data[6:])
+        with pytest.raises(ValueError):
+            AVLTree.load(str(path))
+        path.write_bytes(data[:-3])
+        with pytest.raises(ValueError):
+            AVLTree.load(str(path))
+
+
+class TestTreeSnapshots:
+    def test_avltree_round_trip_is_balanced(self, tmp_path):
+        # Arrange
+        rng = random.Random(16)
+        tree: AVLTree = AVLTree()
+        for key in rng.sample(range(5000), 1000):
+            tree.insert(key, {'key': key})
+        path = str(tmp_path / 'tree.snap')
+
+        # Act
+        tree.save(path)
+        loaded = AVLTree.load(path)
+
+        # Assert
+        check_node(loaded, loaded._root)
+        assert list(loaded.iter_items()) == list(tree.iter_items())
+
+    def test_interval_tree_keeps_high_ends(self, tmp_path):
+        # Arrange
+        tree: IntervalTree = IntervalTree([(1, 5, 'a'), (2, 9, 'b'), (7, 8, 'c')])
+        path = str(tmp_path / 'intervals.snap')
+
+        # Act
+        tree.save(path)
+        loaded = IntervalTree.load(path)
+
+        # Assert
+        check_max_high(loaded._root)
+        assert loaded.at(6) == [(2, 9, 'b')]
+
+
+class TestManagerSnapshot:
+    def test_warm_start_matches_the_original(self, tmp_path):
+        # Arrange
+        manager = StockPriceManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        stock = manager.lookup_stock_price('GOOGL')
+        manager.insert('GOOGL', stock.stock_name, 250.0, stock.low_price)
+        path = str(tmp_path / 'manager.snap')
+
+        # Act
+        manager.save(path)
+        loaded = StockPriceManager.load(path)
+
+        # Assert
+        assert loaded._tree.inorder() == manager._tree.inorder()
+        assert loaded._max_price_tree.inorder() == manager._max_price_tree.inorder()
+        assert loaded.max_in_range(0, 1000) == manager.max_in_range(0, 1000)
+        assert loaded.max_in_range(stock.low_price, stock.low_price) == 250.0
+        restored = loaded.lookup_stock_price('GOOGL')
+        assert list(restored.historical_prices) == list(stock.historical_prices)
+        # the trees and the index share one object per stock again
+        assert any(found is restored for _, found in loaded._max_price_tree.iter_items())
+        assert any(found is restored for _, found in loaded._tree.iter_items())
@@ -0,0 +1,290 @@
+import random
+
+import pytest
+
+from stocks.stock import PriceNode, PriceTree, StockNode, StockPriceManager
+
+
+class TestStockPriceManager:
+    @pytest.fixture
+    def manager(self) -> StockPriceManager:
+        manager = StockPriceManager()
+        manager.insert('AAPL', 'Apple Inc.', 150.0, 140.0)
+        manager.insert('GOOGL', 'Alphabet Inc.', 2800.0, 2700.0)
+        manager.insert('AMZN', 'Amazon.com Inc.', 3400.0, 3300.0)
+        manager.insert('MSFT', 'Microsoft Corp.', 420.0, 400.0)
+        return manager
+
+    def test_range_query_uses_the_low_price_key(self, manager: StockPriceManager):
+        assert manager.range_query(100, 1000) == [('AAPL', 150.0), ('MSFT', 420.0)]
+
+    def test_get_stocks_in_price_range(self, manager: StockPriceManager):
+        stocks = manager.get_stocks_in_price_range(2000, 4000)
+        assert [stock.stock_symbol for stock in stocks] == ['GOOGL', 'AMZN']
+
+    def test_find_percentile(self, manager: StockPriceManager):
+        assert manager.find_percentile(0) == ('AAPL', 150.0)
+        assert manager.find_percentile(50) == ('MSFT', 420.0)  # nearest rank, the 2nd of 4 by low price
+        assert manager.find_percentile(100) == ('AMZN', 3400.0)
+
+
+class TestSymbolIndex:
+    @pytest.fixture
+    def manager(self) -> StockPriceManager:
+        manager = StockPriceManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        return manager
+
+    def test_csv_rows_become_low_high_bands(self, manager: StockPriceManager):
+        first = manager.lookup_stock_price('GOOGL')
+        assert (first.low_price, first.max_price) == (173, 213)
+
+    def test_one_symbol_returns_all_its_bands(self, manager: StockPriceManager):
+        bands = manager.lookup_stock_bands('GOOGL')
+        assert len(bands) > 1
+        assert all(stock.stock_symbol == 'GOOGL' for stock in bands)
+        assert manager.lookup_stock_price('NOPE') is None
+        assert manager.lookup_stock_bands('NOPE') == []
+
+    def test_insert_updates_the_existing_band(self):
+        # Arrange
+        manager = StockPriceManager()
+        manager.insert('AAPL', 'Apple Inc.', 150.0, 100.0)
+
+        # Act
+        manager.insert('AAPL', 'Apple Inc.', 155.0, 100.0)
+        manager.insert('AAPL', 'Apple Inc.', 90.0, 80.0)
+
+        # Assert
+        bands = manager.lookup_stock_bands('AAPL')
+        assert [stock.low_price for stock in bands] == [100.0, 80.0]
+        assert list(bands[0].historical_prices) == [150.0, 155.0]
+        assert manager._tree.size() == 2
+
+    def test_delete_keeps_tree_and_index_consistent(self, manager: StockPriceManager):
+        # Arrange
+        size_before = manager._tree.size()
+        googl_bands = len(manager.lookup_stock_bands('GOOGL'))
+
+        # Act
+        removed = manager.delete('GOOGL')
+
+        # Assert
+        assert len(removed) == googl_bands
+        assert manager.lookup_stock_price('GOOGL') is None
+        assert manager._tree.size() == size_before - googl_bands
+        assert all(stock.stock_symbol != 'GOOGL' for _, stock in manager._tree.iter_items())
+        with pytest.raises(KeyError):
+            manager.delete('GOOGL')
+
+    def test_delete_one_band(self, manager: StockPriceManager):
+        manager.delete('GOOGL', 173)
+        assert all(stock.low_price != 173 or stock.stock_symbol != 'GOOGL'
+                   for stock in manager.lookup_stock_bands('GOOGL'))
+
+
+    def test_chunked_load_keeps_trees_and_index_in_step(self):
+        # Arrange
+        manager = StockPriceManager()
+
+        # Act
+        stats = manager.load_from_csv('./stocks/sample_stock_prices.csv', chunk_size=16)
+
+        # Assert
+        assert stats.chunks == 13
+        assert manager._tree.size() == manager._max_price_tree.size() == 200
+        assert sum(len(bands) for bands in manager._symbol_index.values()) == 200
+        assert manager._tree.inorder() == sorted(manager._tree.inorder())
+
+
+    def test_moving_averages_follow_the_ticks(self):
+        # Arrange
+        manager = StockPriceManager()
+        for price in (100.0, 110.0, 90.0, 120.0):
+            manager.insert('ACME', 'Acme Corp', price, 80.0)
+
+        # Act
+        average = manager.calculate_moving_average(80.0, 3)
+        manager.insert('ACME', 'Acme Corp', 130.0, 80.0)
+
+        # Assert
+        assert average == pytest.approx((110 + 90 + 120) / 3)
+        assert manager.calculate_moving_average(80.0, 3) == pytest.approx((90 + 120 + 130) / 3)
+        assert manager.rolling_min_max(80.0, 3) == (90.0, 130.0)
+        assert manager.calculate_moving_average(80.0, 10) is None
+        assert manager.calculate_ema(80.0, 3) is not None
+
+
+class TestPriceTreeMaxPrice:
+    @pytest.fixture
+    def stocks(self) -> list[StockNode]:
+        rng = random.Random(9)
+        return [StockNode(f'S{index}', f'Stock {index}', float(rng.randrange(1, 1000)), float(rng.randrange(0, 500)))
+                for index in range(300)]
+
+    def check_max(self, node: PriceNode | None) -> float:
+        if node is None:
+            return float('-inf')
+        assert node._bucket_max == max(stock.current_price for stock in node._value)
+        expected = max(node._bucket_max, self.check_max(node._left), self.check_max(node._right))
+        assert node._max_price == expected
+        return expected
+
+    def brute_force(self, stocks: list[StockNode], lo: float, hi: float) -> float | None:
+        prices = [stock.current_price for stock in stocks if lo <= stock.low_price <= hi]
+        return max(prices) if prices else None
+
+    def test_max_in_range_matches_brute_force(self, stocks: list[StockNode]):
+        # Arrange
+        tree = PriceTree()
+        for stock in stocks:
+            tree.insert(stock.low_price, stock)
+
+        # Act / Assert
+        self.check_max(tree._root)
+        for lo in range(-10, 520, 23):
+            for hi in range(lo, 520, 41):
+                assert tree.max_in_range(lo, hi) == self.brute_force(stocks, lo, hi)
+
+    def test_refresh_and_delete_keep_the_max_current(self, stocks: list[StockNode]):
+        # Arrange
+        tree = PriceTree()
+        for stock in stocks:
+            tree.insert(stock.low_price, stock)
+
+        # Act
+        for stock in stocks[::3]:
+            stock.current_price = stock.current_price * 3
+            tree.refresh(stock.low_price, stock)
+        for stock in stocks[1::3]:
+            tree.remove(stock.low_price, stock)
+        remaining = [stock for index, stock in enumerate(stocks) if index % 3 != 1]
+
+        # Assert
+        self.check_max(tree._root)
+        assert tree.max_in_range(0, 500) == self.brute_force(remaining, 0, 500)
+        assert tree.max_in_range(100, 200) == self.brute_force(remaining, 100, 200)
+
+    def test_shared_low_prices_live_in_one_node(self, stocks: list[StockNode]):
+        # Arrange
+        for stock in stocks:
+            stock.low_price = float(int(stock.low_price) % 10)
+        tree = PriceTree.from_iterable((stock.low_price, stock) for stock in stocks)
+        top = max(stocks, key=lambda stock: stock.current_price)
+
+        # Act
+        top.current_price = 0.0  # the bucket's max drops, so its node has to look at the others again
+        tree.refresh(top.low_price, top)
+
+        # Assert
+        assert sum(1 for _ in tree._iter_nodes()) == 10
+        assert tree.count(top.low_price) == sum(1 for stock in stocks if stock.low_price == top.low_price)
+        self.check_max(tree._root)
+        assert tree.max_in_range(0, 9) == self.brute_force(stocks, 0, 9)
+
+    def test_manager_updates_the_max_on_every_tick(self):
+        manager = StockPriceManager()
+        manager.insert('AAPL', 'Apple Inc.', 150.0, 100.0)
+        manager.insert('MSFT', 'Microsoft Corp.', 420.0, 400.0)
+        assert manager.max_in_range(0, 200) == 150.0
+        manager.insert('AAPL', 'Apple Inc.', 175.0, 100.0)
+        assert manager.max_in_range(0, 200) == 175.0
+        assert manager.max_in_range(0, 1000) == 420.0
+        assert manager.max_in_range(500, 1000) is None
+
+
+class TestTopK:
+    @pytest.fixture
+    def manager(self) -> StockPriceManager:
+        manager = StockPriceManager()
+        manager.insert('AAPL', 'Apple Inc.', 150.0, 140.0)
+        manager.insert('GOOGL', 'Alphabet Inc.', 2800.0, 100.0)
+        manager.insert('AMZN', 'Amazon.com Inc.', 3400.0, 3300.0)
+        manager.insert('MSFT', 'Microsoft Corp.', 420.0, 400.0)
+        return manager
+
+    def test_rank_by_low_price(self, manager: StockPriceManager):
+        assert [stock.stock_symbol for stock in manager.get_top_k_stocks(2)] == ['AMZN', 'MSFT']
+        assert [stock.stock_symbol for stock in manager.get_bottom_k_stocks(2)] == ['GOOGL', 'AAPL']
+
+    def test_rank_by_max_price_follows_new_highs(self, manager: StockPriceManager):
+        assert [stock.stock_symbol for stock in manager.get_top_k_stocks(2, by='max_price')] == ['AMZN', 'GOOGL']
+
+        manager.insert('AAPL', 'Apple Inc.', 5000.0, 140.0)
+
+        assert [stock.stock_symbol for stock in manager.get_top_k_stocks(2, by='max_price')] == ['AAPL', 'AMZN']
+        assert [stock.stock_symbol for stock in manager.get_bottom_k_stocks(1, by='max_price')] == ['MSFT']
+
+    def test_unknown_ranking_raises(self, manager: StockPriceManager):
+        with pytest.raises(ValueError):
+            manager.get_top_k_stocks(2, by='volume')
+
+
+class TestDiskManager:
+    @staticmethod
+    def feed(manager: StockPriceManager):
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        rng = random.Random(25)
+        bands = [(stock.stock_symbol, stock.stock_name, stock.low_price) for _, stock in manager._tree.iter_items()]
+        for _ in range(1_000):
+            symbol, name, low_price = rng.choice(bands)
+            manager.insert(symbol, name, float(rng.randrange(int(low_price), int(low_price) + 300)), low_price)
+
+    @staticmethod
+    def answers(manager: StockPriceManager) -> tuple:
+        return (manager.range_query(100, 400),
+                [manager.find_percentile(percentile) for percentile in (0, 25, 50, 90, 100)],
+                [stock.stock_symbol for stock in manager.get_top_k_stocks(5, by='max_price')],
+                [manager.max_in_range(lo, lo + 150) for lo in range(0, 600, 50)],
+                [(stock.low_price, stock.current_price) for stock in manager.lookup_stock_bands('GOOGL')])
+
+    def test_same_answers_as_in_memory(self, tmp_path):
+        # Arrange
+        memory = StockPriceManager()
+        disk = StockPriceManager(storage=str(tmp_path))
+
+        # Act
+        self.feed(memory)
+        self.feed(disk)
+        memory.delete('AAPL')
+        disk.delete('AAPL')
+
+        # Assert
+        assert self.answers(disk) == self.answers(memory)
+        assert disk._tree.size() == disk._max_price_tree.size() == memory._tree.size()
+        with pytest.raises(TypeError):
+            disk.save(str(tmp_path / 'manager.snap'))
+        disk.close()
+
+    def test_reopening_the_storage_keeps_the_stocks(self, tmp_path):
+        # Arrange
+        with_storage = StockPriceManager(storage=str(tmp_path))
+        self.feed(with_storage)
+        before = self.answers(with_storage)
+        with_storage.close()
+
+        # Act
+        reopened = StockPriceManager(storage=str(tmp_path))
+
+        # Assert
+        assert self.answers(reopened) == before
+        reopened.close()
+
+    def test_reopening_reads_only_the_pages_it_needs(self, tmp_path):
+        # Arrange
+        with_storage = StockPriceManager(storage=str(tmp_path))
+        for index in range(5_000):
+            with_storage.insert(f'S{index % 800}', 'Stock', float(index % 977 + 10), float(index % 977))
+        with_storage.close()
+
+        # Act
+        reopened = StockPriceManager(storage=str(tmp_path))
+        opened = [tree.stats()['misses'] for tree in (reopened._tree, reopened._max_price_tree, reopened._symbol_tree)]
+        bands = reopened.lookup_stock_bands('S5')
+
+        # Assert
+        assert opened == [0, 0, 0]  # nothing is read into memory up front
+        assert reopened._symbol_index == {}
+        assert [stock.low_price for stock in bands] == [float(index % 977) for index in range(5, 5_000, 800)]
+        assert reopened._tree.stats()['misses'] < reopened._tree.stats()['pages'] // 4
+        reopened.close()
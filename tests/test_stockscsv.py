@@ -0,0 +1,90 @@
+import gzip
+import shutil
+
+import pytest
+
+from stocks.loader import iter_row_chunks
+
+from stocks.stockscsv import Stock, StockManager
+
+
+class TestStockManager:
+    @pytest.fixture
+    def manager(self) -> StockManager:
+        manager = StockManager()
+        manager.load_from_csv('./stocks/sample_stock_prices.csv')
+        return manager
+
+    def test_lookup_by_symbol(self, manager: StockManager):
+        stock = manager.lookup_stock_price('GOOGL')
+        assert (stock.low, stock.high) == (173, 213)
+        assert len(manager.lookup_stock_bands('GOOGL')) > 1
+
+    def test_top_and_bottom_k(self, manager: StockManager):
+        top = manager.get_top_k_stocks(5)
+        bottom = manager.get_bottom_k_stocks(5)
+        assert [stock.high for stock in top] == sorted((stock.high for stock in top), reverse=True)
+        assert top[0].high == max(stock.high for bands in manager._symbol_index.values() for stock in bands)
+        assert bottom[0].low == min(stock.low for bands in manager._symbol_index.values() for stock in bands)
+
+    def test_price_range_uses_band_overlap(self, manager: StockManager):
+        stocks = manager.get_stocks_in_price_range(100, 120)
+        assert stocks
+        assert all(stock.low <= 120 and stock.high >= 100 for stock in stocks)
+
+    def test_remove_stock(self, manager: StockManager):
+        stock = manager.lookup_stock_price('UBER')
+        manager.remove_stock(stock)
+        assert all(band is not stock for band in manager.lookup_stock_bands('UBER'))
+        assert all(found is not stock for found in manager.get_stocks_in_price_range(stock.low, stock.high))
+
+    def test_remove_takes_out_that_stock_and_not_an_equal_one(self):
+        # Arrange
+        manager = StockManager()
+        first, second = Stock('ACME', 'Acme Corp', 10.0, 20.0), Stock('ACME', 'Acme Corp', 10.0, 20.0)
+        manager.add_stock(first)
+        manager.add_stock(second)
+
+        # Act
+        manager.remove_stock(second)
+
+        # Assert
+        assert [band is first for band in manager.lookup_stock_bands('ACME')] == [True]
+        assert [found is first for found in manager.get_stocks_in_price_range(15, 15)] == [True]
+        assert [found is first for found in manager.get_top_k_stocks(1)] == [True]
+
+
+class TestChunkedLoading:
+    @pytest.mark.parametrize('chunk_size', [1, 7, 100_000])
+    def test_chunk_size_does_not_change_the_result(self, chunk_size: int):
+        # Arrange
+        expected = StockManager()
+        expected.load_from_csv('./stocks/sample_stock_prices.csv')
+        manager = StockManager()
+
+        # Act
+        stats = manager.load_from_csv('./stocks/sample_stock_prices.csv', chunk_size=chunk_size)
+
+        # Assert
+        assert stats.rows == 200
+        assert stats.chunks == -(-200 // chunk_size)
+        assert list(manager._stocks.iter_items()) == list(expected._stocks.iter_items())
+        assert list(manager._interval_tree.iter_intervals()) == list(expected._interval_tree.iter_intervals())
+
+    def test_loads_gzipped_file(self, tmp_path):
+        # Arrange
+        path = tmp_path / 'prices.csv.gz'
+        with open('./stocks/sample_stock_prices.csv', 'rb') as source, gzip.open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        manager = StockManager()
+
+        # Act
+        stats = manager.load_from_csv(str(path), chunk_size=50)
+
+        # Assert
+        assert stats.rows == 200
+        assert (manager.lookup_stock_price('GOOGL').low, manager.lookup_stock_price('GOOGL').high) == (173, 213)
+
+    def test_rejects_non_positive_chunk_size(self):
+        with pytest.raises(ValueError):
+            next(iter_row_chunks(iter([]), 0))
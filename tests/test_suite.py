@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.suite import REPORT_VERSION, compare_reports, regressions, run_suite
+from benchmarks.synthetic import SAMPLE_SYMBOLS, generate_rows, symbol_universe
+
+
+class TestSynthetic:
+    def test_rows_have_the_sample_shape(self):
+        rows = list(generate_rows(5_000, seed=7))
+        assert len(rows) == 5_000
+        assert len(symbol_universe(5_000)) == 500
+        for _, _, low, high in rows:
+            assert 50 <= low <= 300
+            assert low + 10 <= high <= max(low + 10, low * 3)
+        assert list(generate_rows(5_000, seed=7)) == rows
+
+    def test_small_files_only_use_the_sample_symbols(self):
+        assert {symbol for symbol, *_ in generate_rows(200)} <= {symbol for symbol, _ in SAMPLE_SYMBOLS}
+
+
+class TestReports:
+    @staticmethod
+    def report(**timings: float) -> dict:
+        return {'version': REPORT_VERSION, 'results': {name: {'us_per_op': value} for name, value in timings.items()}}
+
+    def test_compare_flags_slowdowns_past_the_threshold(self):
+        # Arrange
+        baseline = self.report(a=1.0, b=2.0, gone=1.0)
+        current = self.report(a=1.05, b=3.0, new=1.0)
+
+        # Act
+        comparisons, dropped, added = compare_reports(baseline, current)
+
+        # Assert
+        assert [comparison.name for comparison in comparisons] == ['a', 'b']
+        assert comparisons[1].change == pytest.approx(0.5)
+        assert [comparison.name for comparison in regressions(comparisons, 0.10)] == ['b']
+        assert dropped == ['gone']
+        assert added == ['new']
+
+    def test_reports_of_another_version_are_refused(self):
+        with pytest.raises(ValueError):
+            compare_reports({'version': 0, 'results': {}}, self.report())
+
+    def test_suite_writes_an_entry_per_case_and_size(self):
+        report = run_suite([50], repeats=1, only=['avltree.search', 'manager.queries'])
+        assert set(report['results']) == {'avltree.search/50', 'manager.queries/50'}
+        assert report['results']['avltree.search/50']['operations'] == 50
+
+    def test_a_case_with_a_setup_gets_fresh_data_every_call(self):
+        report = run_suite([50], repeats=2, only=['avltree.delete'])  # a reused tree would raise KeyError on the second call
+        assert report['results']['avltree.delete/50']['operations'] == 50